@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AdminFunctionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_functions'
+
+    def ready(self):
+        from admin_functions import signals  # noqa: F401
@@ -44,9 +44,8 @@ class AllocationForm(forms.Form):
         self.fields['venue'].widget.attrs.update({'onchange': 'this.form.submit()'})
 
     def _set_day1_field(self, student: User, day2_data: str):
-        self.fields[
-            'day1'].queryset = student.availability.all() if not day2_data else student.availability.all().exclude(
-            id=int(day2_data))
+        availability = student.availability.all() if student else Day.objects.none()
+        self.fields['day1'].queryset = availability if not day2_data else availability.exclude(id=int(day2_data))
         self.fields['day1'].widget.attrs.update({'onchange': 'this.form.submit()'})
 
     def _set_tutor_field(self, tutors):
@@ -55,7 +54,7 @@ class AllocationForm(forms.Form):
 
     def _set_day2_field(self, student: User, day1_data: str):
         self.fields['day2'].queryset = student.availability.all().exclude(
-            id=int(day1_data)) if day1_data else Day.objects.none()
+            id=int(day1_data)) if day1_data and student else Day.objects.none()
         self.fields['day2'].widget.attrs.update({'onchange': 'this.form.submit()'})
 
     def _get_day_data(self, day_num: int):
@@ -65,4 +64,9 @@ class AllocationForm(forms.Form):
         return day_data
 
     def _get_tutor_label(self, obj):
-        return f'{obj.username} - {obj.first_name} {obj.last_name}'
+        return get_tutor_label(obj)
+
+
+def get_tutor_label(tutor: User) -> str:
+    """Returns the label used to present a tutor when allocating a request."""
+    return f'{tutor.username} - {tutor.first_name} {tutor.last_name}'
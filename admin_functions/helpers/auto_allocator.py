@@ -0,0 +1,222 @@
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import NamedTuple
+
+from django.db import transaction
+
+from admin_functions.views.allocate_requests import commit_allocation
+from request_handler.models.request_model import Request
+from request_handler.models.venue_model import Venue
+from user_system.models.day_model import Day
+from user_system.models.knowledge_area_model import KnowledgeArea
+from user_system.models.user_model import User
+
+_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_MAX_AUGMENTING_DEPTH = 8
+
+
+class Allocation(NamedTuple):
+    """A planned allocation of a request (and, by extension, its group) to a tutor."""
+    lesson_request: Request
+    tutor: User
+    venue: Venue
+    day1: Day
+    day2: Day | None
+
+
+class _Option(NamedTuple):
+    tutor: User
+    days: tuple[Day, ...]
+
+    @property
+    def slots(self) -> frozenset:
+        return frozenset((self.tutor.id, day.id) for day in self.days)
+
+
+def auto_allocate(dry_run: bool = False) -> tuple[list[Allocation], list[Request]]:
+    """Allocates every open request in the database in a single batch.
+
+    All unallocated requests and all tutors are loaded once, the assignment is solved globally (see plan_allocations),
+    and the resulting allocations are committed in one transaction.
+    :param dry_run: if set, the allocations are planned but not saved.
+    :return: a tuple of the planned allocations and the requests that could not be allocated.
+    """
+    allocations, unallocated = plan_allocations()
+    if not dry_run:
+        committed = commit_allocations(allocations)
+        unallocated += [allocation.lesson_request for allocation in allocations if allocation not in committed]
+        allocations = committed
+    return allocations, unallocated
+
+
+def plan_allocations() -> tuple[list[Allocation], list[Request]]:
+    """Plans the allocation of all open requests without touching the database state.
+
+    Each tutor can teach on a given day only once, as allocating a request removes that day from the tutor's (and the
+    student's) availability. The problem is therefore a matching between requests and (tutor, day) slots, which is
+    solved with augmenting paths: a request that cannot find a free slot may take one from another request, as long as
+    the displaced request can be moved somewhere else. Requests with the fewest options are placed first, and cheaper
+    tutors are always preferred.
+    :return: a tuple of the planned allocations and the requests that could not be allocated.
+    """
+    requests = _load_open_requests()
+    tutors_by_subject = _load_tutors_by_subject()
+    venues = list(Venue.objects.exclude(venue='No Preference').order_by('id'))
+
+    options = {}
+    unallocated = []
+    for lesson_request in requests:
+        request_options = _get_options(lesson_request, tutors_by_subject)
+        if request_options and _choose_venue(lesson_request, venues):
+            options[lesson_request.id] = request_options
+        else:
+            unallocated.append(lesson_request)
+
+    matcher = _SlotMatcher({lesson_request.id: lesson_request for lesson_request in requests}, options)
+    for request_id in sorted(options, key=lambda key: len(options[key])):
+        if not matcher.augment(request_id):
+            unallocated.append(matcher.requests[request_id])
+
+    allocations = []
+    for request_id, option in matcher.assignment.items():
+        lesson_request = matcher.requests[request_id]
+        days = option.days
+        allocations.append(Allocation(lesson_request, option.tutor, _choose_venue(lesson_request, venues), days[0],
+                                      days[1] if len(days) > 1 else None))
+    return allocations, unallocated
+
+
+@transaction.atomic
+def commit_allocations(allocations: list[Allocation]) -> list[Allocation]:
+    """Saves the planned allocations in a single transaction, so a failure leaves no request half-allocated.
+
+    Groups that were allocated by someone else since they were planned are skipped.
+    :return: the allocations that were saved.
+    """
+    return [allocation for allocation in allocations
+            if commit_allocation(allocation.lesson_request, allocation.tutor, allocation.venue, allocation.day1,
+                                 allocation.day2)]
+
+
+# -HELPERS- #
+def _load_open_requests() -> list[Request]:
+    """Returns one representative request per group among those that are neither allocated nor rejected."""
+    requests = (Request.objects.filter(allocated=False, rejected_request=False)
+                .select_related('student')
+                .prefetch_related('venue_preference', 'student__availability')
+                .order_by('id'))
+    representatives = {}
+    for lesson_request in requests:
+        key = lesson_request.group_request_id if lesson_request.group_request_id != -1 else f'#{lesson_request.id}'
+        representatives.setdefault(key, lesson_request)
+    return list(representatives.values())
+
+
+def _load_tutors_by_subject() -> dict[str, list[User]]:
+    """Returns all tutors grouped by the subjects they teach, cheapest first."""
+    tutors = {tutor.id: tutor for tutor in
+              User.objects.filter(user_type=User.ACCOUNT_TYPE_TUTOR, hourly_rate__isnull=False)
+              .prefetch_related('availability')}
+    tutors_by_subject = defaultdict(list)
+    for user_id, subject in KnowledgeArea.objects.filter(user_id__in=tutors).values_list('user_id', 'subject'):
+        tutors_by_subject[subject].append(tutors[user_id])
+    for subject_tutors in tutors_by_subject.values():
+        subject_tutors.sort(key=lambda tutor: (tutor.hourly_rate, tutor.id))
+    return tutors_by_subject
+
+
+def _get_options(lesson_request: Request, tutors_by_subject: dict[str, list[User]]) -> list[_Option]:
+    """Returns every (tutor, day(s)) combination that satisfies the request, cheapest tutor first."""
+    student = lesson_request.student
+    if not student or student.student_max_rate is None:
+        return []
+
+    student_days = {day.id: day for day in student.availability.all()}
+    request_options = []
+    for tutor in tutors_by_subject.get(lesson_request.knowledge_area, []):
+        if tutor.hourly_rate > student.student_max_rate:
+            break
+        common_days = sorted((day for day in tutor.availability.all() if day.id in student_days),
+                             key=lambda day: _WEEKDAYS.index(day.day))
+        if lesson_request.frequency == 'Biweekly':
+            request_options.extend(_Option(tutor, pair) for pair in combinations(common_days, 2))
+        else:
+            request_options.extend(_Option(tutor, (day,)) for day in common_days)
+    return request_options
+
+
+def _choose_venue(lesson_request: Request, venues: list[Venue]) -> Venue | None:
+    """Mirrors get_venue_preference: the first venue the student would accept, or None if there is none."""
+    preferences = sorted(lesson_request.venue_preference.all(), key=lambda venue: venue.id)
+    if any(venue.venue == 'No Preference' for venue in preferences):
+        preferences = venues
+    return preferences[0] if preferences else None
+
+
+class _SlotMatcher:
+    """Matches requests to (tutor, day) slots using augmenting paths.
+
+    Changes are journaled so that a failed augmentation (e.g. a Biweekly request that displaced two requests, only one
+    of which could be moved) can be rolled back exactly.
+    """
+
+    def __init__(self, requests: dict[int, Request], options: dict[int, list[_Option]]):
+        self.requests = requests
+        self.options = options
+        self.assignment = {}
+        self._slot_owners = {}
+        self._student_days = defaultdict(Counter)
+        self._journal = []
+
+    def augment(self, request_id: int) -> bool:
+        return self._augment(request_id, set(), 0)
+
+    def _augment(self, request_id: int, visited: set, depth: int) -> bool:
+        if depth > _MAX_AUGMENTING_DEPTH:
+            return False
+        student_id = self.requests[request_id].student_id
+        for option in self.options[request_id]:
+            slots = option.slots
+            if slots & visited or any(self._student_days[student_id][day.id] for day in option.days):
+                continue
+            visited |= slots
+            mark = len(self._journal)
+            displaced = {self._slot_owners[slot] for slot in slots if slot in self._slot_owners}
+            for other_id in displaced:
+                self._release(other_id)
+            self._assign(request_id, option)
+            if all(self._augment(other_id, visited, depth + 1) for other_id in displaced):
+                return True
+            self._rollback(mark)
+        return False
+
+    def _assign(self, request_id: int, option: _Option) -> None:
+        self._journal.append(('assign', request_id, option))
+        self._apply_assign(request_id, option)
+
+    def _release(self, request_id: int) -> None:
+        option = self.assignment[request_id]
+        self._journal.append(('release', request_id, option))
+        self._apply_release(request_id, option)
+
+    def _rollback(self, mark: int) -> None:
+        while len(self._journal) > mark:
+            action, request_id, option = self._journal.pop()
+            if action == 'assign':
+                self._apply_release(request_id, option)
+            else:
+                self._apply_assign(request_id, option)
+
+    def _apply_assign(self, request_id: int, option: _Option) -> None:
+        self.assignment[request_id] = option
+        for slot in option.slots:
+            self._slot_owners[slot] = request_id
+        for day in option.days:
+            self._student_days[self.requests[request_id].student_id][day.id] += 1
+
+    def _apply_release(self, request_id: int, option: _Option) -> None:
+        del self.assignment[request_id]
+        for slot in option.slots:
+            del self._slot_owners[slot]
+        for day in option.days:
+            self._student_days[self.requests[request_id].student_id][day.id] -= 1
@@ -16,6 +16,16 @@ def calculate_cost(tutor: User, request_id: int) -> float:
     """
 
     lesson_request = get_object_or_404(Request, id=request_id)
+    return calculate_request_cost(tutor, lesson_request)
+
+
+def calculate_request_cost(tutor: User, lesson_request: Request) -> float:
+    """Calculates the cost for an invoice from a request that has already been loaded (see calculate_cost).
+
+    :param tutor: the Tutor user for the invoice
+    :param lesson_request: the tutoring request object
+    :return: the cost for the invoice as a float.
+    """
     duration = lesson_request.duration
     frequency = lesson_request.frequency
     lesson_num = calculate_num_lessons(frequency)
@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from sortedcontainers import SortedList
+
+from user_system.models.knowledge_area_model import KnowledgeArea
+from user_system.models.user_model import User
+
+_TTL = getattr(settings, 'TUTOR_ELIGIBILITY_INDEX_TTL', 300)
+
+
+class TutorEligibilityIndex:
+    """Class representing a process-local index of which tutors can teach what, when and for how much.
+
+    The index maps (knowledge area, day id) pairs to the set of tutors who teach that subject and are available on that
+    day, and keeps all tutors sorted by their hourly rate so that rate limits can be applied as a range cut. Finding the
+    suitable tutors for a request is then a set intersection instead of a multi-join query.
+
+    The index is built lazily on first use and kept up to date by the signal handlers in admin_functions.signals. As
+    those signals only fire in the current process (and not at all for bulk queryset operations), the index is also
+    rebuilt once it is older than settings.TUTOR_ELIGIBILITY_INDEX_TTL seconds.
+    An index built inside a transaction may contain changes that are later rolled back, so it is only used for that one
+    lookup.
+    """
+
+    def __init__(self, ttl: float = _TTL):
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._subjects = {}
+        self._days = {}
+        self._rates = {}
+        self._by_rate = SortedList()
+        self._slots = defaultdict(set)
+
+    def eligible_tutor_ids(self, subject: str, day_ids: list[int], max_rate: Decimal | None) -> list[int]:
+        """Returns the ids of all tutors who teach the subject, are available on every given day and charge at most
+        max_rate, cheapest first.
+        """
+        if not day_ids or max_rate is None:
+            return []
+
+        with self._lock:
+            self._ensure_built()
+            candidates = set.intersection(*(self._slots.get((subject, day_id), set()) for day_id in day_ids))
+            cut = self._by_rate.bisect_right((max_rate, math.inf))
+            if cut <= len(candidates):
+                return [tutor_id for _, tutor_id in self._by_rate.islice(stop=cut) if tutor_id in candidates]
+            return sorted((tutor_id for tutor_id in candidates if self._rates[tutor_id] <= max_rate),
+                          key=lambda tutor_id: (self._rates[tutor_id], tutor_id))
+
+    def invalidate(self) -> None:
+        """Discards the index, so that it is rebuilt from the database on next use."""
+        with self._lock:
+            self._built_at = None
+
+    # -PATCHES- #
+    def add_knowledge_area(self, tutor_id: int, subject: str) -> None:
+        with self._lock:
+            if not self._can_patch(tutor_id):
+                return
+            self._subjects[tutor_id][subject] += 1
+            for day_id in self._days[tutor_id]:
+                self._slots[(subject, day_id)].add(tutor_id)
+
+    def remove_knowledge_area(self, tutor_id: int, subject: str) -> None:
+        with self._lock:
+            if not self._can_patch(tutor_id):
+                return
+            subjects = self._subjects[tutor_id]
+            subjects[subject] -= 1
+            if subjects[subject] <= 0:
+                del subjects[subject]
+                for day_id in self._days[tutor_id]:
+                    self._slots[(subject, day_id)].discard(tutor_id)
+
+    def update_days(self, tutor_id: int, added: set[int] = frozenset(), removed: set[int] = frozenset(),
+                    cleared: bool = False) -> None:
+        with self._lock:
+            if not self._can_patch(tutor_id):
+                return
+            self._unlink(tutor_id)
+            days = set() if cleared else self._days[tutor_id]
+            self._days[tutor_id] = (days | set(added)) - set(removed)
+            self._link(tutor_id)
+
+    def update_tutor(self, user: User) -> None:
+        """Adds, updates or removes a user from the index according to their current user type and hourly rate."""
+        rate = _to_rate(user.hourly_rate) if user.is_tutor and user.hourly_rate is not None else None
+        with self._lock:
+            if not self._can_patch():
+                return
+            if user.id in self._rates and rate is None:
+                self.remove_tutor(user.id)
+            elif user.id in self._rates and rate != self._rates[user.id]:
+                self._by_rate.discard((self._rates[user.id], user.id))
+                self._rates[user.id] = rate
+                self._by_rate.add((rate, user.id))
+            elif user.id not in self._rates and rate is not None:
+                # A user who just became an eligible tutor may already have subjects and days in the database.
+                subjects = Counter(KnowledgeArea.objects.filter(user_id=user.id).values_list('subject', flat=True))
+                self._add(user.id, rate, subjects, set(user.availability.values_list('id', flat=True)))
+
+    def remove_tutor(self, tutor_id: int) -> None:
+        with self._lock:
+            if not self._can_patch(tutor_id):
+                return
+            self._unlink(tutor_id)
+            self._by_rate.discard((self._rates.pop(tutor_id), tutor_id))
+            del self._subjects[tutor_id]
+            del self._days[tutor_id]
+
+    # -HELPERS- #
+    def _is_built(self) -> bool:
+        return self._built_at is not None and time.monotonic() - self._built_at < self._ttl
+
+    def _can_patch(self, tutor_id: int = None) -> bool:
+        return self._is_built() and (tutor_id is None or tutor_id in self._rates)
+
+    def _ensure_built(self) -> None:
+        if self._is_built():
+            return
+        self._subjects, self._days, self._rates = {}, {}, {}
+        self._by_rate = SortedList()
+        self._slots = defaultdict(set)
+
+        tutors = User.objects.filter(user_type=User.ACCOUNT_TYPE_TUTOR, hourly_rate__isnull=False)
+        subjects = defaultdict(Counter)
+        for tutor_id, subject in KnowledgeArea.objects.filter(user__in=tutors).values_list('user_id', 'subject'):
+            subjects[tutor_id][subject] += 1
+        days = defaultdict(set)
+        for tutor_id, day_id in User.availability.through.objects.filter(user__in=tutors).values_list('user_id',
+                                                                                                        'day_id'):
+            days[tutor_id].add(day_id)
+        for tutor_id, rate in tutors.values_list('id', 'hourly_rate'):
+            self._add(tutor_id, rate, subjects[tutor_id], days[tutor_id])
+        self._built_at = None if connection.in_atomic_block else time.monotonic()
+
+    def _add(self, tutor_id: int, rate: Decimal, subjects: Counter, days: set[int]) -> None:
+        self._rates[tutor_id] = rate
+        self._by_rate.add((rate, tutor_id))
+        self._subjects[tutor_id] = subjects
+        self._days[tutor_id] = days
+        self._link(tutor_id)
+
+    def _link(self, tutor_id: int) -> None:
+        for subject in self._subjects[tutor_id]:
+            for day_id in self._days[tutor_id]:
+                self._slots[(subject, day_id)].add(tutor_id)
+
+    def _unlink(self, tutor_id: int) -> None:
+        for subject in self._subjects[tutor_id]:
+            for day_id in self._days[tutor_id]:
+                self._slots[(subject, day_id)].discard(tutor_id)
+
+
+def _to_rate(hourly_rate) -> Decimal:
+    """Normalises an hourly rate the same way the database stores it (a Decimal with 2 decimal places)."""
+    return Decimal(str(hourly_rate)).quantize(Decimal('0.01'))
+
+
+eligibility_index = TutorEligibilityIndex()
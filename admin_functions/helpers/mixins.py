@@ -17,21 +17,28 @@ class SortingMixin:
         stripped = sort_field.lstrip('-')
 
         # If the field is not a string, we do not need to worry about upper and lowercase characters
+        # The primary key breaks ties, so that pages do not overlap when many elements share the same value
         if not self._is_string_field(stripped, queryset.model):
-            return queryset.order_by(sort_field)
+            return queryset.order_by(sort_field, 'pk')
 
         ordering = Upper(stripped)
         if sort_field.startswith('-'):
             ordering = ordering.desc()
-        return queryset.order_by(ordering)
+        return queryset.order_by(ordering, 'pk')
 
     def determine_sort_field(self, field):
         stripped = field.lstrip('-')
         return field if (stripped in self.valid_sort_fields) else self.default_sort_field
 
     def _is_string_field(self, field_name, model):
+        """Returns whether a field (which may span relations, e.g. student__last_name) holds strings."""
+        *relations, name = field_name.split('__')
         try:
-            field = model._meta.get_field(field_name)
+            for relation in relations:
+                model = model._meta.get_field(relation).related_model
+                if model is None:
+                    return False
+            field = model._meta.get_field(name)
             return field.get_internal_type() in ['CharField', 'TextField']
         except FieldDoesNotExist:
             return False
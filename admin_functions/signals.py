@@ -0,0 +1,56 @@
+""" Signal handlers that keep the process-local tutor eligibility index in sync with the database.
+
+Changes that can be applied in place (a knowledge area added or removed, a tutor's days or hourly rate changing) patch
+the index directly. Anything else simply invalidates it, so that it is rebuilt on next use.
+Patches are only applied once the change is committed, so a rolled back transaction never leaks into the index.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from admin_functions.helpers.eligibility_index import eligibility_index
+from user_system.models.knowledge_area_model import KnowledgeArea
+from user_system.models.user_model import User
+
+_INDEXED_USER_FIELDS = {'user_type', 'hourly_rate'}
+
+
+@receiver(post_save, sender=KnowledgeArea)
+def knowledge_area_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: eligibility_index.add_knowledge_area(instance.user_id, instance.subject))
+    else:
+        transaction.on_commit(eligibility_index.invalidate)
+
+
+@receiver(post_delete, sender=KnowledgeArea)
+def knowledge_area_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: eligibility_index.remove_knowledge_area(instance.user_id, instance.subject))
+
+
+@receiver(m2m_changed, sender=User.availability.through)
+def availability_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        transaction.on_commit(eligibility_index.invalidate)
+    elif action == 'post_add':
+        transaction.on_commit(lambda: eligibility_index.update_days(instance.id, added=pk_set))
+    elif action == 'post_remove':
+        transaction.on_commit(lambda: eligibility_index.update_days(instance.id, removed=pk_set))
+    else:
+        transaction.on_commit(lambda: eligibility_index.update_days(instance.id, cleared=True))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Saves of other fields only (e.g. last_login, updated on every log in) cannot change the index
+    if update_fields is not None and not _INDEXED_USER_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(lambda: eligibility_index.update_tutor(instance))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    tutor_id = instance.id
+    transaction.on_commit(lambda: eligibility_index.remove_tutor(tutor_id))
@@ -1,15 +1,20 @@
+from unittest.mock import patch
+
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.test import TestCase
 from django.urls import reverse
 
 from admin_functions.helpers import calculate_cost
-from admin_functions.views.allocate_requests import get_suitable_tutors, get_venue_preference
+from admin_functions.helpers.eligibility_index import eligibility_index
+from admin_functions.views.allocate_requests import commit_allocation, get_availability_heatmap, get_suitable_tutors, \
+    get_venue_preference
 from request_handler.fixtures.create_test_requests import create_test_requests
 from request_handler.models.request_model import Request
 from request_handler.models.venue_model import Venue
 from user_system.fixtures.create_test_users import create_test_users
 from user_system.models.day_model import Day
+from user_system.models.knowledge_area_model import KnowledgeArea
 from user_system.models.user_model import User
 
 
@@ -255,6 +260,106 @@ class TestAllocation(TestCase):
     def test_get_suitable_tutors_raises_404_if_invalid_request_id(self):
         self.assertRaises(Http404, get_suitable_tutors, -99, self.tuesday.id, self.wednesday.id)
 
+    def test_backwards_biweekly_allocation_orders_days(self):
+        self.set_request_frequency("Biweekly")
+        self.allocate(self.wednesday.id, self.tuesday.id)
+        self.unallocated_request.refresh_from_db()
+        self.assertEqual(self.unallocated_request.day, self.tuesday)
+        self.assertEqual(self.unallocated_request.day2, self.wednesday)
+
+    def test_allocation_removes_days_from_availabilities(self):
+        self.set_request_frequency("Biweekly")
+        self.allocate(self.tuesday.id, self.wednesday.id)
+        self.assertQuerysetEqual(self.tutor.availability.all(), [])
+        self.assertQuerysetEqual(self.student.availability.all(), [Day.objects.get(day='Thursday')])
+
+    def test_commit_allocation_allocates_group_in_constant_queries(self):
+        group = [self.create_group_request(term) for term in ('May', 'September', 'January')]
+        with self.assertNumQueries(6):  # savepoint, lock, tutor days, update, student days, release
+            self.assertTrue(commit_allocation(self.unallocated_request, self.tutor, self.online, self.tuesday, None))
+        for lesson_request in group + [self.unallocated_request]:
+            lesson_request.refresh_from_db()
+            self.assertTrue(lesson_request.allocated)
+            self.assertEqual(lesson_request.tutor, self.tutor)
+            self.assertEqual(lesson_request.day, self.tuesday)
+
+    def test_commit_allocation_rejects_partially_allocated_group(self):
+        sibling = self.create_group_request('May')
+        sibling.allocated = True
+        sibling.save()
+        self.assertFalse(commit_allocation(self.unallocated_request, self.tutor, self.online, self.tuesday, None))
+        self.unallocated_request.refresh_from_db()
+        self.assertFalse(self.unallocated_request.allocated)
+        self.assertIn(self.tuesday, self.tutor.availability.all())
+
+    def test_commit_allocation_rejects_tutor_no_longer_available(self):
+        # e.g. the day was taken by an allocation made in another process, whose eligibility index is out of date
+        self.tutor.availability.remove(self.tuesday)
+        self.assertFalse(commit_allocation(self.unallocated_request, self.tutor, self.online, self.tuesday, None))
+        self.unallocated_request.refresh_from_db()
+        self.assertFalse(self.unallocated_request.allocated)
+        self.assertIn(self.tuesday, self.student.availability.all())
+
+    def test_allocating_unavailable_tutor_returns_conflict(self):
+        self.set_request_frequency("Biweekly")
+        self.tutor.availability.remove(self.wednesday)
+        # The eligibility index of another process may still offer the tutor on both days
+        with patch.object(eligibility_index, 'eligible_tutor_ids', return_value=[self.tutor.id]):
+            response = self.allocate(self.tuesday.id, self.wednesday.id)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(self.tuesday, self.tutor.availability.all())
+
+    def test_get_suitable_tutors_are_cheapest_first(self):
+        cheaper = User.objects.create_user(username='@cheaper', email='cheaper@example.org', password='Password123',
+                                           user_type=User.ACCOUNT_TYPE_TUTOR, hourly_rate=self.tutor.hourly_rate - 1)
+        cheaper.availability.add(self.tuesday)
+        KnowledgeArea.objects.create(user=cheaper, subject=self.unallocated_request.knowledge_area)
+        result = get_suitable_tutors(self.unallocated_request.id, self.tuesday.id, None)
+        self.assertEqual(list(result), [cheaper, self.tutor])
+
+    def test_allocating_partially_allocated_group_returns_conflict(self):
+        sibling = self.create_group_request('May')
+        sibling.allocated = True
+        sibling.save()
+        response = self.allocate(self.tuesday.id, self.wednesday.id)
+        self.assertEqual(response.status_code, 409)
+        self.assertTemplateUsed(response, 'already_allocated_error.html')
+
+    def test_heatmap_counts_tutors_per_day(self):
+        heatmap = get_availability_heatmap(self.unallocated_request)
+        self.assertFalse(heatmap["biweekly"])
+        self.assertEqual({row["day"].day: row["count"] for row in heatmap["rows"]},
+                         {"Tuesday": 1, "Wednesday": 1, "Thursday": 0})
+        self.assertTrue(all(row["pairs"] == [] for row in heatmap["rows"]))
+
+    def test_heatmap_counts_tutors_per_day_pair_for_biweekly_requests(self):
+        self.set_request_frequency("Biweekly")
+        heatmap = get_availability_heatmap(self.unallocated_request)
+        self.assertTrue(heatmap["biweekly"])
+        self.assertEqual([day.day for day in heatmap["days"]], ["Tuesday", "Wednesday", "Thursday"])
+        self.assertEqual([row["pairs"] for row in heatmap["rows"]], [[None, 1, 0], [1, None, 0], [0, 0, None]])
+
+    def test_heatmap_is_empty_without_student(self):
+        self.unallocated_request.student = None
+        self.unallocated_request.save()
+        heatmap = get_availability_heatmap(self.unallocated_request)
+        self.assertEqual(heatmap, {"days": [], "rows": [], "biweekly": False})
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("allocate_request", args={self.unallocated_request.id}),
+                                   {'day1': self.tuesday.id})
+        self.assertEqual(response.status_code, 200)
+
+    def test_heatmap_is_shown_on_allocation_page(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("allocate_request", args={self.unallocated_request.id}))
+        self.assertTemplateUsed(response, "partials/availability_heatmap.html")
+        self.assertContains(response, f'id="availability-heatmap-row-{self.tuesday.id}"')
+
+    def create_group_request(self, term: str) -> Request:
+        return Request.objects.create(student=self.student, knowledge_area='Python', term=term, frequency='Weekly',
+                                      duration='1h', group_request_id=self.unallocated_request.group_request_id)
+
     def set_request_frequency(self, frequency: str = ''):
         self.unallocated_request.frequency = frequency
         self.unallocated_request.save()
@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from request_handler.fixtures.create_test_requests import create_test_requests
+from request_handler.models.request_model import Request
+from request_handler.models.venue_model import Venue
+from user_system.fixtures.create_test_users import create_test_users
+from user_system.models.day_model import Day
+from user_system.models.user_model import User
+
+
+class TestAllocationOptions(TestCase):
+    def setUp(self):
+        create_test_users()
+        create_test_requests()
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.allocated_request = Request.objects.get(allocated=True)
+        self.unallocated_request = Request.objects.get(allocated=False)
+        self.online = Venue.objects.get(venue='Online')
+        self.tuesday = Day.objects.get(day='Tuesday')
+        self.wednesday = Day.objects.get(day='Wednesday')
+        self.thursday = Day.objects.get(day='Thursday')
+        self.url = reverse('allocation_options', args=[self.unallocated_request.id])
+
+    def test_unauthenticated_user_is_redirected(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, f'{reverse("log_in")}?next={self.url}', status_code=302, target_status_code=200)
+
+    def test_student_cannot_get_options(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_tutor_cannot_get_options(self):
+        self.client.force_login(self.tutor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_allocated_request_has_no_options(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('allocation_options', args=[self.allocated_request.id]))
+        self.assertEqual(response.status_code, 409)
+
+    def test_unknown_request_returns_404(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('allocation_options', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    # Test that a request without a student has no options, rather than failing.
+    def test_request_without_student_has_no_options(self):
+        Request.objects.filter(id=self.unallocated_request.id).update(student=None)
+        data = self.get_options()
+        self.assertEqual(data['days'], [])
+        self.assertEqual(data['tutors'], {})
+        self.assertEqual(data['options'], [])
+
+    def test_weekly_request_has_one_option_per_day_and_venue(self):
+        data = self.get_options()
+        self.assertEqual(data['frequency'], 'Weekly')
+        self.assertEqual([day['id'] for day in data['days']], [self.tuesday.id, self.wednesday.id, self.thursday.id])
+        self.assertEqual(data['venues'], [{'id': self.online.id, 'venue': 'Online'}])
+        self.assertEqual(data['tutors'], {str(self.tutor.id): {'id': self.tutor.id, 'label': '@janedoe - Jane Doe',
+                                                               'hourly_rate': '25.00'}})
+        tutors = {option['day1']: option['tutors'] for option in data['options']}
+        self.assertEqual(tutors, {self.tuesday.id: [self.tutor.id], self.wednesday.id: [self.tutor.id],
+                                  self.thursday.id: []})
+        self.assertTrue(all(option['day2'] is None for option in data['options']))
+
+    def test_biweekly_request_has_one_option_per_day_pair(self):
+        self.unallocated_request.frequency = 'Biweekly'
+        self.unallocated_request.save()
+        data = self.get_options()
+        self.assertEqual(len(data['options']), 6)
+        tutors = {(option['day1'], option['day2']): option['tutors'] for option in data['options']}
+        self.assertEqual(tutors[(self.tuesday.id, self.wednesday.id)], [self.tutor.id])
+        self.assertEqual(tutors[(self.wednesday.id, self.tuesday.id)], [self.tutor.id])
+        self.assertEqual(tutors[(self.tuesday.id, self.thursday.id)], [])
+
+    def test_allocation_page_links_to_options(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('allocate_request', args=[self.unallocated_request.id]))
+        self.assertContains(response, self.url)
+
+    def get_options(self) -> dict:
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from admin_functions.helpers.auto_allocator import auto_allocate, plan_allocations
+from request_handler.fixtures.create_test_requests import create_test_requests
+from request_handler.models.request_model import Request
+from request_handler.models.venue_model import Venue
+from user_system.fixtures.create_test_users import create_test_users
+from user_system.models.day_model import Day
+from user_system.models.user_model import User
+
+
+class TestAutoAllocation(TestCase):
+    def setUp(self):
+        create_test_users()
+        create_test_requests()
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.unallocated_request = Request.objects.get(allocated=False)
+        self.online = Venue.objects.get(venue='Online')
+        self.tuesday = Day.objects.get(day='Tuesday')
+        self.wednesday = Day.objects.get(day='Wednesday')
+
+    def test_plan_allocates_unallocated_request(self):
+        allocations, unallocated = plan_allocations()
+        self.assertEqual(len(allocations), 1)
+        self.assertEqual(unallocated, [])
+        allocation = allocations[0]
+        self.assertEqual(allocation.lesson_request, self.unallocated_request)
+        self.assertEqual(allocation.tutor, self.tutor)
+        self.assertEqual(allocation.venue, self.online)
+        self.assertEqual(allocation.day1, self.tuesday)
+        self.assertIsNone(allocation.day2)
+
+    def test_dry_run_does_not_save(self):
+        auto_allocate(dry_run=True)
+        self.unallocated_request.refresh_from_db()
+        self.assertFalse(self.unallocated_request.allocated)
+
+    def test_auto_allocate_commits_allocation(self):
+        auto_allocate()
+        self.unallocated_request.refresh_from_db()
+        self.assertTrue(self.unallocated_request.allocated)
+        self.assertEqual(self.unallocated_request.tutor, self.tutor)
+        self.assertEqual(self.unallocated_request.day, self.tuesday)
+        self.assertNotIn(self.tuesday, self.tutor.availability.all())
+        self.assertNotIn(self.tuesday, self.student.availability.all())
+
+    def test_auto_allocate_allocates_whole_group(self):
+        other = self.create_request(self.student, term='May', group_request_id=self.unallocated_request.group_request_id)
+        auto_allocate()
+        other.refresh_from_db()
+        self.assertTrue(other.allocated)
+        self.assertEqual(other.tutor, self.tutor)
+
+    def test_biweekly_request_gets_two_days(self):
+        self.unallocated_request.frequency = 'Biweekly'
+        self.unallocated_request.save()
+        allocations, _ = plan_allocations()
+        self.assertEqual({allocations[0].day1, allocations[0].day2}, {self.tuesday, self.wednesday})
+
+    def test_tutor_too_expensive_is_not_allocated(self):
+        self.student.student_max_rate = 10
+        self.student.save()
+        allocations, unallocated = plan_allocations()
+        self.assertEqual(allocations, [])
+        self.assertEqual(unallocated, [self.unallocated_request])
+
+    def test_rejected_requests_are_ignored(self):
+        self.unallocated_request.rejected_request = True
+        self.unallocated_request.save()
+        allocations, unallocated = plan_allocations()
+        self.assertEqual(allocations, [])
+        self.assertEqual(unallocated, [])
+
+    def test_competing_requests_are_matched_globally(self):
+        # The first request could take either day, but the second one can only take Tuesday
+        flexible_student = self.create_student('@flexible', [self.tuesday, self.wednesday])
+        fixed_student = self.create_student('@fixed', [self.tuesday])
+        self.unallocated_request.delete()
+        flexible = self.create_request(flexible_student, group_request_id=100)
+        fixed = self.create_request(fixed_student, group_request_id=101)
+
+        allocations, unallocated = plan_allocations()
+        self.assertEqual(unallocated, [])
+        days = {allocation.lesson_request: allocation.day1 for allocation in allocations}
+        self.assertEqual(days[fixed], self.tuesday)
+        self.assertEqual(days[flexible], self.wednesday)
+
+    def test_tutor_day_is_not_double_booked(self):
+        first_student = self.create_student('@first', [self.tuesday])
+        second_student = self.create_student('@second', [self.tuesday])
+        self.unallocated_request.delete()
+        self.create_request(first_student, group_request_id=100)
+        self.create_request(second_student, group_request_id=101)
+
+        allocations, unallocated = plan_allocations()
+        self.assertEqual(len(allocations), 1)
+        self.assertEqual(len(unallocated), 1)
+
+    def test_admin_can_auto_allocate(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('auto_allocate_requests'))
+        self.assertRedirects(response, reverse('admin_dash'), status_code=302, target_status_code=200)
+        self.unallocated_request.refresh_from_db()
+        self.assertTrue(self.unallocated_request.allocated)
+
+    def test_auto_allocate_not_accessible_via_get(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('auto_allocate_requests'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_student_cannot_auto_allocate(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('auto_allocate_requests'))
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, 'permission_denied.html')
+
+    def test_management_command_allocates_requests(self):
+        call_command('auto_allocate', stdout=StringIO())
+        self.unallocated_request.refresh_from_db()
+        self.assertTrue(self.unallocated_request.allocated)
+
+    def create_student(self, username: str, days: list[Day]) -> User:
+        student = User.objects.create_user(username=username, email=f'{username[1:]}@example.org',
+                                           password='Password123', first_name='Test', last_name='Student',
+                                           user_type=User.ACCOUNT_TYPE_STUDENT, student_max_rate=30)
+        student.availability.set(days)
+        return student
+
+    def create_request(self, student: User, term: str = 'January', group_request_id: int = -1) -> Request:
+        lesson_request = Request.objects.create(student=student, knowledge_area='Python', term=term,
+                                                frequency='Weekly', duration='1h', group_request_id=group_request_id)
+        lesson_request.venue_preference.add(self.online)
+        return lesson_request
@@ -0,0 +1,113 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+
+from admin_functions.helpers.eligibility_index import TutorEligibilityIndex, eligibility_index
+from user_system.models.day_model import Day
+from user_system.models.knowledge_area_model import KnowledgeArea
+from user_system.models.user_model import User
+
+
+class EligibilityIndexTestMixin:
+    def create_tutor(self, username: str, rate: float, subjects: list[str], days: list[Day]) -> User:
+        tutor = User.objects.create_user(username=username, email=f'{username[1:]}@example.org', password='Password123',
+                                         first_name='Test', last_name='Tutor', user_type=User.ACCOUNT_TYPE_TUTOR,
+                                         hourly_rate=rate)
+        tutor.availability.set(days)
+        for subject in subjects:
+            KnowledgeArea.objects.create(user=tutor, subject=subject)
+        return tutor
+
+
+class TestEligibilityIndex(EligibilityIndexTestMixin, TestCase):
+    def setUp(self):
+        self.index = TutorEligibilityIndex()
+        self.monday = Day.objects.get(day='Monday')
+        self.tuesday = Day.objects.get(day='Tuesday')
+        self.cheap = self.create_tutor('@cheap', 10, ['Python'], [self.monday, self.tuesday])
+        self.expensive = self.create_tutor('@expensive', 40, ['Python', 'Java'], [self.monday])
+
+    def test_tutors_are_returned_cheapest_first(self):
+        ids = self.index.eligible_tutor_ids('Python', [self.monday.id], Decimal('50'))
+        self.assertEqual(ids, [self.cheap.id, self.expensive.id])
+
+    def test_max_rate_cuts_expensive_tutors(self):
+        ids = self.index.eligible_tutor_ids('Python', [self.monday.id], Decimal('20'))
+        self.assertEqual(ids, [self.cheap.id])
+
+    def test_max_rate_is_inclusive(self):
+        ids = self.index.eligible_tutor_ids('Python', [self.monday.id], Decimal('10'))
+        self.assertEqual(ids, [self.cheap.id])
+
+    def test_tutor_must_teach_subject(self):
+        ids = self.index.eligible_tutor_ids('Java', [self.monday.id], Decimal('50'))
+        self.assertEqual(ids, [self.expensive.id])
+
+    def test_tutor_must_be_available_on_every_day(self):
+        ids = self.index.eligible_tutor_ids('Python', [self.monday.id, self.tuesday.id], Decimal('50'))
+        self.assertEqual(ids, [self.cheap.id])
+
+    def test_no_days_or_max_rate_returns_nothing(self):
+        self.assertEqual(self.index.eligible_tutor_ids('Python', [], Decimal('50')), [])
+        self.assertEqual(self.index.eligible_tutor_ids('Python', [self.monday.id], None), [])
+
+    def test_changes_inside_a_transaction_are_seen(self):
+        self.cheap.availability.remove(self.monday)
+        ids = self.index.eligible_tutor_ids('Python', [self.monday.id], Decimal('50'))
+        self.assertEqual(ids, [self.expensive.id])
+
+
+class TestEligibilityIndexSignals(EligibilityIndexTestMixin, TransactionTestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.monday = Day.objects.get(day='Monday')
+        self.tuesday = Day.objects.get(day='Tuesday')
+        self.tutor = self.create_tutor('@tutor', 20, ['Python'], [self.monday])
+        eligibility_index.invalidate()
+        self.assertEqual(self.lookup('Python', self.monday), [self.tutor.id])
+
+    def tearDown(self):
+        eligibility_index.invalidate()
+
+    def test_index_is_patched_when_knowledge_area_is_added(self):
+        KnowledgeArea.objects.create(user=self.tutor, subject='Java')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Java', self.monday), [self.tutor.id])
+
+    def test_index_is_patched_when_knowledge_area_is_removed(self):
+        KnowledgeArea.objects.filter(user=self.tutor, subject='Python').get().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Python', self.monday), [])
+
+    def test_index_is_patched_when_availability_changes(self):
+        self.tutor.availability.add(self.tuesday)
+        self.tutor.availability.remove(self.monday)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Python', self.tuesday), [self.tutor.id])
+            self.assertEqual(self.lookup('Python', self.monday), [])
+
+    def test_index_is_patched_when_hourly_rate_changes(self):
+        self.tutor.hourly_rate = 60
+        self.tutor.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Python', self.monday), [])
+
+    def test_index_is_patched_when_tutor_is_deleted(self):
+        self.tutor.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Python', self.monday), [])
+
+    def test_new_tutor_is_added_to_index(self):
+        other = self.create_tutor('@other', 15, ['Python'], [self.monday])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('Python', self.monday), [other.id, self.tutor.id])
+
+    def test_saving_other_fields_does_not_touch_index(self):
+        with patch.object(eligibility_index, 'update_tutor') as update_tutor:
+            self.client.login(username=self.tutor.username, password='Password123')
+        update_tutor.assert_not_called()
+
+    def lookup(self, subject: str, day: Day) -> list[int]:
+        return eligibility_index.eligible_tutor_ids(subject, [day.id], Decimal('50'))
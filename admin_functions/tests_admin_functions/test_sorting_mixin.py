@@ -1,5 +1,6 @@
 from admin_functions.helpers.mixins import SortingMixin
 from admin_functions.models import DummyModel
+from calendar_scheduler.models import Booking
 from django.test import TestCase
 
 
@@ -25,3 +26,9 @@ class SortingMixinTest(TestCase):
     def test_is_string_field_invalid_field_name(self):
         result = self.view._is_string_field('invalid_field', DummyModel)
         self.assertFalse(result)
+
+    def test_is_string_field_follows_relations(self):
+        self.assertTrue(self.view._is_string_field('student__last_name', Booking))
+        self.assertFalse(self.view._is_string_field('student__hourly_rate', Booking))
+        self.assertFalse(self.view._is_string_field('student__invalid_field', Booking))
+        self.assertFalse(self.view._is_string_field('knowledge_area__subject', Booking))
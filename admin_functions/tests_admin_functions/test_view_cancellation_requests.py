@@ -51,3 +51,83 @@ class ViewCancellationRequestsTestCase(TestCase):
         response = self.client.get(reverse('view_cancellation_requests'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'view_cancellation_requests.html')
+
+    # Test that the queue is sorted by lesson date by default and that name columns can be sorted.
+    def test_sorting_requests(self):
+        other_student = User.objects.create_user(username='@aaron', email='aaron@example.org', password='Password123',
+                                                 first_name='Aaron', last_name='Zed', user_type=User.ACCOUNT_TYPE_STUDENT)
+        early = Booking.objects.create(student=other_student, tutor=self.tutor, lesson_identifier=2,
+                                       date=date(2024, 11, 1), cancellation_requested=True)
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.get(reverse('view_cancellation_requests'))
+        self.assertEqual(list(response.context['cancelled']), [early, self.booking_sep])
+        response = self.client.get(reverse('view_cancellation_requests'), {'sort': '-student__last_name'})
+        self.assertEqual(list(response.context['cancelled']), [early, self.booking_sep])
+        response = self.client.get(reverse('view_cancellation_requests'), {'sort': 'student__first_name'})
+        self.assertEqual(list(response.context['cancelled']), [early, self.booking_sep])
+
+    # Test that rendering the queue does not load the users of each request separately.
+    def test_queue_queries_do_not_depend_on_requests(self):
+        Booking.objects.bulk_create(Booking(student=self.student, tutor=self.tutor, lesson_identifier=i,
+                                            date=date(2024, 12, 4), cancellation_requested=True) for i in range(10))
+        self.client.login(username=self.admin.username, password='Password123')
+        with self.assertNumQueries(4):  # session, user, count, requests
+            self.client.get(reverse('view_cancellation_requests'))
+
+
+class BulkCancellationRequestsViewTestCase(TestCase):
+    def setUp(self):
+        create_test_users.create_test_users()
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.requested = [Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=1,
+                                                 date=date(2024, 12, day), cancellation_requested=True)
+                          for day in (2, 9, 16)]
+        self.not_requested = Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=1,
+                                                    date=date(2024, 12, 23))
+        self.url = reverse('bulk_cancellation_requests')
+
+    def test_bulk_accept(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.post(self.url, {'cancellation': 'accept', 'lessons': [
+            self.requested[0].id, self.requested[1].id, self.not_requested.id]}, follow=True)
+        self.assertRedirects(response, reverse('view_cancellation_requests'))
+        self.assertEqual(list(Booking.objects.order_by('id')), [self.requested[2], self.not_requested])
+        self.assertContains(response, "2 cancellation requests accepted.")
+
+    # Test that selected ids which are not numbers are ignored instead of failing.
+    def test_bulk_accept_ignores_invalid_ids(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.post(self.url, {'cancellation': 'accept', 'lessons': [
+            self.requested[0].id, 'abc', '-1', '']}, follow=True)
+        self.assertRedirects(response, reverse('view_cancellation_requests'))
+        self.assertFalse(Booking.objects.filter(id=self.requested[0].id).exists())
+        self.assertContains(response, "1 cancellation request accepted.")
+
+    def test_bulk_reject(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.post(self.url, {'cancellation': 'reject', 'lessons': [
+            booking.id for booking in self.requested]}, follow=True)
+        self.assertEqual(Booking.objects.count(), 4)
+        self.assertFalse(Booking.objects.filter(cancellation_requested=True).exists())
+        self.assertContains(response, "3 cancellation requests rejected.")
+
+    # Test that the whole selection is rejected with a single update.
+    def test_bulk_reject_queries_do_not_depend_on_selection(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        with self.assertNumQueries(6):  # session, user, savepoint, users involved, update, release
+            self.client.post(self.url, {'cancellation': 'reject', 'lessons': [booking.id for booking in self.requested]})
+
+    def test_invalid_action(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.post(self.url, {'cancellation': 'invalid', 'lessons': [self.requested[0].id]},
+                                    follow=True)
+        self.assertContains(response, "Invalid action.")
+        self.assertEqual(Booking.objects.filter(cancellation_requested=True).count(), 3)
+
+    def test_non_admin_not_allowed(self):
+        self.client.login(username=self.tutor.username, password='Password123')
+        response = self.client.post(self.url, {'cancellation': 'accept', 'lessons': [self.requested[0].id]})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Booking.objects.count(), 4)
@@ -1,6 +1,8 @@
 from django.urls.conf import path
 
 from .views.allocate_requests import AllocateRequestView
+from .views.allocation_options import AllocationOptionsView
+from .views.auto_allocate import auto_allocate_requests
 from .views.make_user_admin import ConfirmMakeUserAdmin, MakeUserAdmin
 from .views.small_views import admin_dash
 from .views.view_all_users import AllUsersView
@@ -13,4 +15,7 @@ urlpatterns = [
          name="confirm_make_admin"),
     path("allocate_request/<int:request_id>/", AllocateRequestView.as_view(),
          name="allocate_request"),
+    path("allocate_request/<int:request_id>/options/", AllocationOptionsView.as_view(),
+         name="allocation_options"),
+    path("allocate_requests/auto/", auto_allocate_requests, name="auto_allocate_requests"),
 ]
@@ -1,17 +1,16 @@
-from functools import partial
-
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, QuerySet
+from django.db import transaction
+from django.db.models import Case, QuerySet, When
 from django.http import HttpResponseBadRequest
 from django.http.request import HttpRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
 
 from admin_functions.forms import AllocationForm
+from admin_functions.helpers.eligibility_index import eligibility_index
 from request_handler.models.request_model import Request
 from request_handler.models.venue_model import Venue
 from user_system.models.day_model import Day
-from user_system.models.knowledge_area_model import KnowledgeArea
 from user_system.models.user_model import User
 
 
@@ -45,6 +44,7 @@ class AllocateRequestView(LoginRequiredMixin, View):
             "venue": venue,
             "lesson_request": lesson_request,
             "venue_preferences": venue_preference_str(venues),
+            "heatmap": get_availability_heatmap(lesson_request),
         })
 
     def post(self, http_request, request_id):
@@ -65,7 +65,10 @@ class AllocateRequestView(LoginRequiredMixin, View):
         form = create_form_post(lesson_request, day1_id, day2_id, venues, http_request.POST)
 
         valid_form = form.is_valid()
-        if valid_form and process_allocation(form, lesson_request, day1_id, day2_id): 
+        result = process_allocation(form, lesson_request, day1_id, day2_id) if valid_form else None
+        if result == "Conflict":
+            return render(http_request, 'already_allocated_error.html', status=409)
+        elif result:
             return HttpResponseBadRequest(form.errors)
         elif valid_form:
             return redirect("view_requests")
@@ -150,36 +153,43 @@ def get_venue_preference(venue_preference: QuerySet) -> QuerySet:
 
 def get_suitable_tutors(request_id: int, day1_id: int, day2_id: int) -> QuerySet:
     """ Returns any tutors from the database which are suitable to be allocated to the request 
-    Depends on their day availability, knowledge_areas and hourly rates
+    Depends on their day availability, knowledge_areas and hourly rates.
+    Tutors are looked up in the process-local eligibility index, so only the matching tutors are fetched.
     """
-    lesson_request = get_object_or_404(Request, id=request_id)
-    if find_impediments(day1_id, lesson_request.frequency, day2_id):
+    lesson_request = get_object_or_404(Request.objects.select_related('student'), id=request_id)
+    if lesson_request.student is None or find_impediments(day1_id, lesson_request.frequency, day2_id):
         return User.objects.none()
 
-    student = lesson_request.student
-    knowledge_area = lesson_request.knowledge_area
-    knowledge_area_ids = KnowledgeArea.objects.filter(subject=knowledge_area).values_list('id', flat=True)
-    max_hourly_rate = student.student_max_rate
-
-    availability_query = get_availability(lesson_request, day1_id, day2_id)
-
-    return get_tutors(knowledge_area_ids, max_hourly_rate, availability_query)
+    day_ids = [day1_id, day2_id] if lesson_request.frequency == 'Biweekly' else [day1_id]
+    tutor_ids = eligibility_index.eligible_tutor_ids(lesson_request.knowledge_area, day_ids,
+                                                     lesson_request.student.student_max_rate)
+    if not tutor_ids:
+        return User.objects.none()
+    # The index lists tutors cheapest first, which the queryset keeps
+    return User.objects.filter(id__in=tutor_ids).order_by(
+        Case(*[When(id=tutor_id, then=position) for position, tutor_id in enumerate(tutor_ids)]))
 
 
-def get_availability(lesson_request, day1_id, day2_id):
-    if lesson_request.frequency == 'Biweekly':
-        return partial(Day.objects.filter, Q(id=day1_id) | Q(id=day2_id))
-    else:
-        return partial(Day.objects.filter, id=day1_id)
+def get_availability_heatmap(lesson_request: Request) -> dict:
+    """ Returns how many tutors are suitable for each of the student's available days.
 
-
-def get_tutors(knowledge_area_ids, max_hourly_rate, availability_query):
-    return User.objects.filter(
-        user_type="Tutor",
-        knowledgearea__in=knowledge_area_ids,
-        availability__in=availability_query(),
-        hourly_rate__lte=max_hourly_rate,
-    ).distinct()
+    For Biweekly requests, the number of tutors suitable for each pair of days is also returned, as a matrix whose rows
+    and columns follow the order of the days. Counts come from the eligibility index, so no query is made per day.
+    """
+    biweekly = lesson_request.frequency == 'Biweekly'
+    if lesson_request.student is None:  # The student has been deleted, so there are no days to allocate
+        return {"days": [], "rows": [], "biweekly": biweekly}
+    days = sorted(lesson_request.student.availability.all(), key=lambda day: day.id)
+    subject = lesson_request.knowledge_area
+    max_rate = lesson_request.student.student_max_rate
+
+    rows = []
+    for day in days:
+        pairs = [None if other == day else len(eligibility_index.eligible_tutor_ids(subject, [day.id, other.id], max_rate))
+                 for other in days] if biweekly else []
+        rows.append({"day": day, "count": len(eligibility_index.eligible_tutor_ids(subject, [day.id], max_rate)),
+                     "pairs": pairs})
+    return {"days": days, "rows": rows, "biweekly": biweekly}
 
 
 def find_impediments(day1_id, frequency, day2_id) -> bool:
@@ -191,20 +201,19 @@ def find_impediments(day1_id, frequency, day2_id) -> bool:
 def get_grouped_requests(id):
     return Request.objects.filter(group_request_id=id).all()
 
-def _allocate(lesson_request: Request, tutor: User, venue: Venue, day1: Day, day2: Day) -> None:
+def _order_days(frequency: str, day1: Day, day2: Day) -> tuple[Day, Day | None]:
+    """Returns the allocated day(s) of a request, ensuring that for Biweekly requests day1 is before day2."""
+    if frequency != 'Biweekly':
+        return day1, None
     weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    if lesson_request.frequency == 'Biweekly' and weekdays.index(day1.day) < weekdays.index(day2.day):
-        # Ensure day1 is before day2
-        lesson_request.day = day1
-        lesson_request.day2 = day2
-    elif lesson_request.frequency == 'Biweekly' and weekdays.index(day1.day) > weekdays.index(day2.day):
-        lesson_request.day = day2
-        lesson_request.day2 = day1
-    else:
-        lesson_request.day = day1
+    if weekdays.index(day1.day) > weekdays.index(day2.day):
+        return day2, day1
+    return day1, day2
+
 
+def _allocate(lesson_request: Request, tutor: User, venue: Venue, day1: Day, day2: Day) -> None:
+    lesson_request.day, lesson_request.day2 = _order_days(lesson_request.frequency, day1, day2)
     lesson_request.tutor = tutor
-    lesson_request.day = day1
     lesson_request.venue = venue
     lesson_request.allocated = True
     lesson_request.save()
@@ -229,8 +238,49 @@ def process_allocation(form, lesson_request, day1_id, day2_id):
     else:
         day1 = Day.objects.get(id=day1_id) if day1_id else None
         day2 = Day.objects.get(id=day2_id) if day2_id else None
-        requests = get_grouped_requests(lesson_request.group_request_id)
-        for request in requests:
-            _allocate(request, tutor, venue, day1, day2)
-            _update_availabilities(request, day1, day2)
-        return None
\ No newline at end of file
+        if not commit_allocation(lesson_request, tutor, venue, day1, day2):
+            return "Conflict"
+        return None
+
+
+def commit_allocation(lesson_request: Request, tutor: User, venue: Venue, day1: Day, day2: Day) -> bool:
+    """Allocates every request in the lesson request's group to the given tutor, venue and day(s) as one atomic unit.
+
+    The group's rows are locked, the allocated days are taken out of the tutor's availability, then all of the requests
+    are updated in a single statement which only applies to unallocated requests, and the days are removed from the
+    students' availability. If any request in the group has already been allocated, or the tutor is no longer available
+    on one of the days (e.g. because another Admin allocated them at the same time), nothing is changed.
+    Requests without a group (group_request_id of -1, e.g. rejected requests) are allocated on their own.
+    :return: True if the group was allocated, False if it or the tutor's day(s) had been taken already.
+    """
+    if lesson_request.group_request_id == -1:
+        group = Request.objects.filter(pk=lesson_request.pk)
+    else:
+        group = get_grouped_requests(lesson_request.group_request_id)
+    first_day, second_day = _order_days(lesson_request.frequency, day1, day2)
+    day_ids = [day.id for day in (first_day, second_day) if day]
+
+    with transaction.atomic():
+        locked = list(group.select_for_update().values_list('allocated', 'student_id'))
+        if not locked or any(allocated for allocated, _ in locked):
+            return False
+
+        # The tutor's availability may be out of date wherever it was read (e.g. the eligibility index of another
+        # process), so the delete itself checks that the tutor still has every day: a day taken by a concurrent
+        # allocation is no longer there to delete.
+        removed, _ = User.availability.through.objects.filter(user_id=tutor.id, day_id__in=day_ids).delete()
+        if removed != len(day_ids):
+            transaction.set_rollback(True)
+            return False
+
+        updated = group.filter(allocated=False).update(tutor=tutor, venue=venue, day=first_day, day2=second_day,
+                                                       allocated=True)
+        if updated != len(locked):
+            transaction.set_rollback(True)
+            return False
+
+        student_ids = {student_id for _, student_id in locked if student_id} - {tutor.id}
+        User.availability.through.objects.filter(user_id__in=student_ids, day_id__in=day_ids).delete()
+        # Bulk deletes do not send m2m_changed, so the eligibility index is told about the tutor's new availability here.
+        transaction.on_commit(lambda: eligibility_index.update_days(tutor.id, removed=set(day_ids)))
+    return True
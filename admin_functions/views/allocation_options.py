@@ -0,0 +1,78 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.views import View
+
+from admin_functions.forms import get_tutor_label
+from admin_functions.helpers.eligibility_index import eligibility_index
+from admin_functions.views.allocate_requests import get_venue_preference
+from request_handler.models.request_model import Request
+from user_system.models.user_model import User
+
+
+class AllocationOptionsView(LoginRequiredMixin, View):
+    """Class-based view returning every way in which a tutoring request can be allocated, as JSON.
+
+    The response lists every valid (day1, day2, venue) combination for the request together with the tutors who are
+    suitable for it, so that the allocation page can narrow down the choices on the client side instead of submitting
+    the form again after every selection.
+    """
+
+    def get(self, http_request, request_id):
+        lesson_request = get_object_or_404(Request.objects.select_related('student'), id=request_id)
+        if lesson_request.allocated:
+            return JsonResponse({'error': 'This request has already been allocated.'}, status=409)
+        return JsonResponse(get_allocation_options(lesson_request))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not request.user.is_admin:
+            return render(request, 'permission_denied.html', status=403)
+        return super().dispatch(request, *args, **kwargs)
+
+
+# -HELPERS- #
+def get_allocation_options(lesson_request: Request) -> dict:
+    """ Returns all valid allocation combinations for a request and the tutors suitable for each of them.
+
+    Tutors only depend on the day(s) of the allocation, so they are looked up once per day combination and shared by
+    all venues. Tutor details are listed once, and options refer to tutors by id.
+    A request without a student has no available days, and so no options.
+    """
+    days = []
+    if lesson_request.student is not None:
+        days = sorted(lesson_request.student.availability.all(), key=lambda day: day.id)
+    venues = sorted(get_venue_preference(lesson_request.venue_preference), key=lambda venue: venue.id)
+    if lesson_request.frequency == 'Biweekly':
+        day_combinations = [(day1, day2) for day1 in days for day2 in days if day1 != day2]
+    else:
+        day_combinations = [(day, None) for day in days]
+
+    tutors_by_days = {}
+    for day1, day2 in day_combinations:
+        day_ids = frozenset(day.id for day in (day1, day2) if day)
+        if day_ids not in tutors_by_days:
+            tutors_by_days[day_ids] = eligibility_index.eligible_tutor_ids(
+                lesson_request.knowledge_area, list(day_ids), lesson_request.student.student_max_rate)
+
+    tutor_ids = {tutor_id for ids in tutors_by_days.values() for tutor_id in ids}
+    tutors = User.objects.filter(id__in=tutor_ids).only('id', 'username', 'first_name', 'last_name', 'hourly_rate')
+
+    return {
+        'request': lesson_request.id,
+        'frequency': lesson_request.frequency,
+        'days': [{'id': day.id, 'day': day.day} for day in days],
+        'venues': [{'id': venue.id, 'venue': venue.venue} for venue in venues],
+        'tutors': {tutor.id: {'id': tutor.id, 'label': get_tutor_label(tutor), 'hourly_rate': str(tutor.hourly_rate)}
+                   for tutor in tutors},
+        'options': [
+            {
+                'day1': day1.id,
+                'day2': day2.id if day2 else None,
+                'venue': venue.id,
+                'tutors': tutors_by_days[frozenset(day.id for day in (day1, day2) if day)],
+            }
+            for day1, day2 in day_combinations for venue in venues
+        ],
+    }
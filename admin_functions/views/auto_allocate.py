@@ -0,0 +1,28 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
+from django.shortcuts import redirect, render
+
+from admin_functions.helpers.auto_allocator import auto_allocate
+
+
+@login_required
+def auto_allocate_requests(request: HttpRequest) -> HttpResponse:
+    """ View function to allocate all open tutoring requests in a single batch.
+
+    Only Admin users can trigger the batch allocation. As this alters the server's state, only POST requests are accepted.
+    Requests that cannot be allocated automatically are left untouched, so they can still be allocated by hand.
+    :param request: the HTTP request object.
+    :return: a redirection to the Admin dashboard.
+    """
+    if not request.user.is_admin:
+        return render(request, 'permission_denied.html', status=403)
+
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(["POST"], status=405, content=b'Not Allowed')
+
+    allocations, unallocated = auto_allocate()
+    messages.add_message(request, messages.SUCCESS,
+                         f"{len(allocations)} request(s) allocated automatically, "
+                         f"{len(unallocated)} request(s) left for manual allocation.")
+    return redirect('admin_dash')
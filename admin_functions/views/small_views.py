@@ -2,6 +2,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
 from django.shortcuts import render
 
+from request_handler.forms import RequestForm
 from request_handler.models.request_model import Request
 
 
@@ -29,6 +30,7 @@ def admin_dash(request: HttpRequest) -> HttpResponse:
         'rejected_allocations_count': rejected_allocations_count,
         'allocated_without_invoices_count': allocated_without_invoices_count,
         'unallocated_requests_count': unallocated_requests_count,
+        'invoice_terms': RequestForm.USER_TERM_CHOICES,
     }
 
     return render(request, 'admin_dashboard.html', context)
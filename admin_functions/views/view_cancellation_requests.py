@@ -1,27 +1,38 @@
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
-from django.shortcuts import render
+from django.shortcuts import redirect, render
+from django.template.defaultfilters import pluralize
+from django.utils import timezone
+from django.views import View
 from django.views.generic.list import ListView
 
 from admin_functions.helpers.mixins import SortingMixin
+from calendar_scheduler.helpers.calendar_cache import bump_calendar_versions_on_commit
 from calendar_scheduler.models import Booking
+from calendar_scheduler.views.cancel_lessons import delete_bookings
 
 
 class ViewCancellationRequests(LoginRequiredMixin, ListView, SortingMixin):
     """ Class-based view to display all lesson cancellations that a user has requested
     Cancellations are only requested when the lesson is less than two weeks away
     Only Admin users can access this page
+
+    Pending requests are read through a partial index, soonest lesson first, with the student and tutor joined in.
     """
     model = Booking
     context_object_name = 'cancelled'
     template_name = 'view_cancellation_requests.html'
     paginate_by = 20
-    valid_sort_fields = ['id', 'student__full_name', 'tutor__full_name']
+    valid_sort_fields = ['id', 'date', 'student__first_name', 'student__last_name', 'tutor__first_name',
+                         'tutor__last_name']
+    default_sort_field = 'date'
 
     def get_queryset(self):
         """Method that queries a cancelled bookings"""
-        queryset = super().get_queryset().filter(cancellation_requested=True).order_by('pk')
-        return queryset
+        queryset = super().get_queryset().filter(cancellation_requested=True).select_related('student', 'tutor')
+        return self.get_sorting_queryset(queryset)
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -32,3 +43,45 @@ class ViewCancellationRequests(LoginRequiredMixin, ListView, SortingMixin):
 
     def post(self, request: HttpRequest) -> HttpResponse:
         return HttpResponseNotAllowed("This URL only accepts GET requests.", status=405, content=b'Not Allowed')
+
+
+class BulkCancellationRequestsView(LoginRequiredMixin, View):
+    """ Class-based view to accept or reject several cancellation requests at once
+    Accepting removes the selected lessons with one DELETE, and rejecting clears their requests with one UPDATE.
+    Selected ids that are not numbers are ignored.
+    Only Admin users can access this page
+    """
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        lesson_ids = [int(lesson_id) for lesson_id in request.POST.getlist('lessons') if lesson_id.isdigit()]
+        lessons = Booking.objects.filter(id__in=lesson_ids, cancellation_requested=True)
+        match request.POST.get('cancellation'):
+            case 'accept':
+                count = delete_bookings(lessons)
+                messages.success(request, f"{count} cancellation request{pluralize(count)} accepted.")
+            case 'reject':
+                count = reject_cancellation_requests(lessons)
+                messages.success(request, f"{count} cancellation request{pluralize(count)} rejected.")
+            case _:
+                messages.error(request, "Invalid action.")
+        return redirect('view_cancellation_requests')
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not request.user.user_type == 'Admin':
+            return render(request, 'permission_denied.html', status=403)
+        return super().dispatch(request, *args, **kwargs)
+
+
+# -HELPERS- #
+def reject_cancellation_requests(lessons) -> int:
+    """Clears the cancellation requests of the given lessons, returning how many were rejected.
+
+    A queryset update sends no signals, so the cached calendars of the students and tutors involved are invalidated here.
+    """
+    with transaction.atomic():
+        users = set(lessons.values_list('student_id', 'tutor_id').distinct())
+        count = lessons.update(cancellation_requested=False, last_modified=timezone.now())
+        bump_calendar_versions_on_commit(*{user_id for pair in users for user_id in pair})
+    return count
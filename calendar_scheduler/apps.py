@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CalendarSchedulerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calendar_scheduler'
+
+    def ready(self):
+        from calendar_scheduler import signals  # noqa: F401
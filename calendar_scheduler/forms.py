@@ -0,0 +1,47 @@
+import django.forms as forms
+from django.db.models import Count, Max, Min
+
+from calendar_scheduler.models import Booking
+from request_handler.models.venue_model import Venue
+from user_system.models.user_model import User
+
+
+class BulkCancellationForm(forms.Form):
+    """Class to represent the form which Admins use to cancel every lesson matching a filter at once.
+
+    Lessons are selected by a date range, optionally narrowed down to a venue, a tutor and/or a knowledge area.
+    """
+
+    start_date = forms.DateField(label='From', widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(label='To', widget=forms.DateInput(attrs={'type': 'date'}))
+    venue = forms.ModelChoiceField(queryset=Venue.objects.all(), label='Venue', required=False)
+    tutor = forms.ModelChoiceField(queryset=User.objects.filter(user_type=User.ACCOUNT_TYPE_TUTOR)
+                                   .order_by('last_name', 'first_name'), label='Tutor', required=False)
+    knowledge_area = forms.CharField(label='Knowledge Area', max_length=255, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'The end date cannot be before the start date.')
+        return cleaned_data
+
+    def get_bookings(self):
+        """Returns the bookings matching the filter. The form must be valid."""
+        bookings = Booking.objects.filter(date__range=(self.cleaned_data['start_date'], self.cleaned_data['end_date']))
+        if self.cleaned_data['venue']:
+            bookings = bookings.filter(venue=self.cleaned_data['venue'])
+        if self.cleaned_data['tutor']:
+            bookings = bookings.filter(tutor=self.cleaned_data['tutor'])
+        if self.cleaned_data['knowledge_area']:
+            bookings = bookings.filter(knowledge_area__iexact=self.cleaned_data['knowledge_area'].strip())
+        return bookings
+
+    def get_summary(self):
+        """Returns the lesson groups (lesson_identifier) affected by the filter, with how many of their lessons match."""
+        return list(self.get_bookings()
+                    .values('lesson_identifier', 'knowledge_area', 'student__first_name', 'student__last_name',
+                            'tutor__first_name', 'tutor__last_name')
+                    .annotate(lessons=Count('id'), first_date=Min('date'), last_date=Max('date'))
+                    .order_by('lesson_identifier'))
@@ -0,0 +1,105 @@
+""" Helpers caching the data shown in the calendar views.
+
+Cached months are keyed by a per-user version counter rather than deleted one by one: whenever a booking changes, the
+versions of its student and tutor (and of the admin "all bookings" calendar) are bumped, so every month cached for them
+is simply never looked up again and expires on its own.
+The versions have to be seen by every process serving the calendar, so months are only cached when the cache is shared
+between processes (see settings.CALENDAR_CACHE_MONTHS).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from schedule.models import Calendar
+
+ALL_BOOKINGS = 'all'
+_TIMEOUT = getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 3600)
+_batch = threading.local()
+
+
+def get_calendar_version(target) -> int:
+    """Returns the current version of the calendar of a user id (or ALL_BOOKINGS)."""
+    key = _version_key(target)
+    version = cache.get(key)
+    if version is None:
+        # Versions start from the current time, so a counter lost from the cache is never reused
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_calendar_versions(*targets) -> None:
+    """Invalidates every month cached for the given user ids (and for ALL_BOOKINGS, which is always bumped)."""
+    for target in {*targets, ALL_BOOKINGS}:
+        if target is None:
+            continue
+        try:
+            cache.incr(_version_key(target))
+        except ValueError:
+            cache.set(_version_key(target), time.time_ns(), timeout=None)
+
+
+def bump_calendar_versions_on_commit(*targets) -> None:
+    """Bumps the versions now and again once the current transaction commits.
+
+    The first bump stops this process from serving the old data straight away, and the second one drops anything that
+    another request cached from the database before the change became visible to it.
+    Inside a batched_calendar_bumps block, the targets are only collected, to be bumped once when the block exits.
+    """
+    batch = getattr(_batch, 'targets', None)
+    if batch is not None:
+        batch.update(targets)
+        return
+    bump_calendar_versions(*targets)
+    transaction.on_commit(lambda: bump_calendar_versions(*targets))
+
+
+@contextmanager
+def batched_calendar_bumps():
+    """Context manager bumping each version bumped inside it once, when it exits without an error.
+
+    Deleting many bookings sends one signal per booking, most of them for the same few users, so bulk deletes run
+    inside this block to bump each user once. Nested blocks are part of the outermost one.
+    """
+    if getattr(_batch, 'targets', None) is not None:
+        yield
+        return
+    _batch.targets = set()
+    try:
+        yield
+    finally:
+        targets, _batch.targets = _batch.targets, None
+    bump_calendar_versions_on_commit(*targets)
+
+
+def get_cached_month_events(viewer, target, year: int, month: int, load_events):
+    """Returns the events of a month as shown to viewer, calling load_events only if they are not cached yet."""
+    if not settings.CALENDAR_CACHE_MONTHS:
+        return load_events()
+    key = f'calendar_events:{viewer.id}:{target}:{year}:{month}:{get_calendar_version(target)}'
+    events = cache.get(key)
+    if events is None:
+        events = load_events()
+        cache.set(key, events, timeout=_TIMEOUT)
+    return events
+
+
+def get_scheduler_calendar(slug: str) -> Calendar:
+    """Returns the django-scheduler calendar with the given slug, raising Calendar.DoesNotExist if there is none."""
+    key = f'scheduler_calendar:{slug}'
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = Calendar.objects.get(slug=slug)
+        cache.set(key, calendar, timeout=_TIMEOUT)
+    return calendar
+
+
+def forget_scheduler_calendar(slug: str) -> None:
+    cache.delete(f'scheduler_calendar:{slug}')
+
+
+def _version_key(target) -> str:
+    return f'calendar_version:{target}'
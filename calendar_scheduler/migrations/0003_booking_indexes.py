@@ -0,0 +1,25 @@
+# Generated by Django 4.0.6 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_scheduler', '0002_booking_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date'], name='booking_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['tutor', 'date'], name='booking_tutor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'date'], name='booking_venue_date_idx'),
+        ),
+    ]
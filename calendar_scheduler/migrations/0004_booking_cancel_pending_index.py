@@ -0,0 +1,17 @@
+# Generated by Django 4.0.6 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_scheduler', '0003_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('cancellation_requested', True)), fields=['date', 'id'], name='booking_cancel_pending_idx'),
+        ),
+    ]
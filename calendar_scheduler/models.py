@@ -30,6 +30,17 @@ class Booking(models.Model):
     date = models.DateField(null=False, blank=False, default=datetime.date(1900, 1, 1))
     title = models.CharField(max_length=255, null=False, default="Tutor session")
     cancellation_requested = models.BooleanField(blank=False, default=False)
+    last_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='booking_date_idx'),
+            models.Index(fields=['tutor', 'date'], name='booking_tutor_date_idx'),
+            models.Index(fields=['venue', 'date'], name='booking_venue_date_idx'),
+            # Only the few bookings waiting for a cancellation decision are indexed
+            models.Index(fields=['date', 'id'], condition=models.Q(cancellation_requested=True),
+                         name='booking_cancel_pending_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} is taught by {self.tutor} in the term {self.term}."
@@ -0,0 +1,35 @@
+""" Signal handlers that invalidate the cached calendar data when bookings (or the scheduler calendars) change.
+
+Deleting bookings in bulk sends one signal per booking, so bulk deletes should run inside batched_calendar_bumps (see
+calendar_scheduler.views.cancel_lessons.delete_bookings) to bump each user once. Bulk queryset operations that send no
+signals (bulk_create and update) must call bump_calendar_versions_on_commit themselves.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from schedule.models import Calendar
+
+from calendar_scheduler.helpers.calendar_cache import bump_calendar_versions_on_commit, forget_scheduler_calendar
+from calendar_scheduler.models import Booking
+from user_system.models.user_model import User
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    bump_calendar_versions_on_commit(instance.student_id, instance.tutor_id)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """The bookings of a deleted tutor are kept without a tutor by an update that sends no signals, so the calendars of
+    their students are invalidated here. Those of a deleted student are deleted, which their receiver handles.
+    """
+    student_ids = set(Booking.objects.filter(tutor_id=instance.id).values_list('student_id', flat=True).distinct())
+    if student_ids:
+        bump_calendar_versions_on_commit(*student_ids)
+
+
+@receiver(post_save, sender=Calendar)
+@receiver(post_delete, sender=Calendar)
+def scheduler_calendar_changed(sender, instance, **kwargs):
+    forget_scheduler_calendar(instance.slug)
@@ -0,0 +1,92 @@
+from datetime import date
+
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+
+from calendar_scheduler.models import Booking
+from request_handler.models.venue_model import Venue
+from user_system.fixtures import create_test_users
+from user_system.models.user_model import User
+
+
+class BulkCancelLessonsViewTests(TestCase):
+    def setUp(self):
+        create_test_users.create_test_users()
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.online = Venue.objects.create(venue="Online")
+        self.in_person = Venue.objects.create(venue="In Person")
+        for day in (2, 9, 16):
+            Booking.objects.create(lesson_identifier=1, student=self.student, tutor=self.tutor, knowledge_area="Python",
+                                   venue=self.online, date=date(2024, 9, day))
+        Booking.objects.create(lesson_identifier=2, student=self.student, tutor=self.tutor, knowledge_area="Java",
+                               venue=self.in_person, date=date(2024, 9, 3))
+        Booking.objects.create(lesson_identifier=3, student=self.student, tutor=self.tutor, knowledge_area="Python",
+                               venue=self.online, date=date(2024, 10, 7))
+        self.url = reverse('bulk_cancel_lessons')
+        self.data = {'start_date': '2024-09-01', 'end_date': '2024-09-30'}
+
+    def test_admin_sees_form(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'bulk_cancel_lessons.html')
+        self.assertNotIn('preview', response.context)
+
+    # Test that submitting the filter only shows what would be cancelled.
+    def test_preview_is_a_dry_run(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['preview'])
+        self.assertEqual(response.context['total'], 4)
+        summary = {group['lesson_identifier']: group for group in response.context['summary']}
+        self.assertEqual(set(summary), {1, 2})
+        self.assertEqual(summary[1]['lessons'], 3)
+        self.assertEqual(summary[1]['first_date'], date(2024, 9, 2))
+        self.assertEqual(summary[1]['last_date'], date(2024, 9, 16))
+        self.assertEqual(Booking.objects.count(), 5)
+
+    def test_preview_filters_by_venue_and_knowledge_area(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(self.url, {**self.data, 'venue': self.in_person.id})
+        self.assertEqual(response.context['total'], 1)
+        response = self.client.post(self.url, {**self.data, 'knowledge_area': 'python'})
+        self.assertEqual(response.context['total'], 3)
+
+    def test_preview_filters_by_tutor(self):
+        other_tutor = User.objects.create_user(username='@other_tutor', email='other@example.org', password='Password123',
+                                               first_name='Other', last_name='Tutor', user_type=User.ACCOUNT_TYPE_TUTOR)
+        Booking.objects.create(lesson_identifier=4, student=self.student, tutor=other_tutor, date=date(2024, 9, 4))
+        self.client.force_login(self.admin)
+        response = self.client.post(self.url, {**self.data, 'tutor': other_tutor.id})
+        self.assertEqual(response.context['total'], 1)
+
+    # Test that confirming deletes the matching lessons.
+    def test_confirm_cancels_lessons(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(self.url, {**self.data, 'knowledge_area': 'Python', 'confirm': 'true'}, follow=True)
+        self.assertRedirects(response, self.url)
+        self.assertEqual(list(Booking.objects.values_list('lesson_identifier', flat=True).order_by('id')), [2, 3])
+        self.assertIn("3 lessons cancelled.", [str(message) for message in get_messages(response.wsgi_request)])
+
+    def test_end_date_before_start_date_is_invalid(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(self.url, {'start_date': '2024-09-30', 'end_date': '2024-09-01', 'confirm': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('end_date', response.context['form'].errors)
+        self.assertEqual(Booking.objects.count(), 5)
+
+    # Test that only admins can cancel lessons in bulk.
+    def test_non_admin_cannot_cancel_lessons(self):
+        self.client.force_login(self.tutor)
+        response = self.client.post(self.url, {**self.data, 'confirm': 'true'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, 'permission_denied.html')
+        self.assertEqual(Booking.objects.count(), 5)
+
+    def test_unauthenticated_user_is_redirected(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
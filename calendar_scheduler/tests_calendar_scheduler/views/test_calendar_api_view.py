@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+
+from calendar_scheduler.models import Booking
+from calendar_scheduler.views.calendar import get_week_days
+from request_handler.models.venue_model import Venue
+from user_system.fixtures import create_test_users
+from user_system.models.user_model import User
+
+
+class CalendarEventsApiViewTests(TestCase):
+    def setUp(self):
+        create_test_users.create_test_users()
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.online, _ = Venue.objects.get_or_create(venue='Online')
+        self.url = reverse('calendar_events_api')
+        self.in_window = Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=1,
+                                                date=date(2024, 9, 2), venue=self.online, knowledge_area='Python')
+        Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=1, date=date(2024, 10, 2))
+        Booking.objects.create(student=self.student, lesson_identifier=2, date=date(2024, 9, 3))
+
+    # Test that only the bookings of the user in the window are returned, as plain values.
+    def test_tutor_gets_events_in_window(self):
+        self.client.force_login(self.tutor)
+        response = self.client.get(self.url, {'start': '2024-09-01', 'end': '2024-09-30'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['start'], data['end']), ('2024-09-01', '2024-09-30'))
+        self.assertEqual(len(data['events']), 1)
+        event = data['events'][0]
+        self.assertEqual(event['id'], self.in_window.id)
+        self.assertEqual(event['date'], '2024-09-02')
+        self.assertEqual(event['venue'], 'Online')
+        self.assertEqual(event['knowledge_area'], 'Python')
+
+    # Test that the events are loaded with a single query.
+    def test_events_are_loaded_in_one_query(self):
+        self.client.force_login(self.student)
+        with self.assertNumQueries(3):  # session, user, bookings
+            response = self.client.get(self.url, {'start': '2024-09-01', 'end': '2024-10-31'})
+        self.assertEqual(len(response.json()['events']), 3)
+
+    # Test that the window defaults to the current week.
+    def test_window_defaults_to_current_week(self):
+        self.client.force_login(self.student)
+        data = self.client.get(self.url).json()
+        week = get_week_days()
+        self.assertEqual((data['start'], data['end']), (week[0].isoformat(), week[-1].isoformat()))
+
+    # Test that an admin can see all bookings, or those of one user.
+    def test_admin_gets_events(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {'start': '2024-09-01', 'end': '2024-09-30'})
+        self.assertEqual(len(response.json()['events']), 2)
+        response = self.client.get(self.url, {'start': '2024-09-01', 'end': '2024-09-30', 'user': self.tutor.id})
+        self.assertEqual(len(response.json()['events']), 1)
+
+    # Test that other users cannot see someone else's calendar.
+    def test_non_admin_cannot_select_user(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, {'user': self.tutor.id})
+        self.assertEqual(response.status_code, 403)
+
+    # Test that invalid windows are rejected.
+    def test_invalid_windows(self):
+        self.client.force_login(self.student)
+        for params in ({'start': 'yesterday'}, {'start': '2024-09-30', 'end': '2024-09-01'},
+                       {'start': '2024-01-01', 'end': '2024-12-31'}, {'user': 'someone'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+
+    # Test that unauthenticated users are redirected to log in.
+    def test_unauthenticated_user_is_redirected(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -1,11 +1,16 @@
 from datetime import date, timedelta
 
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from schedule.models import Calendar
 
+from calendar_scheduler.helpers.calendar_cache import bump_calendar_versions, get_calendar_version
 from calendar_scheduler.models import Booking
-from calendar_scheduler.views.calendar import get_month_days, get_week_days, produce_month_events
+from calendar_scheduler.views.calendar import build_calendar_weeks, get_month_days, get_week_days, \
+    produce_month_events, produce_month_summary
+from calendar_scheduler.views.cancel_lessons import delete_bookings
+from request_handler.models.venue_model import Venue
 from user_system.fixtures import create_test_users
 from user_system.models.user_model import User
 
@@ -43,8 +48,10 @@ class CalendarHelperTests(TestCase):
         self.assertEqual(week_days[0], today - timedelta(days=today.weekday()))  # Start of the week
 
 
+@override_settings(CALENDAR_CACHE_MONTHS=True)
 class CalendarViewTests(TestCase):
     def setUp(self):
+        cache.clear()
         # Create users
         create_test_users.create_test_users()
         self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
@@ -83,9 +90,148 @@ class CalendarViewTests(TestCase):
         except ValueError:
             self.fail("produce_month_events raised ValueError unexpectedly!")
 
-        self.assertIsInstance(events, list) # Function should return a list
-        self.assertEqual(events, []) # No events expected
-        self.assertLessEqual(len(events), 29) # Ensure the loop ran only for valid days
+        self.assertIsInstance(events, dict) # Function should return a dictionary keyed by day
+        self.assertEqual(events, {}) # No events expected
+
+    # Test that events are bucketed by day, including the last day of long months.
+    def test_produce_month_events_buckets_by_day(self):
+        class MockRequest:
+            user = self.tutor
+        last_day = Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 31), lesson_identifier='3')
+        first_day = Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 1), lesson_identifier='4')
+        Booking.objects.create(tutor=self.tutor, date=date(2024, 11, 1), lesson_identifier='5')
+
+        with self.assertNumQueries(1):
+            events = produce_month_events(MockRequest(), 2024, 10, user_for_calendar=None)
+            self.assertEqual(events, {1: [first_day], 31: [last_day]})
+
+    # Test that each day of the grid only holds its own events.
+    def test_build_calendar_weeks(self):
+        weeks = build_calendar_weeks([['', 1], [2, 3]], {1: ['a'], 3: ['b', 'c']})
+        self.assertEqual(weeks, [[{"day": '', "events": []}, {"day": 1, "events": ['a']}],
+                                 [{"day": 2, "events": []}, {"day": 3, "events": ['b', 'c']}]])
+
+    # Test that event cards are cached until the booking changes.
+    def test_event_card_is_cached(self):
+        self.client.login(username=self.tutor.username, password='Password123')
+        self.client.get(reverse('tutor_calendar'))
+        # The month is loaded again, but the booking was not saved, so its card is still the cached one
+        Booking.objects.filter(id=self.booking_tutor.id).update(title="Renamed session")
+        bump_calendar_versions(self.tutor.id)
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertNotContains(response, "Renamed session")
+
+        self.booking_tutor.refresh_from_db()
+        self.booking_tutor.duration = "2h"
+        self.booking_tutor.save()
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, "Renamed session")
+        self.assertContains(response, "Duration: 2h")
+
+    # Test that navigating back to a month already seen does not query the bookings or the calendar again.
+    def test_repeat_month_navigation_is_cached(self):
+        self.client.login(username=self.tutor.username, password='Password123')
+        self.client.get(reverse('tutor_calendar'), {'year': 2024, 'month': 2})
+        with self.assertNumQueries(2):  # session, user
+            self.client.get(reverse('tutor_calendar'), {'year': 2024, 'month': 2})
+
+    # Test that months are loaded every time when the cache is not shared between processes.
+    @override_settings(CALENDAR_CACHE_MONTHS=False)
+    def test_months_are_not_cached_without_a_shared_cache(self):
+        self.client.login(username=self.tutor.username, password='Password123')
+        self.client.get(reverse('tutor_calendar'), {'year': 2024, 'month': 2})
+        with self.assertNumQueries(3):  # session, user, bookings
+            self.client.get(reverse('tutor_calendar'), {'year': 2024, 'month': 2})
+
+    # Test that changing a booking invalidates the cached months of its tutor.
+    def test_booking_change_invalidates_cached_month(self):
+        self.client.login(username=self.tutor.username, password='Password123')
+        self.client.get(reverse('tutor_calendar'))
+        Booking.objects.create(tutor=self.tutor, date=date.today(), lesson_identifier='77')
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, 'id="event-card-77"')
+
+        Booking.objects.filter(lesson_identifier='77').delete()
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertNotContains(response, 'id="event-card-77"')
+
+    # Test that deleting a tutor invalidates the cached months of their students, whose bookings lose their tutor.
+    def test_tutor_deletion_invalidates_student_months(self):
+        Booking.objects.create(tutor=self.tutor, student=self.student, date=date.today(), lesson_identifier='79')
+        student_version = get_calendar_version(self.student.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tutor.delete()
+        self.assertGreater(get_calendar_version(self.student.id), student_version)
+
+    # Test that deleting a student invalidates the cached months of the tutors of their (deleted) bookings.
+    def test_student_deletion_invalidates_tutor_months(self):
+        Booking.objects.create(tutor=self.tutor, student=self.student, date=date.today(), lesson_identifier='79')
+        tutor_version = get_calendar_version(self.tutor.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        self.assertGreater(get_calendar_version(self.tutor.id), tutor_version)
+
+    # Test that deleting many bookings bumps each of their users once (and again on commit), in a single delete query.
+    def test_deleting_bookings_bumps_each_user_once(self):
+        for day in range(1, 4):
+            Booking.objects.create(tutor=self.tutor, student=self.student, date=date(2024, 3, day),
+                                   lesson_identifier='78')
+        tutor_version, student_version = get_calendar_version(self.tutor.id), get_calendar_version(self.student.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(4):  # savepoint, users, delete, release
+                self.assertEqual(delete_bookings(Booking.objects.filter(lesson_identifier='78')), 3)
+        self.assertEqual(get_calendar_version(self.tutor.id), tutor_version + 2)
+        self.assertEqual(get_calendar_version(self.student.id), student_version + 2)
+
+    # Test that a booking change also invalidates the admin calendar of all bookings.
+    def test_booking_change_invalidates_all_bookings_calendar(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, f'<h6 id="day-summary-total-{date.today().day}">2 lessons</h6>')
+        Booking.objects.create(tutor=self.tutor, date=date.today(), lesson_identifier='77')
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, f'<h6 id="day-summary-total-{date.today().day}">3 lessons</h6>')
+
+    # Test that the calendar of all bookings only shows counts per day, from a single query.
+    def test_produce_month_summary(self):
+        online = Venue.objects.create(venue='Online')
+        Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 3), knowledge_area='Python', venue=online)
+        Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 3), knowledge_area='Python', venue=online)
+        Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 3), knowledge_area='Java')
+        Booking.objects.create(tutor=self.tutor, date=date(2024, 10, 31), knowledge_area='Java', venue=online)
+        with self.assertNumQueries(1):
+            summary = produce_month_summary(2024, 10)
+        self.assertEqual(summary, {
+            3: {'total': 3, 'venues': [('No venue', 1), ('Online', 2)], 'knowledge_areas': [('Java', 1), ('Python', 2)]},
+            31: {'total': 1, 'venues': [('Online', 1)], 'knowledge_areas': [('Java', 1)]},
+        })
+
+    # Test that the admin calendar of all bookings renders day summaries instead of event cards.
+    def test_admin_calendar_shows_day_summaries(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.get(reverse('student_calendar'))
+        self.assertNotContains(response, 'id="event-card-')
+        today = date.today()
+        self.assertContains(response, reverse('admin_day_bookings', args=[today.year, today.month, today.day]))
+
+    # Test that event cards link to the cancellation page of the calendar they are shown in.
+    def test_event_card_cancel_action(self):
+        self.client.login(username=self.admin.username, password='Password123')
+        response = self.client.get(reverse('admin_tutor_calendar', kwargs={'pk': self.tutor.pk}))
+        self.assertContains(response, f'action="{reverse("admin_calendar_cancel_lessons")}"')
+        self.client.login(username=self.tutor.username, password='Password123')
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, f'action="{reverse("tutor_cancel_lessons")}"')
+
+    # Test that the calendar is rendered with a constant number of queries.
+    def test_calendar_queries_do_not_depend_on_bookings(self):
+        for day in range(1, 29):
+            Booking.objects.create(tutor=self.tutor, date=date(2024, 2, day), lesson_identifier='3')
+        self.client.login(username=self.tutor.username, password='Password123')
+        # session, user, calendar, bookings
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('tutor_calendar'), {'year': 2024, 'month': 2})
+        self.assertContains(response, 'id="event-card-3"', count=28)
 
     # Test that the month is updated correctly if the previous button is clicked.
     def test_month_less_than_one(self):
@@ -164,7 +164,7 @@ class CancelLessonsViewTests(TestCase):
         response = self.client.post(reverse('tutor_cancel_lessons'), {
             'day': 3,
             'month': 6,
-            'year': 2024,
+            'year': 2025,
             'lesson': '3',
             'cancellation': 'term'
         })
@@ -226,12 +226,29 @@ class CancelLessonsViewTests(TestCase):
 
     # Test that the cancel_term helper method works.
     def test_cancel_term(self):
-        cancel_term('1', '12')
+        self.assertEqual(cancel_term('1', '12', 2024), 2)
         self.assertFalse(Booking.objects.filter(lesson_identifier='1').exists())
 
+    # Test that cancelling a term only removes the lessons of that term in the given year.
+    def test_cancel_term_is_bounded_by_year(self):
+        next_year = Booking.objects.create(lesson_identifier='1', date=date(2025, 12, 3))
+        august = Booking.objects.create(lesson_identifier='3', date=date(2025, 8, 4))
+        self.assertEqual(cancel_term('1', '9', '2024'), 2)
+        self.assertTrue(Booking.objects.filter(id=next_year.id).exists())
+        self.assertEqual(cancel_term('3', '5', '2025'), 2)
+        self.assertFalse(Booking.objects.filter(id=august.id).exists())
+
+    # Test that cancelling a term deletes its lessons with a bounded number of queries.
+    def test_cancel_term_queries_do_not_depend_on_lessons(self):
+        for day in range(1, 29):
+            Booking.objects.create(lesson_identifier='8', date=date(2024, 10, day))
+        # savepoint, select and delete bookings, release
+        with self.assertNumQueries(4):
+            self.assertEqual(cancel_term('8', '10', 2024), 28)
+
     # Test that the cancel recurring helper method works.
     def test_cancel_recurring(self):
-        cancel_recurring('1')
+        self.assertEqual(cancel_recurring('1'), 2)
         self.assertFalse(Booking.objects.filter(lesson_identifier='1').exists())
 
 
@@ -280,6 +297,7 @@ class AdminCancelLessonsViewTest(TestCase):
             'lesson': '1',
             'cancellation': 'term',
             'month': self.booking_date.month,
+            'year': self.booking_date.year,
         })
         self.assertEqual(response.status_code, 302)
         self.assertFalse(Booking.objects.filter(lesson_identifier="1").exists())
@@ -301,6 +319,15 @@ class AdminCancelLessonsViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertFalse(Booking.objects.filter(lesson_identifier="1").exists())
 
+    # Test that the admin is told how many lessons were cancelled.
+    def test_post_cancel_reports_removed_lessons(self):
+        Booking.objects.create(lesson_identifier="1", date=self.booking_date + timedelta(days=7))
+        response = self.client.post(f'{reverse("admin_calendar_cancel_lessons")}', {
+            'lesson': '1',
+            'cancellation': 'recurring',
+        }, follow=True)
+        self.assertEqual([str(message) for message in response.context['messages']], ["2 lessons cancelled."])
+
     # Test when the close_date is false.
     def test_close_date_false(self):
         test_date_2 = date.today() + timedelta(days=20)
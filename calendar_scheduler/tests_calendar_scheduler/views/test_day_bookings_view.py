@@ -0,0 +1,54 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+
+from calendar_scheduler.models import Booking
+from user_system.fixtures import create_test_users
+from user_system.models.user_model import User
+
+
+class AdminDayBookingsViewTests(TestCase):
+    def setUp(self):
+        create_test_users.create_test_users()
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        Booking.objects.bulk_create(Booking(student=self.student, tutor=self.tutor, lesson_identifier=i,
+                                            date=date(2024, 9, 2)) for i in range(25))
+        Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=99, date=date(2024, 9, 3))
+        self.url = reverse('admin_day_bookings', args=[2024, 9, 2])
+
+    # Test that the bookings of the day are paginated.
+    def test_admin_sees_paginated_bookings(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin_day_bookings.html')
+        self.assertEqual(len(response.context['bookings']), 20)
+        self.assertEqual(response.context['paginator'].count, 25)
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(len(response.context['bookings']), 5)
+
+    # Test that a page is rendered with a constant number of queries.
+    def test_page_queries(self):
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(4):  # session, user, count, bookings
+            self.client.get(self.url)
+
+    # Test that invalid days do not exist.
+    def test_invalid_day(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_day_bookings', args=[2024, 2, 30]))
+        self.assertEqual(response.status_code, 404)
+
+    # Test that only admins can see the bookings of a day.
+    def test_non_admin_cannot_see_page(self):
+        self.client.force_login(self.tutor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, 'permission_denied.html')
+
+    def test_unauthenticated_user_is_redirected(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+
+from calendar_scheduler.models import Booking
+from calendar_scheduler.views.ics_feed import fold_line, get_feed_url, parse_duration
+from request_handler.models.venue_model import Venue
+from user_system.fixtures import create_test_users
+from user_system.models.user_model import User
+
+
+class CalendarFeedViewTests(TestCase):
+    def setUp(self):
+        create_test_users.create_test_users()
+        self.tutor = User.objects.get(user_type=User.ACCOUNT_TYPE_TUTOR)
+        self.student = User.objects.get(user_type=User.ACCOUNT_TYPE_STUDENT)
+        self.admin = User.objects.get(user_type=User.ACCOUNT_TYPE_ADMIN)
+        self.online, _ = Venue.objects.get_or_create(venue='Online')
+        self.booking = Booking.objects.create(student=self.student, tutor=self.tutor, lesson_identifier=1,
+                                              date=date(2024, 9, 2), duration='1.5', venue=self.online,
+                                              title='Tutor session; Python, basics', knowledge_area='Python')
+        Booking.objects.create(student=self.student, lesson_identifier=2, date=date(2024, 9, 3))
+        self.url = get_feed_url(self.tutor)
+
+    # Test that the feed lists the bookings of its user as events.
+    def test_feed_streams_user_events(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:booking-{self.booking.id}@code-tutors', content)
+        self.assertIn('DTSTART:20240902T120000', content)
+        self.assertIn('DTEND:20240902T133000', content)
+        self.assertIn('SUMMARY:Tutor session\; Python\\, basics', content)
+        self.assertIn('LOCATION:Online', content)
+
+    # Test that the feed of a student lists their lessons.
+    def test_student_feed(self):
+        response = self.client.get(get_feed_url(self.student))
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+
+    # Test that unchanged feeds are answered with 304 using a single query.
+    def test_conditional_get_returns_not_modified(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(2):  # user, aggregate
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    # Test that the ETag changes when a booking is added, changed or removed.
+    def test_etag_changes_with_bookings(self):
+        etags = [self.client.get(self.url)['ETag']]
+        other = Booking.objects.create(tutor=self.tutor, lesson_identifier=3, date=date(2024, 9, 9))
+        etags.append(self.client.get(self.url)['ETag'])
+        Booking.objects.filter(id=self.booking.id).update(last_modified=other.last_modified + timedelta(days=1))
+        etags.append(self.client.get(self.url)['ETag'])
+        other.delete()
+        etags.append(self.client.get(self.url)['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+
+    # Test that the feed of a user without bookings is still valid.
+    def test_empty_feed(self):
+        Booking.objects.all().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content).decode().count('BEGIN:VEVENT'), 0)
+        self.assertNotIn('Last-Modified', response)
+
+    # Test that invalid tokens and admin users have no feed.
+    def test_invalid_feeds_are_not_found(self):
+        response = self.client.get(reverse('calendar_feed', kwargs={'token': 'invalid'}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(get_feed_url(self.admin))
+        self.assertEqual(response.status_code, 404)
+
+    # Test that the calendar page links to the user's feed.
+    def test_calendar_links_to_feed(self):
+        self.client.force_login(self.tutor)
+        response = self.client.get(reverse('tutor_calendar'))
+        self.assertContains(response, self.url)
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('0.5'), timedelta(minutes=30))
+        self.assertEqual(parse_duration('2h'), timedelta(hours=2))
+        self.assertEqual(parse_duration('60'), timedelta(hours=1))
+        self.assertEqual(parse_duration('unknown'), timedelta(hours=1))
+
+    def test_fold_line(self):
+        folded = fold_line('SUMMARY:' + 'é' * 100)
+        lines = folded.encode().split(b'\r\n')[:-1]
+        self.assertTrue(all(len(line) <= 75 for line in lines))
+        self.assertEqual(''.join(line.decode()[1:] if i else line.decode() for i, line in enumerate(lines)),
+                         'SUMMARY:' + 'é' * 100)
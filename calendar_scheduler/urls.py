@@ -1,7 +1,11 @@
 from django.urls.conf import path
 
+from calendar_scheduler.views.bulk_cancel_lessons import BulkCancelLessonsView
 from calendar_scheduler.views.calendar import StudentCalendarView, TutorCalendarView
+from calendar_scheduler.views.calendar_api import CalendarEventsApiView
 from calendar_scheduler.views.cancel_lessons import AdminCancelLessonsView, CancelLessonsView
+from calendar_scheduler.views.day_bookings import AdminDayBookingsView
+from calendar_scheduler.views.ics_feed import CalendarFeedView
 
 urlpatterns = [
     path('tutor/', TutorCalendarView.as_view(), name='tutor_calendar'),
@@ -12,4 +16,8 @@ urlpatterns = [
     path('student/cancel/', CancelLessonsView.as_view(), name='student_cancel_lessons'),
     path('admins/cancel/', AdminCancelLessonsView.as_view(), name='admin_calendar_cancel_lessons'),
     path('admins/lessons/cancel/', CancelLessonsView.as_view(), name='admin_cancel_lessons'),
+    path('admins/bulk-cancel/', BulkCancelLessonsView.as_view(), name='bulk_cancel_lessons'),
+    path('admins/day/<int:year>/<int:month>/<int:day>/', AdminDayBookingsView.as_view(), name='admin_day_bookings'),
+    path('api/events/', CalendarEventsApiView.as_view(), name='calendar_events_api'),
+    path('feed/<str:token>.ics', CalendarFeedView.as_view(), name='calendar_feed'),
 ]
@@ -0,0 +1,46 @@
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import redirect, render
+from django.template.defaultfilters import pluralize
+from django.views import View
+
+from calendar_scheduler.forms import BulkCancellationForm
+from calendar_scheduler.views.cancel_lessons import delete_bookings
+
+
+class BulkCancelLessonsView(LoginRequiredMixin, View):
+    """Class-based view allowing admins to cancel every lesson matching a filter, e.g. when a venue closes or a tutor
+    is ill.
+
+    Submitting the filter first shows a dry run: how many lessons would be cancelled and which lesson groups they belong
+    to. The lessons are only deleted once the admin confirms, with a single delete over the filter.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        return render(request, 'bulk_cancel_lessons.html', {'form': BulkCancellationForm()})
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        form = BulkCancellationForm(request.POST)
+        if not form.is_valid():
+            return render(request, 'bulk_cancel_lessons.html', {'form': form})
+
+        if request.POST.get('confirm') != 'true':
+            summary = form.get_summary()
+            return render(request, 'bulk_cancel_lessons.html', {
+                'form': form,
+                'preview': True,
+                'summary': summary,
+                'total': sum(group['lessons'] for group in summary),
+            })
+
+        removed = delete_bookings(form.get_bookings())
+        messages.success(request, f"{removed} lesson{pluralize(removed)} cancelled.")
+        return redirect('bulk_cancel_lessons')
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not request.user.is_admin:
+            return render(request, 'permission_denied.html', status=403)
+        return super().dispatch(request, *args, **kwargs)
@@ -1,13 +1,19 @@
-from calendar import Calendar
+from calendar import monthrange
+from collections import Counter, defaultdict
 from datetime import date, datetime, timedelta
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Count
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from django.views import View
 from schedule.models import Calendar
 
+from calendar_scheduler.helpers.calendar_cache import ALL_BOOKINGS, get_cached_month_events, get_scheduler_calendar
 from calendar_scheduler.models import Booking
+from calendar_scheduler.views.ics_feed import get_feed_url
 from user_system.models.user_model import User
 
 def get_month_days(year: int, month: int):
@@ -75,31 +81,78 @@ def compute_months(month:int, year:int):
     return [prev_month, prev_year, next_month, next_year], month, year
 
 def produce_month_events(request: HttpRequest, year: int, month: int, user_for_calendar: User):
-    """ Collates all the events for the given month into an events list."""
-    events = []
-    for day in range(1, 31):
-        try:
-            selected_date = date(year, month, day)
-            match request.user.user_type:
-                case 'Student' if Booking.objects.filter(student=request.user, date=selected_date).exists():
-                    events.append(Booking.objects.filter(student=request.user, date=selected_date))
-                case 'Tutor' if Booking.objects.filter(tutor=request.user, date=selected_date).exists():
-                    events.append(Booking.objects.filter(tutor=request.user, date=selected_date))
-                case 'Admin' if user_for_calendar and user_for_calendar.user_type == 'Student':
-                    newEvent = Booking.objects.filter(student=user_for_calendar, date=selected_date)
-                    if newEvent.exists():
-                        events.append(newEvent)
-                case 'Admin' if user_for_calendar and user_for_calendar.user_type == 'Tutor':
-                    newEvent = Booking.objects.filter(tutor=user_for_calendar, date=selected_date)
-                    if newEvent.exists():
-                        events.append(newEvent)
-                case 'Admin' if not user_for_calendar: # If no specific user is selected, admin sees all events
-                    newEvent = Booking.objects.filter(date=selected_date)
-                    if newEvent.exists():
-                        events.append(newEvent)
-        except ValueError:
-            break
-    return events
+    """ Collates all the events for the given month, bucketed into a dictionary keyed by the day of the month.
+
+    All events are loaded with a single query over the whole month, rather than one query per day.
+    """
+    filters = get_event_filters(request.user, user_for_calendar)
+    if filters is None:
+        return {}
+
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+    bookings = (Booking.objects.filter(date__range=(first_day, last_day), **filters)
+                .select_related('venue', 'tutor', 'student')
+                .order_by('date', 'id'))
+
+    events = defaultdict(list)
+    for booking in bookings:
+        events[booking.date.day].append(booking)
+    return dict(events)
+
+def produce_month_summary(year: int, month: int):
+    """ Counts the bookings of every user on each day of the given month, for the admin calendar of all bookings.
+
+    Returns a dictionary keyed by the day of the month, holding the total number of bookings that day and its breakdown
+    by venue and by knowledge area. The counts come from a single query grouped by date, venue and knowledge area, so
+    no booking is loaded.
+    """
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+    rows = (Booking.objects.filter(date__range=(first_day, last_day))
+            .values('date', 'venue__venue', 'knowledge_area')
+            .annotate(count=Count('id'))
+            .order_by('date'))
+
+    summary = {}
+    for row in rows:
+        day = summary.setdefault(row['date'].day, {'total': 0, 'venues': Counter(), 'knowledge_areas': Counter()})
+        day['total'] += row['count']
+        day['venues'][row['venue__venue'] or 'No venue'] += row['count']
+        day['knowledge_areas'][row['knowledge_area'] or 'No knowledge area'] += row['count']
+    for day in summary.values():
+        day['venues'] = sorted(day['venues'].items())
+        day['knowledge_areas'] = sorted(day['knowledge_areas'].items())
+    return summary
+
+def get_event_filters(user: User, user_for_calendar: User):
+    """ Returns the filters selecting the bookings shown in a user's calendar, or None if they cannot see any."""
+    match user.user_type:
+        case 'Student':
+            return {'student': user}
+        case 'Tutor':
+            return {'tutor': user}
+        case 'Admin' if user_for_calendar and user_for_calendar.user_type == 'Student':
+            return {'student': user_for_calendar}
+        case 'Admin' if user_for_calendar and user_for_calendar.user_type == 'Tutor':
+            return {'tutor': user_for_calendar}
+        case 'Admin' if not user_for_calendar: # If no specific user is selected, admin sees all events
+            return {}
+    return None
+
+def get_calendar_target(user: User, user_for_calendar: User):
+    """ Returns whose bookings a calendar shows: a user id, or ALL_BOOKINGS for the admin calendar of all users."""
+    if user_for_calendar:
+        return user_for_calendar.id
+    return ALL_BOOKINGS if user.is_admin else user.id
+
+def build_calendar_weeks(month_days: list, events: dict):
+    """ Pairs every day of the month with its events, as a list of weeks of {"day", "events"} cells.
+
+    In summary mode, the events of a day are its summary from produce_month_summary instead of a list of bookings.
+    This lets the template render each cell from its own events, instead of searching all events of the month.
+    """
+    return [[{"day": day, "events": events.get(day, []) if day else []} for day in week] for week in month_days]
 
 def retrieve_calendar_events(calendar, request, user_for_calendar=None):
     """ Retrieves all relevant tutoring sessions for a particular day 
@@ -116,15 +169,24 @@ def retrieve_calendar_events(calendar, request, user_for_calendar=None):
 
     month_days = get_month_days(year, month)
 
-    events = produce_month_events(request, year, month, user_for_calendar)
+    target = get_calendar_target(request.user, user_for_calendar)
+    # The calendar of all bookings would show every lesson in the system, so it only shows counts per day instead
+    summary_mode = target == ALL_BOOKINGS
+    if summary_mode:
+        events = get_cached_month_events(request.user, target, year, month,
+                                         lambda: produce_month_summary(year, month))
+    else:
+        events = get_cached_month_events(request.user, target, year, month,
+                                         lambda: produce_month_events(request, year, month, user_for_calendar))
     
     return {
         "calendar": calendar,
         "year": year,
         "month": month,
         "month_name": get_month_name(month),
-        "month_days": month_days,
-        "events": events,
+        "weeks": build_calendar_weeks(month_days, events),
+        "summary_mode": summary_mode,
+        "event_card_cache_timeout": settings.CALENDAR_EVENT_CARD_CACHE_TIMEOUT,
         "prev_month": prev_next_dates[0],
         "prev_year": prev_next_dates[1],
         "next_month": prev_next_dates[2],
@@ -136,21 +198,28 @@ class BaseCalendarView(LoginRequiredMixin, View):
     template_name = None
     user_type = None
     admin_template_name = None
+    cancel_url_name = None
+    admin_cancel_url_name = 'admin_calendar_cancel_lessons'
 
     def get(self, request: HttpRequest, pk: int = None) -> HttpResponse:
         if request.user.user_type != self.user_type and not request.user.is_admin:
             return render(request, 'permission_denied.html', status=401)
         
         user_for_calendar = None
+        cancel_url_name = self.cancel_url_name
         if request.user.is_admin and pk:
             user_for_calendar = get_object_or_404(User, pk=pk)
             if user_for_calendar.user_type != self.user_type:
                 raise ValueError(f"Unexpected user type. Only {self.user_type} is expected for this calendar.")
             else:
                 self.template_name = self.admin_template_name
+                cancel_url_name = self.admin_cancel_url_name
         try:
-            calendar = Calendar.objects.get(slug=self.calendar_slug)
+            calendar = get_scheduler_calendar(self.calendar_slug)
             data = retrieve_calendar_events(calendar, request, user_for_calendar)
+            data["cancel_action"] = reverse(cancel_url_name)
+            if not request.user.is_admin:
+                data["feed_url"] = request.build_absolute_uri(get_feed_url(request.user))
             return render(request, self.template_name, data)
         except Calendar.DoesNotExist:
             return render(request, 'dashboard.html', status=404)
@@ -161,9 +230,11 @@ class TutorCalendarView(BaseCalendarView):
     template_name = 'tutor_calendar.html'
     user_type = 'Tutor'
     admin_template_name = 'admin_tutor_calendar.html'
+    cancel_url_name = 'tutor_cancel_lessons'
 
 class StudentCalendarView(BaseCalendarView):
     calendar_slug = 'student'
     template_name = 'student_calendar.html'
     user_type = 'Student'
-    admin_template_name = 'admin_student_calendar.html'
\ No newline at end of file
+    admin_template_name = 'admin_student_calendar.html'
+    cancel_url_name = 'student_cancel_lessons'
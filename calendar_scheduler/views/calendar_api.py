@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpRequest, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from calendar_scheduler.models import Booking
+from calendar_scheduler.views.calendar import get_event_filters, get_week_days
+from user_system.models.user_model import User
+
+MAX_WINDOW_DAYS = 93  # About three months, enough for the visible month and the ones either side of it
+EVENT_FIELDS = ('id', 'lesson_identifier', 'date', 'title', 'knowledge_area', 'duration', 'is_recurring',
+                'cancellation_requested', 'student_id', 'tutor_id', 'venue__venue')
+
+
+class CalendarEventsApiView(LoginRequiredMixin, View):
+    """ Class-based view returning the bookings in a date window as JSON, for the calendar to load incrementally.
+
+    The window is given by the start and end query parameters (ISO dates, both inclusive) and defaults to the current
+    week. Students and tutors get their own bookings; admins get every booking, or those of the user given by the user
+    query parameter. Bookings are projected to plain values rather than loaded as model instances.
+    """
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        try:
+            start, end = self.get_window(request)
+            user_id = int(request.GET['user']) if request.GET.get('user') else None
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+        user_for_calendar = None
+        if user_id is not None:
+            if not request.user.is_admin:
+                return JsonResponse({'error': "Only admins can see the calendar of other users."}, status=403)
+            user_for_calendar = get_object_or_404(User, pk=user_id)
+
+        filters = get_event_filters(request.user, user_for_calendar)
+        events = []
+        if filters is not None:
+            events = list(Booking.objects.filter(date__range=(start, end), **filters)
+                          .order_by('date', 'id')
+                          .values(*EVENT_FIELDS))
+            for event in events:
+                event['venue'] = event.pop('venue__venue')
+        return JsonResponse({'start': start, 'end': end, 'events': events})
+
+    def get_window(self, request: HttpRequest) -> tuple[date, date]:
+        """ Returns the (start, end) window requested, raising a ValueError if it is invalid or too long."""
+        week = get_week_days()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else week[0]
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else week[-1]
+        if end < start:
+            raise ValueError("The end of the window cannot be before its start.")
+        if end - start >= timedelta(days=MAX_WINDOW_DAYS):
+            raise ValueError(f"The window cannot be longer than {MAX_WINDOW_DAYS} days.")
+        return start, end
@@ -1,7 +1,11 @@
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.template.defaultfilters import pluralize
 from django.views import View
 from django.http import HttpRequest, HttpResponse, HttpResponseNotFound
 from django.shortcuts import render, redirect, get_object_or_404
+from calendar_scheduler.helpers.calendar_cache import batched_calendar_bumps
 from calendar_scheduler.models import Booking
 from datetime import date, datetime, timedelta
 
@@ -13,29 +17,42 @@ def cancel_day(id, day):
     except Booking.DoesNotExist:
         return HttpResponseNotFound(f"Booking with lesson_identifier={id} and date={day} doesn't seem to exist.")
 
-def cancel_term(id,month):
-    ''' Cancels all lessons for a term, where the term is determined by the month of requested cancellation '''
-    months = []
-    match month:
+def get_term_range(month, year):
+    ''' Returns the first and last dates of the term that the given month of the given year belongs to '''
+    match str(month):
         case "9"|"10"|"11"|"12":
-            months = [9,10,11,12]
+            return date(year, 9, 1), date(year, 12, 31)
         case "1"|"2"|"3"|"4":
-            months = [1,2,3,4]
-        case "5"|"6"|"7":
-            months = [5,6,7]
+            return date(year, 1, 1), date(year, 4, 30)
+        case "5"|"6"|"7"|"8":
+            return date(year, 5, 1), date(year, 8, 31)
         case _:
-            months = [9,10,11,12] # Default to the first term of the year
+            return date(year, 9, 1), date(year, 12, 31) # Default to the first term of the year
 
-    for current_month in months:
-        lessons = Booking.objects.filter(lesson_identifier=id, date__month=current_month)
-        for lesson in lessons:
-            lesson.delete()
+def cancel_term(id, month, year=None):
+    ''' Cancels all lessons for a term, where the term is determined by the month (and year) of requested cancellation.
+    Returns the number of lessons removed.
+    '''
+    start, end = get_term_range(month, int(year) if year else date.today().year)
+    return delete_bookings(Booking.objects.filter(lesson_identifier=id, date__range=(start, end)))
 
 def cancel_recurring(id):
-    ''' Cancels all lesson that are a part of a recurring booking, based on the id they share'''
-    lesson = Booking.objects.filter(lesson_identifier=id)
-    for i in lesson:
-        i.delete()
+    ''' Cancels all lesson that are a part of a recurring booking, based on the id they share.
+    Returns the number of lessons removed.
+    '''
+    return delete_bookings(Booking.objects.filter(lesson_identifier=id))
+
+def count_removed_bookings(deleted):
+    ''' Returns how many bookings a queryset delete() removed, including those removed by cascade '''
+    return deleted[1].get(Booking._meta.label, 0)
+
+def delete_bookings(bookings):
+    ''' Deletes the given bookings and invalidates the cached calendars of their students and tutors, once per user.
+    Returns the number of lessons removed.
+    '''
+    with transaction.atomic(), batched_calendar_bumps():
+        removed = count_removed_bookings(bookings.delete())
+    return removed
 
 def student_tutor_cancel(request,):
     '''This method is used to match the type of cancellation the user is requesting. '''
@@ -54,7 +71,7 @@ def student_tutor_cancel(request,):
             day = date(int(year),int(month),int(day))
             cancel_day(lesson_id,day)
         case "term":
-            cancel_term(lesson_id,month)
+            cancel_term(lesson_id, month, year)
         case "recurring":
             cancel_recurring(lesson_id)
         case "request":
@@ -145,19 +162,21 @@ class AdminCancelLessonsView(LoginRequiredMixin, View):
         year = request.POST.get("year")
 
         try:
-            match cancellation:
-                case "day":
-                    cancel_one_day = date(int(year),int(month),int(day))
-                    self.cancel_single_lesson_admin(lesson_id, cancel_one_day)
-                case "term":
-                    cancel_term(lesson_id,month)
-                case "recurring":
-                    cancel_recurring(lesson_id)
-                case _:
-                    return HttpResponse("Invalid cancellation type.", status=400)
+            with transaction.atomic():
+                match cancellation:
+                    case "day":
+                        cancel_one_day = date(int(year),int(month),int(day))
+                        removed = self.cancel_single_lesson_admin(lesson_id, cancel_one_day)
+                    case "term":
+                        removed = cancel_term(lesson_id, month, year)
+                    case "recurring":
+                        removed = cancel_recurring(lesson_id)
+                    case _:
+                        return HttpResponse("Invalid cancellation type.", status=400)
         except Exception as e:
             return HttpResponse(f"Error processing cancellation: {e}", status=500)
 
+        messages.success(request, f"{removed} lesson{pluralize(removed)} cancelled.")
         return redirect('view_all_users') # change this maybe
 
 
@@ -165,4 +184,4 @@ class AdminCancelLessonsView(LoginRequiredMixin, View):
         booking = Booking.objects.filter(lesson_identifier=lesson_id, date=cancel_one_day)
         if not booking:
             raise ValueError(f"No booking found for lesson_id: {lesson_id} on {cancel_one_day}")
-        booking.delete()
\ No newline at end of file
+        return delete_bookings(booking)
\ No newline at end of file
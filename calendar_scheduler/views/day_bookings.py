@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404
+from django.shortcuts import render
+from django.views.generic.list import ListView
+
+from calendar_scheduler.models import Booking
+
+
+class AdminDayBookingsView(LoginRequiredMixin, ListView):
+    """ Class-based view listing every booking on one day, page by page.
+
+    This is the drill-down of the admin calendar of all bookings, which only shows the number of lessons on each day.
+    Only Admin users can access this page.
+    """
+    model = Booking
+    context_object_name = 'bookings'
+    template_name = 'admin_day_bookings.html'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return (Booking.objects.filter(date=self.get_day())
+                .select_related('student', 'tutor', 'venue')
+                .order_by('id'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['day'] = self.get_day()
+        return context
+
+    def get_day(self) -> date:
+        try:
+            return date(self.kwargs['year'], self.kwargs['month'], self.kwargs['day'])
+        except ValueError:
+            raise Http404("This day does not exist.")
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not request.user.is_admin:
+            return render(request, 'permission_denied.html', status=403)
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,126 @@
+import calendar
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
+
+from calendar_scheduler.models import Booking
+from user_system.models.user_model import User
+
+FEED_SALT = 'calendar_scheduler.ics_feed'
+LESSON_START = time(12, 0)  # Lessons are booked at noon (see request_handler.views.accept_request)
+
+
+def get_feed_url(user: User) -> str:
+    """ Returns the (secret) path of the iCalendar feed of a student or tutor.
+
+    Calendar apps cannot log in, so the feed is identified by a signed token of the user's id instead.
+    """
+    return reverse('calendar_feed', kwargs={'token': signing.dumps(user.pk, salt=FEED_SALT)})
+
+
+class CalendarFeedView(View):
+    """ Class-based view streaming the lessons of a student or tutor as an iCalendar (.ics) feed.
+
+    The ETag and Last-Modified headers are derived from the number of bookings of the user and the time the most recent
+    of them changed, so calendar apps polling the feed get a 304 response from a single aggregate query, and the
+    bookings are only read (and streamed one by one) when something has actually changed.
+    """
+
+    def get(self, request: HttpRequest, token: str) -> HttpResponse:
+        user = self.get_feed_user(token)
+        bookings = Booking.objects.filter(**{'student' if user.is_student else 'tutor': user})
+
+        summary = bookings.aggregate(count=Count('id'), last_modified=Max('last_modified'))
+        etag = quote_etag(hashlib.md5(f"{user.pk}:{summary['count']}:{summary['last_modified']}".encode()).hexdigest())
+        last_modified = calendar.timegm(summary['last_modified'].timetuple()) if summary['last_modified'] else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            events = bookings.select_related('venue').order_by('date', 'id').iterator()
+            response = StreamingHttpResponse(stream_calendar(events), content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="lessons.ics"'
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_feed_user(self, token: str) -> User:
+        try:
+            user_id = signing.loads(token, salt=FEED_SALT)
+        except signing.BadSignature:
+            raise Http404("This calendar feed does not exist.")
+        user = User.objects.filter(pk=user_id).first()
+        if user is None or not (user.is_student or user.is_tutor):
+            raise Http404("This calendar feed does not exist.")
+        return user
+
+
+# -HELPERS- #
+def stream_calendar(bookings):
+    """ Yields an iCalendar document with one VEVENT per booking, line by line."""
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Code Tutors//Lessons//EN\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield 'X-WR-CALNAME:Code Tutors Lessons\r\n'
+    for booking in bookings:
+        yield format_event(booking)
+    yield 'END:VCALENDAR\r\n'
+
+
+def format_event(booking: Booking) -> str:
+    """ Returns the VEVENT of a booking. Lesson times are floating (local) times, as they are in the application."""
+    start = datetime.combine(booking.date, LESSON_START)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:booking-{booking.pk}@code-tutors',
+        f'DTSTAMP:{booking.last_modified:%Y%m%dT%H%M%SZ}',
+        f'DTSTART:{start:%Y%m%dT%H%M%S}',
+        f'DTEND:{start + parse_duration(booking.duration):%Y%m%dT%H%M%S}',
+        f'SUMMARY:{escape_text(booking.title)}',
+        f'DESCRIPTION:{escape_text(booking.knowledge_area)}',
+    ]
+    if booking.venue:
+        lines.append(f'LOCATION:{escape_text(str(booking.venue))}')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def parse_duration(duration: str) -> timedelta:
+    """ Converts a lesson duration (e.g. "1.5", "2h" or "60") to a timedelta, defaulting to one hour.
+
+    Durations are stored in hours, but values too large to be hours are read as minutes.
+    """
+    try:
+        value = float(str(duration).strip().rstrip('hH'))
+    except ValueError:
+        return timedelta(hours=1)
+    if value <= 0:
+        return timedelta(hours=1)
+    return timedelta(minutes=value) if value > 12 else timedelta(hours=value)
+
+
+def escape_text(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold_line(line: str, limit: int = 75) -> str:
+    """ Folds a content line so that no line is longer than 75 octets, as required by RFC 5545."""
+    encoded = line.encode()
+    parts = []
+    while len(encoded) > limit:
+        cut = limit if not parts else limit - 1
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:  # Never split a multi-byte character
+            cut -= 1
+        parts.append(encoded[:cut])
+        encoded = encoded[cut:]
+    parts.append(encoded)
+    return '\r\n '.join(part.decode() for part in parts) + '\r\n'
@@ -1,18 +1,25 @@
+import threading
+import time
 import typing
+from collections import OrderedDict
+from datetime import datetime, timezone
 
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 from django.conf import settings as django_settings
 
 from .resources import yaml_loader as yaml
 from .settings import get_client
-from .sts import assume_role
+from .sts import credential_cache, get_expiration
 
 ROLE_NAME = yaml.get_role_name('invoicer-s3')
 BUCKET = yaml.get_bucket_name('invoicer')
-__session_counter = -1
+_URL_MARGIN = getattr(django_settings, 'AWS_PRESIGNED_URL_MARGIN', 10)
+_URL_CACHE_SIZE = 1024
 
 
 def upload(key: str, obj: typing.IO, bucket: str = BUCKET, extra_args: typing.Optional[dict] = None,
-           credentials: dict[str, str] = None) -> None:
+           credentials: dict[str, str] = None, transfer_config: TransferConfig = None) -> None:
     """
     Function to upload an object to an S3 bucket
     :param key: The key of the object to upload, i.e. the "path" in the bucket where the file will be located.
@@ -20,10 +27,26 @@ def upload(key: str, obj: typing.IO, bucket: str = BUCKET, extra_args: typing.Op
     :param bucket: The bucket to upload to. If not passed, the default bucket name will be used.
     :param extra_args: A dictionary of extra arguments to pass to the S3 upload function. Not normally needed.
     :param: credentials: A dictionary of temporary credentials to pass to the S3 upload function. Usually related to an assumed role.
+    :param transfer_config: The TransferConfig (multipart threshold, concurrency, ...) of the upload, if not the default.
     """
     credentials = _get_credentials() if not credentials else credentials
     s3_client = get_client('s3', credentials=credentials) if credentials else None
-    s3_client.upload_fileobj(obj, Bucket=bucket, Key=key, ExtraArgs=extra_args)
+    s3_client.upload_fileobj(obj, Bucket=bucket, Key=key, ExtraArgs=extra_args, Config=transfer_config)
+
+
+def download(key: str, obj: typing.IO, bucket: str = BUCKET, credentials: dict[str, str] = None,
+             transfer_config: TransferConfig = None) -> None:
+    """
+    Function to download an object from an S3 bucket
+    :param key: The key of the object to download, i.e. the "path" in the bucket where the file is located.
+    :param obj: The file-like object (opened in binary mode) to write the object to.
+    :param bucket: The bucket to download from. If not passed, the default bucket name will be used.
+    :param credentials: A dictionary of temporary credentials to pass to the S3 download function. Usually related to an assumed role.
+    :param transfer_config: The TransferConfig (multipart threshold, concurrency, ...) of the download, if not the default.
+    """
+    credentials = _get_credentials() if not credentials else credentials
+    s3_client = get_client('s3', credentials=credentials) if credentials else None
+    s3_client.download_fileobj(bucket, key, obj, Config=transfer_config)
 
 
 def _delete(key: str, bucket: str = BUCKET, credentials: dict[str, str] = None) -> None:
@@ -38,26 +61,135 @@ def _delete(key: str, bucket: str = BUCKET, credentials: dict[str, str] = None)
     s3_client.delete_object(Bucket=bucket, Key=key)
 
 
+def list_keys(prefix: str, bucket: str = BUCKET, credentials: dict[str, str] = None) -> list[str]:
+    """Function to list the keys of the objects in an S3 bucket that start with a given prefix.
+
+    :param prefix: The start of the keys to list.
+    :param bucket: The bucket in which to look. If not passed, the default bucket name will be used.
+    :param credentials: A dictionary of temporary credentials to pass to the S3 list function. Usually related to an assumed role.
+    :return: the keys found, in every page of results.
+    """
+    credentials = _get_credentials() if not credentials else credentials
+    s3_client = get_client('s3', credentials=credentials) if credentials else None
+    keys = []
+    arguments = {'Bucket': bucket, 'Prefix': prefix}
+    while True:
+        response = s3_client.list_objects_v2(**arguments)
+        keys += [entry['Key'] for entry in response.get('Contents', [])]
+        if not response.get('IsTruncated'):
+            return keys
+        arguments['ContinuationToken'] = response['NextContinuationToken']
+
+
+def delete_keys(keys: list[str], bucket: str = BUCKET, credentials: dict[str, str] = None) -> None:
+    """Function to delete several objects from an S3 bucket, with one request per 1000 objects.
+
+    :param keys: The keys of the objects to delete.
+    :param bucket: The bucket from which to delete. If not passed, the default bucket name will be used.
+    :param credentials: A dictionary of temporary credentials to pass to the S3 delete function. Usually related to an assumed role.
+    """
+    if not keys:
+        return
+    credentials = _get_credentials() if not credentials else credentials
+    s3_client = get_client('s3', credentials=credentials) if credentials else None
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]],
+                                                        'Quiet': True})
+
+
+def exists(key: str, bucket: str = BUCKET, credentials: dict[str, str] = None) -> bool:
+    """Function to check whether an object exists in an S3 bucket.
+
+    :param key: The key of the object to look for, i.e. the "path" in the bucket where the file would be.
+    :param bucket: The bucket in which to look. If not passed, the default bucket name will be used.
+    :param credentials: A dictionary of temporary credentials to pass to the S3 head function. Usually related to an assumed role.
+    :return: True if the object exists, False otherwise.
+    """
+    credentials = _get_credentials() if not credentials else credentials
+    s3_client = get_client('s3', credentials=credentials) if credentials else None
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as error:
+        if error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+    return True
+
+
 def generate_access_url(key: str, bucket: str = BUCKET, expiration: int = 3600,
                         credentials: dict[str, str] = None) -> str:
     """Function to generate a pre-signed URL to access a file in S3
 
+    URLs are cached per (bucket, key, expiration) and handed out again for as long as they stay valid, minus a safety
+    margin (settings.AWS_PRESIGNED_URL_MARGIN), so that repeated downloads of the same file are not signed every time.
     :param key: The key of the object for which to generate the pre-signed URL.
     :param bucket: The bucket to which the object belongs.
     :param expiration: The number of seconds that the pre-signed URL will be valid for.
     :param credentials: A dictionary of temporary credentials to pass to the S3 delete function. Usually related to an assumed role.
     """
+    url = _access_urls.get(bucket, key, expiration)
+    if url is not None:
+        return url
+
     credentials = _get_credentials() if not credentials else credentials
     s3_client = get_client('s3', credentials=credentials) if credentials else None
-    return s3_client.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key},
-                                            ExpiresIn=expiration)
+    url = s3_client.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key},
+                                           ExpiresIn=expiration)
+    # A URL signed with temporary credentials stops working when they expire, even if it was given a longer lifetime
+    lifetime = expiration
+    credentials_expiration = get_expiration(credentials)
+    if credentials_expiration is not None:
+        lifetime = min(lifetime, (credentials_expiration - datetime.now(timezone.utc)).total_seconds())
+    _access_urls.put(bucket, key, expiration, url, lifetime)
+    return url
+
+
+class AccessUrlCache:
+    """Class representing a thread-safe, process-local TTL cache of pre-signed URLs.
+
+    A URL is kept until margin seconds before it expires (never for more than half of its lifetime), and at most
+    max_size URLs are kept, the oldest being dropped first.
+    """
+
+    def __init__(self, margin: float = _URL_MARGIN, max_size: int = _URL_CACHE_SIZE):
+        self.margin = margin
+        self.max_size = max_size
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, key: str, expiration: int) -> str | None:
+        with self._lock:
+            entry = self._urls.get((bucket, key, expiration))
+            if entry is None:
+                return None
+            url, valid_until = entry
+            if valid_until <= time.monotonic():
+                del self._urls[(bucket, key, expiration)]
+                return None
+            return url
+
+    def put(self, bucket: str, key: str, expiration: int, url: str, lifetime: float) -> None:
+        lifetime -= min(self.margin, lifetime / 2)
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._urls[(bucket, key, expiration)] = (url, time.monotonic() + lifetime)
+            self._urls.move_to_end((bucket, key, expiration))
+            while len(self._urls) > self.max_size:
+                self._urls.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._urls.clear()
 
 
 def _get_credentials() -> dict[str, str]:
     """Function to retrieve the temporary credentials associated with an assumed role
 
+    Credentials are cached until shortly before they expire (see code_tutors.aws.sts.CredentialCache).
     :return: a dictionary of temporary credentials.
     """
-    global __session_counter
-    __session_counter += 1
-    return assume_role(f'arn:aws:iam::{django_settings.AWS_ACCOUNT_ID}:role/{ROLE_NAME}', f'badger-{__session_counter}')
+    return credential_cache.get(f'arn:aws:iam::{django_settings.AWS_ACCOUNT_ID}:role/{ROLE_NAME}')
+
+
+_access_urls = AccessUrlCache()
@@ -1,28 +1,79 @@
 import os
+import threading
+from collections import OrderedDict
 
 import boto3
+from botocore.config import Config
+from django.conf import settings as django_settings
 
 __AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 __AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 __AWS_REGION_NAME = os.getenv('AWS_REGION_NAME')
 
+_MAX_CLIENTS = 16
+_DEFAULT_CONFIG = Config(
+    max_pool_connections=getattr(django_settings, 'AWS_MAX_POOL_CONNECTIONS', 10),
+    retries={'max_attempts': getattr(django_settings, 'AWS_MAX_RETRY_ATTEMPTS', 3), 'mode': 'standard'},
+)
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+_session = None
 
-def get_client(service: str, credentials: dict[str, str] = None):
+
+def get_client(service: str, credentials: dict[str, str] = None, config: Config = None, region: str = None):
     """Function to get a boto3 client for a given AWS service.
 
+    Clients are thread-safe and expensive to build (endpoint resolution, service model, connection pool), so they are
+    kept and shared per (service, credentials, region, config). Temporary credentials get a new access key whenever
+    they are rotated, which gives them a new client; the least recently used clients are dropped.
     :param service: the name of the AWS service for which a boto3 client is requested.
     :param credentials: the credentials to use when making the request.
+    :param config: a botocore Config merged over the default one (settings.AWS_MAX_POOL_CONNECTIONS and
+        settings.AWS_MAX_RETRY_ATTEMPTS).
+    :param region: the AWS region of the client. Defaults to the AWS_REGION_NAME environment variable.
     :return: a boto3 client object for the requested service.
     """
     if not service:
         return None
+    region = region or __AWS_REGION_NAME
+    identity = credentials['AccessKeyId'] if credentials else __AWS_ACCESS_KEY_ID
+    key = (service, identity, region, _config_key(config))
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+
+        client = _build_client(service, credentials, _DEFAULT_CONFIG.merge(config) if config else _DEFAULT_CONFIG,
+                               region)
+        _clients[key] = client
+        if len(_clients) > _MAX_CLIENTS:
+            _clients.popitem(last=False)
+        return client
+
+
+def clear_clients() -> None:
+    """Drops every cached client, e.g. after changing the AWS configuration."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def _config_key(config: Config | None) -> str | None:
+    return repr(sorted(config._user_provided_options.items())) if config else None
+
+
+def _build_client(service: str, credentials: dict[str, str] | None, config: Config, region: str):
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()  # boto3's default session is not safe to build clients from concurrently
     if credentials:
-        return boto3.client(service, aws_access_key_id=credentials['AccessKeyId'],
-                            aws_secret_access_key=credentials['SecretAccessKey'],
-                            aws_session_token=credentials['SessionToken'],
-                            region_name=__AWS_REGION_NAME
-                            )
-
-    return boto3.client(service, aws_access_key_id=__AWS_ACCESS_KEY_ID, aws_secret_access_key=__AWS_SECRET_ACCESS_KEY,
-                        region_name=__AWS_REGION_NAME
-                        )
+        return _session.client(service, aws_access_key_id=credentials['AccessKeyId'],
+                               aws_secret_access_key=credentials['SecretAccessKey'],
+                               aws_session_token=credentials['SessionToken'],
+                               region_name=region, config=config
+                               )
+
+    return _session.client(service, aws_access_key_id=__AWS_ACCESS_KEY_ID,
+                           aws_secret_access_key=__AWS_SECRET_ACCESS_KEY, region_name=region, config=config
+                           )
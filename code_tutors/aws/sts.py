@@ -1,5 +1,12 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings as django_settings
+
 from code_tutors.aws import settings
 
+_REFRESH_MARGIN = timedelta(seconds=getattr(django_settings, 'AWS_CREDENTIALS_REFRESH_MARGIN', 300))
+
 
 def assume_role(role_arn: str, session: str) -> dict[str, str]:
     """Function to assume at role from AWS IAM.
@@ -11,3 +18,81 @@ def assume_role(role_arn: str, session: str) -> dict[str, str]:
     sts_client = settings.get_client('sts')
     response = sts_client.assume_role(RoleArn=role_arn, RoleSessionName=session, DurationSeconds=3600)
     return response['Credentials']
+
+
+class CredentialCache:
+    """Class representing a thread-safe, process-local cache of the temporary credentials of assumed roles.
+
+    Credentials are kept per role ARN and reused until refresh_margin before they expire. Refreshing a role happens
+    under a lock of its own, so that concurrent requests needing the same role wait for a single call to STS instead
+    of all making one. The hits and misses counters show how often STS was avoided.
+    """
+
+    def __init__(self, refresh_margin: timedelta = _REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self.hits = 0
+        self.misses = 0
+        self._credentials = {}
+        self._lock = threading.Lock()
+        self._role_locks = {}
+        self._sessions = 0
+
+    def get(self, role_arn: str, session_prefix: str = 'badger') -> dict[str, str]:
+        """Returns valid credentials for the role, assuming it again only if the cached ones are about to expire."""
+        credentials = self._get_valid(role_arn)
+        if credentials is not None:
+            return credentials
+
+        with self._get_role_lock(role_arn):
+            credentials = self._get_valid(role_arn)  # Another thread may have refreshed them while this one waited
+            if credentials is not None:
+                return credentials
+            with self._lock:
+                self.misses += 1
+                self._sessions += 1
+                session = f'{session_prefix}-{self._sessions}'
+            credentials = assume_role(role_arn, session)
+            with self._lock:
+                self._credentials[role_arn] = credentials
+            return credentials
+
+    def invalidate(self, role_arn: str = None) -> None:
+        """Discards the credentials of a role (or of every role), e.g. after AWS rejected them."""
+        with self._lock:
+            if role_arn is None:
+                self._credentials.clear()
+            else:
+                self._credentials.pop(role_arn, None)
+
+    # -HELPERS- #
+    def _get_valid(self, role_arn: str) -> dict[str, str] | None:
+        with self._lock:
+            credentials = self._credentials.get(role_arn)
+            if credentials is None or _expires_within(credentials, self.refresh_margin):
+                return None
+            self.hits += 1
+            return credentials
+
+    def _get_role_lock(self, role_arn: str) -> threading.Lock:
+        with self._lock:
+            return self._role_locks.setdefault(role_arn, threading.Lock())
+
+
+def get_expiration(credentials: dict) -> datetime | None:
+    """Returns when temporary credentials expire, as an aware datetime, or None if they do not say."""
+    expiration = credentials.get('Expiration')
+    if expiration is None:
+        return None
+    if isinstance(expiration, str):
+        expiration = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration
+
+
+def _expires_within(credentials: dict, margin: timedelta) -> bool:
+    expiration = get_expiration(credentials)
+    return expiration is None or expiration - margin <= datetime.now(timezone.utc)
+
+
+credential_cache = CredentialCache()
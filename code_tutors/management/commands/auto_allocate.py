@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_functions.helpers.auto_allocator import auto_allocate
+
+
+class Command(BaseCommand):
+    """Build automation command to allocate all open requests in a single batch."""
+    help = 'Allocates every unallocated request to a suitable tutor, solving the assignment globally.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Plan the allocations without saving them.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        allocations, unallocated = auto_allocate(dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - start
+
+        for allocation in allocations:
+            days = f'{allocation.day1} & {allocation.day2}' if allocation.day2 else f'{allocation.day1}'
+            self.stdout.write(f'Request {allocation.lesson_request.id} -> {allocation.tutor.full_name} '
+                              f'({days}, {allocation.venue})')
+
+        verb = 'would be allocated' if options['dry_run'] else 'allocated'
+        self.stdout.write(self.style.SUCCESS(f'{len(allocations)} request(s) {verb} in {elapsed:.2f}s.'))
+        if unallocated:
+            self.stdout.write(self.style.WARNING(f'{len(unallocated)} request(s) need manual allocation.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from invoicer.helpers.batch_invoicer import generate_invoices
+
+
+class Command(BaseCommand):
+    """Build automation command to generate the invoices of all allocated requests in a single batch."""
+    help = 'Generates an invoice for every allocated request without one, rendering the PDFs in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes rendering PDFs (defaults to one per CPU).')
+
+    def handle(self, *args, **options):
+        result = generate_invoices(workers=options['workers'])
+
+        for invoice_id in result.generated:
+            self.stdout.write(f'Generated {invoice_id}')
+        for request_id, error in result.failed.items():
+            self.stdout.write(self.style.ERROR(f'Request {request_id} failed: {error}'))
+
+        self.stdout.write(self.style.SUCCESS(f'{len(result.generated)} invoice(s) generated in {result.elapsed:.2f}s '
+                                             f'({result.throughput:.1f} invoice(s)/s).'))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{len(result.failed)} invoice(s) failed and can be retried.'))
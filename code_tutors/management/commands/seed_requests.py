@@ -112,9 +112,9 @@ class Command(BaseCommand):
                     return
 
                 req_object.refresh_from_db()
-                suitable_tutors = get_suitable_tutors(req_object.id, day1.id, day2.id if day2 else None)
-                if suitable_tutors.exists() and len(suitable_tutors.all()) > 0 and req_object.allocated:
-                    _allocate(req_object, suitable_tutors.all()[0], venues[0], day1, day2)
+                tutor = get_suitable_tutors(req_object.id, day1.id, day2.id if day2 else None).first()
+                if tutor and req_object.allocated:
+                    _allocate(req_object, tutor, venues[0], day1, day2)
                     _update_availabilities(req_object, day1, day2)
                 else:
                     req_object.allocated = False
@@ -1,5 +1,6 @@
 from django.core.management import BaseCommand
 
+from calendar_scheduler.helpers.calendar_cache import batched_calendar_bumps
 from calendar_scheduler.models import Booking
 
 
@@ -9,4 +10,5 @@ class Command(BaseCommand):
     help = 'Unseeds the Bookings in database'
 
     def handle(self, *args, **options):
-        Booking.objects.all().delete()
+        with batched_calendar_bumps():
+            Booking.objects.all().delete()
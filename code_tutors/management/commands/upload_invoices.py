@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from invoicer.helpers.s3_uploader import drain_spool
+
+
+class Command(BaseCommand):
+    """Build automation command to upload the invoices waiting in the local spool to S3."""
+    help = 'Uploads every spooled invoice PDF to S3, several at a time. Failed uploads stay in the spool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Number of uploads in flight at once.')
+
+    def handle(self, *args, **options):
+        result = drain_spool(workers=options['workers'])
+
+        for name, error in result.failed.items():
+            self.stdout.write(self.style.ERROR(f'{name} failed: {error}'))
+        self.stdout.write(self.style.SUCCESS(f'{len(result.uploaded)} invoice(s) uploaded.'))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{len(result.failed)} invoice(s) failed and remain in the spool.'))
@@ -144,11 +144,67 @@ MESSAGE_TAGS = {
     messages.ERROR: 'danger',
 }
 
+# Cache
+# A shared cache (Redis, at REDIS_URL) is needed as soon as more than one process serves the site: each process has its
+# own local memory cache, so anything one of them invalidates would stay stale in the others.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Allocation Configuration
+# Maximum age (in seconds) of the process-local tutor eligibility index before it is rebuilt from the database
+TUTOR_ELIGIBILITY_INDEX_TTL = 300
+
+# Calendar Configuration
+# Time (in seconds) for which the rendered event cards of the calendar are cached
+CALENDAR_EVENT_CARD_CACHE_TIMEOUT = 600
+# Whether the events of calendar months are cached, and for how long (in seconds). Changes to bookings invalidate them
+# earlier, which only reaches every process through a shared cache, so months are only cached with one
+CALENDAR_CACHE_MONTHS = CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+CALENDAR_CACHE_TIMEOUT = 3600
+
 # Invoicer Configuration
 LOGO_PATH = BASE_DIR / 'static/logo.jpeg'
 INVOICE_OUTPUT_PATH = BASE_DIR / 'invoicer/invoices/pdfs'
+# Resolution (in dots per inch) the logo is downsampled to in invoices
+INVOICE_LOGO_DPI = 216
+# Number of worker processes rendering invoices in a batch (None means one per CPU), and whether batches started from
+# the Admin dashboard run in a background thread (otherwise the request waits for them)
+INVOICE_BATCH_WORKERS = None
+INVOICE_BATCH_IN_BACKGROUND = True
+# Time (in seconds) for which the links to download invoices from S3 are valid
+INVOICE_URL_EXPIRATION = 60
+# Directory where invoices wait to be uploaded to S3, and how they are uploaded: in a background thread (otherwise by
+# the upload_invoices command), how many at once, how many attempts each, the initial backoff between attempts and the
+# time (in seconds) between retries of failed uploads
+INVOICE_SPOOL_PATH = BASE_DIR / 'invoicer/invoices/spool'
+INVOICE_UPLOAD_IN_BACKGROUND = True
+INVOICE_UPLOAD_WORKERS = 4
+INVOICE_UPLOAD_ATTEMPTS = 4
+INVOICE_UPLOAD_BACKOFF = 0.5
+INVOICE_UPLOAD_RETRY_INTERVAL = 60
+# Number of invoices fetched at once (and so held in memory) when exporting them as a ZIP archive
+INVOICE_ARCHIVE_WORKERS = 8
 
 # AWS Configurations
 AWS_ACCOUNT_ID = 'ENTER-YOUR-ACCOUNT-ID-HERE'
 AWS_YAML_CONFIG_PATH = BASE_DIR / 'code_tutors/aws/resources/config.yml'
 USE_AWS_S3 = False
+# Time (in seconds) before they expire at which the temporary credentials of assumed roles are refreshed
+AWS_CREDENTIALS_REFRESH_MARGIN = 300
+# Size of the connection pool of each AWS client, and how many times a failed AWS call is attempted
+AWS_MAX_POOL_CONNECTIONS = 10
+AWS_MAX_RETRY_ATTEMPTS = 3
+# Time (in seconds) before they expire at which cached pre-signed URLs stop being handed out
+AWS_PRESIGNED_URL_MARGIN = 10
@@ -1,3 +1,4 @@
+import glob
 import os
 from unittest import skipIf
 
@@ -11,6 +12,7 @@ from selenium.webdriver.common.by import By
 
 from code_tutors.test_selenium_functional_tests import log_in_via_form, logout, wait, wait_for_clickable, \
     wait_for_element
+from invoicer.helpers.invoice_generator import remove_stored_invoices
 from invoicer.models import Invoice
 from request_handler.fixtures.create_test_requests import create_test_requests
 from request_handler.models.request_model import Request
@@ -42,9 +44,7 @@ class TestFunctionalRegistration(StaticLiveServerTestCase):
         self.driver.quit()
         invoice = Invoice.objects.filter(student=self.student).first()
         if invoice:
-            path = f'{settings.INVOICE_OUTPUT_PATH}/{invoice.invoice_id}.pdf'
-            if os.path.exists(path):
-                os.remove(path)
+            remove_stored_invoices(invoice.invoice_id)
 
     def test_admin_can_see_invoice_generation_link_for_allocated_request(self):
         self.navigate_to_requests_page(self.admin)
@@ -88,7 +88,8 @@ class TestFunctionalRegistration(StaticLiveServerTestCase):
         invoices = Invoice.objects.filter(student=self.student)
         self.assertTrue(invoices.exists())
         self.assertEqual(invoices.count(), 1)
-        self.assertTrue(os.path.exists(f'{settings.INVOICE_OUTPUT_PATH}/{invoices.first().invoice_id}.pdf'))
+        # The PDF is only rendered once the invoice is viewed
+        self.assertFalse(glob.glob(f'{settings.INVOICE_OUTPUT_PATH}/{invoices.first().invoice_id}-*.pdf'))
 
     @override_settings(USE_AWS_S3=False)
     def test_students_cannot_generate_an_invoice(self):
@@ -0,0 +1,57 @@
+from botocore.config import Config
+from django.test import TestCase
+
+from code_tutors.aws import settings as aws_settings
+
+
+def make_credentials(access_key: str) -> dict:
+    return {'AccessKeyId': access_key, 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+
+
+class TestClientRegistry(TestCase):
+    def setUp(self):
+        aws_settings.clear_clients()
+
+    def tearDown(self):
+        aws_settings.clear_clients()
+
+    def test_clients_are_reused(self):
+        client = aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2')
+        self.assertIs(aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2'), client)
+
+    # Test that rotated credentials (which come with a new access key) get a new client.
+    def test_rotated_credentials_get_new_client(self):
+        client = aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2')
+        rotated = aws_settings.get_client('s3', credentials=make_credentials('KEY2'), region='eu-west-2')
+        self.assertIsNot(rotated, client)
+        self.assertEqual(rotated._request_signer._credentials.access_key, 'KEY2')
+
+    def test_clients_are_kept_per_service_and_region(self):
+        s3 = aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2')
+        self.assertIsNot(aws_settings.get_client('sts', credentials=make_credentials('KEY1'), region='eu-west-2'), s3)
+        self.assertIsNot(aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='us-east-1'), s3)
+
+    def test_default_config_is_applied(self):
+        client = aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2')
+        self.assertEqual(client.meta.config.max_pool_connections, 10)
+        self.assertEqual(client.meta.config.retries['mode'], 'standard')
+
+    def test_config_is_merged_and_part_of_the_key(self):
+        client = aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2',
+                                         config=Config(max_pool_connections=50))
+        self.assertEqual(client.meta.config.max_pool_connections, 50)
+        self.assertEqual(client.meta.config.retries['mode'], 'standard')
+        self.assertIs(aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2',
+                                              config=Config(max_pool_connections=50)), client)
+        self.assertIsNot(aws_settings.get_client('s3', credentials=make_credentials('KEY1'), region='eu-west-2'),
+                         client)
+
+    def test_least_recently_used_clients_are_dropped(self):
+        first = aws_settings.get_client('s3', credentials=make_credentials('KEY0'), region='eu-west-2')
+        for number in range(1, aws_settings._MAX_CLIENTS + 1):
+            aws_settings.get_client('s3', credentials=make_credentials(f'KEY{number}'), region='eu-west-2')
+        self.assertIsNot(aws_settings.get_client('s3', credentials=make_credentials('KEY0'), region='eu-west-2'),
+                         first)
+
+    def test_no_service(self):
+        self.assertIsNone(aws_settings.get_client(''))
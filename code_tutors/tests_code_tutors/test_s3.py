@@ -5,6 +5,7 @@ from django.shortcuts import reverse
 from django.test import TestCase
 
 from code_tutors.aws import s3
+from invoicer.helpers import invoice_generator as ig
 from invoicer.tests_invoicer.test_generate_invoice import generate_invoice, generate_invoice_id
 from request_handler.fixtures.create_test_requests import create_test_requests
 from request_handler.models.request_model import Request
@@ -40,7 +41,8 @@ class TestS3(TestCase):
 
     def test_generate_invoice(self):
         self.generate_invoice_in_s3()
-        key = f'invoices/pdfs/{generate_invoice_id(User.objects.get(user_type="Student"), 0)}.pdf'
+        key = ig.get_invoice_key(ig.get_or_generate_invoice(Request.objects.get(allocated=True)))
+        self.assertTrue(s3.exists(key=key))
         url = s3.generate_access_url(key=key)
         self.assertIsNotNone(url)
         self.assertTrue(isinstance(url, str))
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from code_tutors.aws import s3
+
+
+class TestAccessUrlCache(TestCase):
+    def setUp(self):
+        s3._access_urls.clear()
+        self.client = MagicMock()
+        self.client.generate_presigned_url.side_effect = \
+            lambda method, Params, ExpiresIn: f"https://{Params['Bucket']}/{Params['Key']}?n={self.client.generate_presigned_url.call_count}"
+        self.credentials = {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token',
+                            'Expiration': datetime.now(timezone.utc) + timedelta(hours=1)}
+        patcher_client = patch('code_tutors.aws.s3.get_client', return_value=self.client)
+        patcher_credentials = patch('code_tutors.aws.s3._get_credentials', side_effect=lambda: self.credentials)
+        self.get_client = patcher_client.start()
+        self.get_credentials = patcher_credentials.start()
+        self.addCleanup(patcher_client.stop)
+        self.addCleanup(patcher_credentials.stop)
+
+    def tearDown(self):
+        s3._access_urls.clear()
+
+    def test_url_is_reused_while_valid(self):
+        url = s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60)
+        self.assertEqual(s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60), url)
+        self.assertEqual(self.client.generate_presigned_url.call_count, 1)
+        self.assertEqual(self.get_credentials.call_count, 1)
+
+    def test_urls_are_cached_per_key_and_expiration(self):
+        s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60)
+        s3.generate_access_url(key='invoices/pdfs/b.pdf', bucket='bucket', expiration=60)
+        s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=3600)
+        self.assertEqual(self.client.generate_presigned_url.call_count, 3)
+
+    # Test that a URL is signed again once it is within the safety margin of its expiry.
+    def test_url_is_signed_again_near_expiry(self):
+        with patch('code_tutors.aws.s3.time.monotonic', return_value=1000):
+            url = s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60)
+        with patch('code_tutors.aws.s3.time.monotonic', return_value=1000 + 60 - s3._URL_MARGIN - 1):
+            self.assertEqual(s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60), url)
+        with patch('code_tutors.aws.s3.time.monotonic', return_value=1000 + 60 - s3._URL_MARGIN):
+            self.assertNotEqual(s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=60), url)
+
+    # Test that URLs are not kept beyond the expiry of the credentials that signed them.
+    def test_url_lifetime_is_bounded_by_credentials(self):
+        self.credentials['Expiration'] = datetime.now(timezone.utc) + timedelta(seconds=30)
+        with patch('code_tutors.aws.s3.time.monotonic', return_value=1000):
+            url = s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=3600)
+        with patch('code_tutors.aws.s3.time.monotonic', return_value=1000 + 30):
+            self.assertNotEqual(s3.generate_access_url(key='invoices/pdfs/a.pdf', bucket='bucket', expiration=3600),
+                                url)
+
+    def test_cache_size_is_bounded(self):
+        cache = s3.AccessUrlCache(margin=0, max_size=2)
+        for name in ('a', 'b', 'c'):
+            cache.put('bucket', name, 60, f'url-{name}', 60)
+        self.assertIsNone(cache.get('bucket', 'a', 60))
+        self.assertEqual(cache.get('bucket', 'c', 60), 'url-c')
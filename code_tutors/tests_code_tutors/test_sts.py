@@ -0,0 +1,76 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from code_tutors.aws.sts import CredentialCache
+
+ROLE_ARN = 'arn:aws:iam::123456789012:role/test-role'
+
+
+def make_credentials(expires_in: timedelta) -> dict:
+    return {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token',
+            'Expiration': datetime.now(timezone.utc) + expires_in}
+
+
+class TestCredentialCache(TestCase):
+    def setUp(self):
+        self.cache = CredentialCache(refresh_margin=timedelta(minutes=5))
+
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_credentials_are_reused_until_they_are_about_to_expire(self, assume_role):
+        assume_role.return_value = make_credentials(timedelta(hours=1))
+        first = self.cache.get(ROLE_ARN)
+        self.assertIs(self.cache.get(ROLE_ARN), first)
+        self.assertEqual(assume_role.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_credentials_are_refreshed_within_the_margin(self, assume_role):
+        assume_role.side_effect = [make_credentials(timedelta(minutes=4)), make_credentials(timedelta(hours=1))]
+        self.cache.get(ROLE_ARN)
+        self.cache.get(ROLE_ARN)
+        self.assertEqual(assume_role.call_count, 2)
+        self.assertEqual(self.cache.misses, 2)
+        self.assertNotEqual(assume_role.call_args_list[0].args[1], assume_role.call_args_list[1].args[1])
+
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_expiration_given_as_string(self, assume_role):
+        expiration = (datetime.now(timezone.utc) + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        assume_role.return_value = {**make_credentials(timedelta()), 'Expiration': expiration}
+        self.cache.get(ROLE_ARN)
+        self.cache.get(ROLE_ARN)
+        self.assertEqual(assume_role.call_count, 1)
+
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_credentials_are_cached_per_role(self, assume_role):
+        assume_role.side_effect = lambda role_arn, session: make_credentials(timedelta(hours=1))
+        self.cache.get(ROLE_ARN)
+        self.cache.get(f'{ROLE_ARN}-other')
+        self.assertEqual(assume_role.call_count, 2)
+
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_invalidate(self, assume_role):
+        assume_role.side_effect = lambda role_arn, session: make_credentials(timedelta(hours=1))
+        self.cache.get(ROLE_ARN)
+        self.cache.invalidate(ROLE_ARN)
+        self.cache.get(ROLE_ARN)
+        self.assertEqual(assume_role.call_count, 2)
+
+    # Test that concurrent requests for expired credentials only make one call to STS.
+    @patch('code_tutors.aws.sts.assume_role')
+    def test_concurrent_refresh_does_not_stampede(self, assume_role):
+        def slow_assume_role(role_arn, session):
+            time.sleep(0.05)
+            return make_credentials(timedelta(hours=1))
+
+        assume_role.side_effect = slow_assume_role
+        threads = [threading.Thread(target=self.cache.get, args=(ROLE_ARN,)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(assume_role.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (9, 1))
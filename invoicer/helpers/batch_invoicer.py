@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from admin_functions.helpers.calculate_cost import calculate_request_cost
+from invoicer.helpers import invoice_generator as ig
+from invoicer.helpers.batch_worker import start_worker
+from invoicer.helpers.generate_invoice_id import generate_invoice_id
+from invoicer.models import Invoice, reserve_invoice_numbers
+from request_handler.models.request_model import Request
+
+logger = logging.getLogger(__name__)
+
+_WORKERS = getattr(settings, 'INVOICE_BATCH_WORKERS', None)
+_running = threading.Lock()
+
+
+class BatchResult(NamedTuple):
+    """The outcome of a batch of invoices."""
+    generated: list[str]
+    failed: dict[int, str]
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Invoices generated per second."""
+        return len(self.generated) / self.elapsed if self.elapsed else 0.0
+
+
+def generate_invoices(workers: int | None = None) -> BatchResult:
+    """Generates an invoice for every allocated request that does not have one yet.
+
+    The Invoice rows are created in bulk, in one transaction, and the PDFs are then pre-rendered in a pool of worker
+    processes (settings.INVOICE_BATCH_WORKERS, or one per CPU, unless workers is given), each of which loads the logo
+    and the fonts once. Requests whose invoice cannot be created or rendered are reported in the result and left without
+    an invoice, so a later batch retries them; they never stop the rest of the batch. PDFs are stored under the same
+    content-addressed names as those rendered on demand by get_invoice, which serves them as they are.
+    :param workers: the number of worker processes. With 1 (or a single invoice), PDFs are rendered in this process.
+    :return: the ids of the invoices generated, the errors of the requests that failed and the time taken.
+    """
+    start = time.perf_counter()
+    failed = {}
+    invoices = create_invoices(list(Request.objects.filter(allocated=True, invoice__isnull=True)
+                                    .select_related('student', 'tutor').order_by('id')), failed)
+
+    generated = []
+    for lesson_request, error in render_invoices(invoices, workers or _WORKERS or os.cpu_count() or 1):
+        if error is None:
+            generated.append(lesson_request.invoice_id)
+        else:
+            failed[lesson_request.id] = error
+
+    discard_invoices([lesson_request for lesson_request in invoices if lesson_request.id in failed])
+    return BatchResult(generated, failed, time.perf_counter() - start)
+
+
+def start_batch() -> bool:
+    """Generates the invoices of all allocated requests in a background thread, so that callers do not wait for them.
+
+    With settings.INVOICE_BATCH_IN_BACKGROUND set to False, the batch runs in the calling thread instead. Either way, its
+    outcome is logged.
+    :return: False if a batch is already running in this process, in which case no other one is started.
+    """
+    if not _running.acquire(blocking=False):
+        return False
+    if getattr(settings, 'INVOICE_BATCH_IN_BACKGROUND', True):
+        threading.Thread(target=_run_batch, name='invoice-batch', daemon=True).start()
+    else:
+        _run_batch()
+    return True
+
+
+@transaction.atomic
+def create_invoices(requests: list[Request], failed: dict[int, str]) -> list[Request]:
+    """Creates the Invoice rows of the given requests with one INSERT and links them with one UPDATE.
+
+    The invoice numbers of each student are reserved as one block from their counter. Requests whose cost cannot be
+    calculated are recorded in failed instead. The requests are locked, and those invoiced in the meantime (e.g. from
+    the requests page) are left out, so their invoice is never replaced.
+    :return: the requests that were invoiced, with their invoice set.
+    """
+    uninvoiced = set(Request.objects.select_for_update().filter(
+        id__in=[lesson_request.id for lesson_request in requests], invoice__isnull=True).values_list('id', flat=True))
+    totals = {}
+    for lesson_request in requests:
+        if lesson_request.id not in uninvoiced:
+            continue
+        try:
+            totals[lesson_request.id] = calculate_request_cost(lesson_request.tutor, lesson_request)
+        except (AttributeError, TypeError, ValueError) as error:
+            failed[lesson_request.id] = f'Cannot calculate the cost: {error}'
+            continue
+
+    invoiced = [lesson_request for lesson_request in requests if lesson_request.id in totals]
+    by_student = defaultdict(list)
+    for lesson_request in invoiced:
+        by_student[lesson_request.student_id].append(lesson_request)
+    for student_requests in by_student.values():
+        student = student_requests[0].student
+        first_number = reserve_invoice_numbers(student, count=len(student_requests))
+        for number, lesson_request in enumerate(student_requests, start=first_number):
+            lesson_request.invoice = Invoice(invoice_id=generate_invoice_id(student, number - 1), student=student,
+                                             total=totals[lesson_request.id])
+
+    Invoice.objects.bulk_create([lesson_request.invoice for lesson_request in invoiced])
+    Request.objects.bulk_update(invoiced, ['invoice'])
+    return invoiced
+
+
+def render_invoices(requests: list[Request], workers: int):
+    """Renders and stores the invoices of the given requests, yielding (request, error) pairs as they complete."""
+    if workers <= 1 or len(requests) <= 1:
+        for lesson_request in requests:
+            try:
+                data = ig.get_invoice_data(lesson_request)
+            except Exception as error:
+                yield lesson_request, str(error)
+                continue
+            yield lesson_request, _attempt(lambda: ig.render_invoice(data), data)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(requests)), mp_context=multiprocessing.get_context('spawn'),
+                             initializer=start_worker) as pool:
+        futures = {}
+        for lesson_request in requests:
+            try:
+                data = ig.get_invoice_data(lesson_request)
+                futures[pool.submit(ig.render_invoice, data)] = (lesson_request, data)
+            except Exception as error:
+                yield lesson_request, str(error)
+        for future in as_completed(futures):
+            lesson_request, data = futures[future]
+            yield lesson_request, _attempt(future.result, data)
+
+
+def discard_invoices(requests: list[Request]) -> None:
+    """Unlinks and deletes the invoices of requests whose PDF could not be generated."""
+    if not requests:
+        return
+    with transaction.atomic():
+        Request.objects.filter(id__in=[lesson_request.id for lesson_request in requests]).update(invoice=None)
+        Invoice.objects.filter(invoice_id__in=[lesson_request.invoice_id for lesson_request in requests]).delete()
+
+
+# -HELPERS- #
+def _run_batch() -> None:
+    """Runs a batch started by start_batch and logs its outcome."""
+    try:
+        result = generate_invoices()
+        logger.info('%d invoice(s) generated in %.2fs (%.1f invoice(s)/s)', len(result.generated), result.elapsed,
+                    result.throughput)
+        if result.failed:
+            logger.warning('%d invoice(s) could not be generated: %s', len(result.failed), result.failed)
+    except Exception:
+        logger.exception('Generating the batch of invoices failed')
+    finally:
+        close_old_connections()
+        _running.release()
+
+
+def _attempt(render, data: dict) -> str | None:
+    """Renders one invoice and stores it, returning the error message if anything fails."""
+    try:
+        ig.store_invoice(render(), data)
+    except Exception as error:
+        return str(error) or error.__class__.__name__
+    return None
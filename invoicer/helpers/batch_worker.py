@@ -0,0 +1,14 @@
+""" Set-up of the worker processes rendering invoices in a batch (see batch_invoicer.render_invoices).
+
+Workers are spawned rather than forked, as a batch may be started from a thread of a web server, and forking a process
+with several threads can leave the child waiting on locks that no thread will ever release. A spawned worker starts
+from scratch, so it sets Django up itself; this module is imported before that, so it must not import any app.
+"""
+import django
+
+
+def start_worker() -> None:
+    """Sets Django up in a new worker process, then loads the logo and the fonts used by the invoices."""
+    django.setup()
+    from invoicer.helpers import invoice_generator as ig
+    ig.warm_up()
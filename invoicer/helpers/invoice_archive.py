@@ -0,0 +1,143 @@
+""" Helpers exporting invoice PDFs as a single ZIP archive.
+
+The archive is written to an unseekable buffer that is emptied after every entry, so it can be streamed to the client
+while it is being built. Stored PDFs are read a few at a time ahead of the entry being written (from S3 in parallel),
+and missing ones are rendered when their entry is written, so both the memory used and the time to the first bytes
+depend on settings.INVOICE_ARCHIVE_WORKERS and not on the number of invoices exported.
+"""
+import io
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from code_tutors.aws import s3
+from invoicer.helpers import invoice_generator as ig
+from invoicer.helpers.s3_uploader import TRANSFER_CONFIG
+from request_handler.models.request_model import Request
+from user_system.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+_WORKERS = getattr(settings, 'INVOICE_ARCHIVE_WORKERS', 8)
+_MISSING_NAME = 'MISSING.txt'
+
+
+def get_archived_requests(term: str = None, student: User = None) -> QuerySet:
+    """Returns the requests with an invoice, for a term and/or a student, ordered by invoice."""
+    requests = Request.objects.filter(invoice__isnull=False).select_related('student', 'tutor', 'invoice')
+    if term:
+        requests = requests.filter(term=term)
+    if student is not None:
+        requests = requests.filter(invoice__student=student)
+    return requests.order_by('invoice_id', 'id')
+
+
+def stream_invoice_archive(requests: QuerySet, workers: int = None):
+    """Yields a ZIP archive of the invoices of the given requests, one PDF (named after its invoice) at a time.
+
+    Missing PDFs are rendered (and stored) as their entry is written; rendering is bound by the CPU, so it is done in
+    this thread rather than alongside the reads. Invoices that cannot be rendered or read do not interrupt the download,
+    which has already started: they are listed in a MISSING.txt entry at the end of the archive instead.
+    :param requests: the requests whose invoices are exported, ordered by invoice (see get_archived_requests).
+    :param workers: the number of stored PDFs read at once (settings.INVOICE_ARCHIVE_WORKERS by default).
+    """
+    workers = workers or _WORKERS
+    stream = _ArchiveStream()
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+            pending = deque()
+            for invoice_id, load in _get_invoice_loaders(requests, pool, failed):
+                pending.append((invoice_id, load))
+                if len(pending) >= workers:
+                    _write_entry(archive, *pending.popleft(), failed)
+                    yield stream.pop()
+            while pending:
+                _write_entry(archive, *pending.popleft(), failed)
+                yield stream.pop()
+            if failed:
+                archive.writestr(_MISSING_NAME, ''.join(f'{invoice_id}: {error}\n'
+                                                        for invoice_id, error in sorted(failed.items())))
+        yield stream.pop()
+
+
+def read_invoice(name: str) -> bytes:
+    """Returns the content of a stored invoice PDF, read locally, from the upload spool or from S3."""
+    if not settings.USE_AWS_S3:
+        with open(ig.get_invoice_path(name), 'rb') as file:
+            return file.read()
+    try:
+        with open(ig.get_spool_path(name), 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        pass
+    buffer = io.BytesIO()
+    s3.download(key=ig.get_invoice_key(name), obj=buffer, transfer_config=TRANSFER_CONFIG)
+    return buffer.getvalue()
+
+
+# -HELPERS- #
+class _ArchiveStream(io.RawIOBase):
+    """An unseekable, write-only buffer that hands out what was written to it since it was last emptied."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _get_invoice_loaders(requests: QuerySet, pool: ThreadPoolExecutor, failed: dict[str, str]):
+    """Yields the id of each invoice once, with a function returning its PDF.
+
+    Stored PDFs start being read straight away, in the pool; missing PDFs are only rendered when the function is called.
+    """
+    last_invoice_id = None
+    for request_obj in requests.iterator():
+        invoice_id = request_obj.invoice_id
+        if invoice_id == last_invoice_id:
+            continue  # Requests are ordered by invoice, so requests sharing an invoice are next to each other
+        last_invoice_id = invoice_id
+        try:
+            data = ig.get_invoice_data(request_obj)
+            name = ig.get_artifact_name(data)
+            stored = ig.invoice_is_stored(name, request_obj.invoice)
+        except Exception as error:
+            _record_failure(failed, invoice_id, error, 'rendered')
+            continue
+        yield invoice_id, pool.submit(read_invoice, name).result if stored else partial(_render_invoice, data)
+
+
+def _render_invoice(data: dict) -> bytes:
+    pdf = ig.render_invoice(data)
+    ig.store_invoice(pdf, data)
+    return pdf
+
+
+def _record_failure(failed: dict[str, str], invoice_id: str, error: Exception, action: str) -> None:
+    logger.exception('Invoice %s could not be %s', invoice_id, action)
+    failed[invoice_id] = str(error) or error.__class__.__name__
+
+
+def _write_entry(archive: zipfile.ZipFile, invoice_id: str, load, failed: dict[str, str]) -> None:
+    try:
+        pdf = load()
+    except Exception as error:
+        _record_failure(failed, invoice_id, error, 'exported')
+        return
+    archive.writestr(f'{invoice_id}.pdf', pdf)
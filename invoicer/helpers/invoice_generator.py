@@ -1,81 +1,179 @@
+import glob
+import hashlib
+import json
 import os
+from decimal import Decimal
+from functools import lru_cache
 from io import BytesIO
 
 from django.conf import settings
+from PIL import Image
 from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfgen import canvas
 
 from admin_functions.helpers.calculate_cost import calculate_num_lessons
 from code_tutors.aws import s3
-from code_tutors.aws.resources import yaml_loader
+from invoicer.helpers.s3_uploader import get_invoice_key, get_spool_path, is_invoice_pdf, spool_pdf, uploader
 from invoicer.models import Invoice
 from request_handler.models.request_model import Request
 
 _LOGO_PATH = settings.LOGO_PATH
 _OUTPUT_PATH = settings.INVOICE_OUTPUT_PATH
+_FONTS = ('Helvetica', 'Helvetica-Bold')
+_LOGO_DPI = getattr(settings, 'INVOICE_LOGO_DPI', 216)
+_LOGO_BOX = (100, 40)  # The area (in points) the logo is fitted into
 
 
-def save_or_upload_pdf(buffer: BytesIO, invoice: Invoice, path: str):
-    """ Save the invoice pdf in local storeage or in AWS S3, depending on settings.py configurations """
+def save_or_upload_pdf(buffer: BytesIO, name: str):
+    """ Save the invoice pdf in local storeage, or spool it for upload to AWS S3, depending on settings.py configurations """
     if settings.USE_AWS_S3:
-        buffer.seek(0)
-        s3.upload(obj=buffer, bucket=yaml_loader.get_bucket_name('invoicer'),
-                  key=f'invoices/pdfs/{invoice.invoice_id}.pdf')
+        spool_pdf(buffer.getvalue(), name)
     else:
+        path = get_invoice_path(name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "wb") as f:
             f.write(buffer.getvalue())
 
 
-def generate_invoice(request_obj: Request) -> None:
+def generate_invoice(request_obj: Request) -> str:
     """Function that automatically generates a formatted PDF file for an invoice.
 
     This function uses reportlab to generate the PDF. If _LOCAL_STORE is set, the PDF is stored in the local machine,
-    at invoicer/invoices/pdfs. Otherwise, the PDF is automatically uploaded to Amazon's S3 based on the configuration set
-    in the code_tutors.aws module.
+    at invoicer/invoices/pdfs. Otherwise, the PDF is spooled and uploaded to Amazon's S3 in the background (see
+    invoicer.helpers.s3_uploader), based on the configuration set in the code_tutors.aws module.
     :param request_obj: the tutoring request object for which an invoice is being generated.
+    :return: the name under which the PDF was stored (see get_artifact_name).
     """
-    invoice: Invoice = request_obj.invoice
-    buffer = BytesIO()  # !!DO NOT REMOVE!!
-    path = f'{_OUTPUT_PATH}/{invoice.invoice_id}.pdf'
+    data = get_invoice_data(request_obj)
+    return store_invoice(render_invoice(data), data)
+
 
+def store_invoice(pdf: bytes, data: dict) -> str:
+    """Stores a rendered invoice and records it on the Invoice, returning the name it was stored under."""
+    name = get_artifact_name(data)
+    Invoice.objects.filter(invoice_id=data['invoice_id']).update(
+        pdf_name=name, upload_status=Invoice.UPLOAD_PENDING if settings.USE_AWS_S3 else Invoice.UPLOAD_DONE)
+    buffer = BytesIO(pdf)  # !!DO NOT REMOVE!!
+    save_or_upload_pdf(buffer, name)
+    buffer.close()
     if settings.USE_AWS_S3:
-        pdf = canvas.Canvas(buffer, pagesize=A4)
+        uploader.notify()
     else:
-        if not os.path.exists(path):
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-        pdf = canvas.Canvas(buffer, pagesize=A4)
+        remove_stored_invoices(data['invoice_id'], keep=name)
+    return name
+
+
+def get_or_generate_invoice(request_obj: Request) -> str:
+    """Returns the name of the stored PDF of an invoice, rendering it first if it is missing or out of date.
+
+    PDFs are stored under a hash of everything printed on them, so a PDF is rendered once on first access, served from
+    storage as long as the invoice does not change, and rendered again as soon as it does (e.g. once it is paid).
+    """
+    name = get_artifact_name(get_invoice_data(request_obj))
+    if invoice_is_stored(name, request_obj.invoice):
+        return name
+    return generate_invoice(request_obj)
+
+
+def invoice_is_stored(name: str, invoice: Invoice = None) -> bool:
+    """Returns whether the PDF with the given name is stored, locally, in the upload spool or in S3.
 
+    The invoice records the name of its latest PDF, so S3 is only asked about PDFs rendered before it did, or whose
+    upload has just finished.
+    """
+    if not settings.USE_AWS_S3:
+        return os.path.exists(get_invoice_path(name))
+    if invoice is not None and invoice.pdf_name:
+        if invoice.pdf_name != name:
+            return False
+        if invoice.upload_status == Invoice.UPLOAD_DONE:
+            return True
+    return os.path.exists(get_spool_path(name)) or s3.exists(key=get_invoice_key(name))
+
+
+def remove_stored_invoices(invoice_id: str, keep: str = None) -> None:
+    """Deletes the locally stored PDFs of an invoice (including any named <invoice id>.pdf, as they were before), except
+    for the one named keep.
+    """
+    for path in glob.glob(f'{glob.escape(str(_OUTPUT_PATH))}/{glob.escape(invoice_id)}*.pdf'):
+        name = os.path.basename(path)
+        if name != keep and is_invoice_pdf(name, invoice_id):
+            os.remove(path)
+
+
+def get_artifact_name(data: dict) -> str:
+    """Returns the file name of an invoice's PDF: its id followed by a hash of the fields printed on it."""
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'{data["invoice_id"]}-{digest}.pdf'
+
+
+def get_invoice_path(name: str) -> str:
+    return f'{_OUTPUT_PATH}/{name}'
+
+
+def get_invoice_data(request_obj: Request) -> dict:
+    """Returns everything printed on the invoice of a request as plain values.
+
+    Rendering only needs these values, so it does not touch the database and can run in another process.
+    """
+    return {
+        'invoice_id': request_obj.invoice.invoice_id,
+        'tutor_name': request_obj.tutor.full_name,
+        'tutor_email': request_obj.tutor.email,
+        'student_name': request_obj.student.full_name,
+        'hourly_rate': request_obj.tutor.hourly_rate,
+        'lessons': calculate_num_lessons(request_obj.frequency),
+        'total': Decimal(str(request_obj.invoice.total)).quantize(Decimal('0.01')),
+        'paid': request_obj.invoice.payment_status,
+    }
+
+
+@lru_cache(maxsize=None)
+def get_logo() -> ImageReader:
+    """Returns the logo, downsampled to settings.INVOICE_LOGO_DPI at the size it is printed, once per process.
+
+    The result is kept as a JPEG, which reportlab embeds as it is, so the logo is never decoded again afterwards.
+    """
+    with Image.open(_LOGO_PATH) as logo:
+        logo = logo.convert('RGB')
+        scale = min(_LOGO_BOX[0] / logo.width, _LOGO_BOX[1] / logo.height) * _LOGO_DPI / 72
+        if scale < 1:
+            logo = logo.resize((max(1, round(logo.width * scale)), max(1, round(logo.height * scale))),
+                               Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        logo.save(buffer, format='JPEG', quality=85, optimize=True)
+    buffer.seek(0)
+    return ImageReader(buffer)
+
+
+def warm_up() -> None:
+    """Loads the logo and the fonts used by the invoices, so that the first invoice rendered is not slower."""
+    get_logo()
+    for font in _FONTS:
+        pdfmetrics.getFont(font)
+
+
+def draw_layout(pdf: canvas.Canvas) -> None:
+    """Draws the parts of the invoice that are the same for every invoice: logo, headings, rules and footer."""
     width, height = A4
 
     # Header
-    pdf.drawImage(_LOGO_PATH, x=width - 150, y=height - 80, width=100, height=40, preserveAspectRatio=True, mask='auto')
+    pdf.drawImage(get_logo(), x=width - 150, y=height - 80, width=_LOGO_BOX[0], height=_LOGO_BOX[1],
+                  preserveAspectRatio=True, mask='auto')
     pdf.setFont("Helvetica-Bold", 16)
     pdf.drawString(20, height - 60, "Code Connect Tutors")
 
     pdf.setLineWidth(1)  # Set line thickness
     pdf.line(20 + 28, height - 90, width - 28, height - 90)
 
-    # Tutor Details
+    # Section headings
     pdf.setFont("Helvetica-Bold", 12)
     pdf.drawString(20, height - 120, "Tutor details")
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(40, height - 140, f"Tutor Name: {request_obj.tutor.full_name}")
-    pdf.drawString(40, height - 160, f"Tutor Email: {request_obj.tutor.email}")
-
-    # Student Details
-    pdf.setFont("Helvetica-Bold", 12)
     pdf.drawString(20, height - 200, "Student details")
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(40, height - 220, f"Student Name: {request_obj.student.full_name}")
-
-    # Transfer Overview
-    pdf.setFont("Helvetica-Bold", 12)
     pdf.drawString(20, height - 260, "Transfer overview")
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(40, height - 280, f"Hourly Rate: £{request_obj.tutor.hourly_rate:.2f}")
-    pdf.drawString(40, height - 300, f"Lessons Booked: {calculate_num_lessons(request_obj.frequency)}")
-    pdf.drawString(40, height - 320, f"Total Cost: £{invoice.total:.2f}")
-    pdf.drawString(40, height - 340, "Status: Completed")
 
     # Footer
     pdf.setFont("Helvetica", 8)
@@ -84,8 +182,31 @@ def generate_invoice(request_obj: Request) -> None:
     pdf.drawCentredString(width / 2, 40, "For support, contact support@codeconnect.com")
     pdf.setFillColorRGB(0, 0, 0)  # Reset color
 
-    pdf.save()
 
-    save_or_upload_pdf(buffer, invoice, path)
+def render_invoice(data: dict) -> bytes:
+    """Renders the invoice described by data (see get_invoice_data) and returns the PDF file.
 
-    buffer.close()
+    The logo is prepared once per process (see get_logo), and pages are compressed.
+    """
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    height = A4[1]
+
+    draw_layout(pdf)
+
+    pdf.setFont("Helvetica", 10)
+    # Tutor Details
+    pdf.drawString(40, height - 140, f"Tutor Name: {data['tutor_name']}")
+    pdf.drawString(40, height - 160, f"Tutor Email: {data['tutor_email']}")
+
+    # Student Details
+    pdf.drawString(40, height - 220, f"Student Name: {data['student_name']}")
+
+    # Transfer Overview
+    pdf.drawString(40, height - 280, f"Hourly Rate: £{data['hourly_rate']:.2f}")
+    pdf.drawString(40, height - 300, f"Lessons Booked: {data['lessons']}")
+    pdf.drawString(40, height - 320, f"Total Cost: £{data['total']:.2f}")
+    pdf.drawString(40, height - 340, f"Status: {'Paid' if data['paid'] else 'Awaiting payment'}")
+
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,175 @@
+""" Helpers uploading invoice PDFs to S3 in the background.
+
+PDFs are first written to a local spool directory (settings.INVOICE_SPOOL_PATH), which is fast and cannot fail because
+of the network, and are then uploaded concurrently by a background thread (or the upload_invoices command). A file only
+leaves the spool once it has been uploaded, so failed uploads are retried on the next run.
+PDFs are stored under content-addressed names and never overwritten, so once an invoice's latest PDF is uploaded, its
+older ones (including any named <invoice id>.pdf, as they were before) are deleted from S3.
+"""
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from boto3.s3.transfer import TransferConfig
+from django.conf import settings
+from django.db import close_old_connections
+
+from code_tutors.aws import s3
+from code_tutors.aws.resources import yaml_loader
+from invoicer.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+_SPOOL_PATH = settings.INVOICE_SPOOL_PATH
+_WORKERS = getattr(settings, 'INVOICE_UPLOAD_WORKERS', 4)
+_ATTEMPTS = getattr(settings, 'INVOICE_UPLOAD_ATTEMPTS', 4)
+_BACKOFF = getattr(settings, 'INVOICE_UPLOAD_BACKOFF', 0.5)
+_INTERVAL = getattr(settings, 'INVOICE_UPLOAD_RETRY_INTERVAL', 60)
+
+_PDF_SUFFIX = re.compile(r'(-[0-9a-f]{16})?\.pdf')
+
+# Invoices are small, so they are sent in a single request, and concurrency comes from uploading several at once
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=16 * 1024 * 1024, use_threads=False)
+
+
+class UploadResult(NamedTuple):
+    """The outcome of draining the spool."""
+    uploaded: list[str]
+    failed: dict[str, str]
+
+
+def get_invoice_key(name: str) -> str:
+    return f'invoices/pdfs/{name}'
+
+
+def get_spool_path(name: str) -> str:
+    return f'{_SPOOL_PATH}/{name}'
+
+
+def is_invoice_pdf(name: str, invoice_id: str) -> bool:
+    """Returns whether name is one of the PDFs of an invoice: <invoice id>-<hash>.pdf, or the older <invoice id>.pdf."""
+    return name.startswith(invoice_id) and _PDF_SUFFIX.fullmatch(name, len(invoice_id)) is not None
+
+
+def spool_pdf(pdf: bytes, name: str) -> None:
+    """Writes a PDF to the spool. The file is written under a temporary name first, so it is never uploaded half-done."""
+    os.makedirs(_SPOOL_PATH, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=_SPOOL_PATH, suffix='.part')
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(pdf)
+    os.replace(temporary_path, get_spool_path(name))
+
+
+def drain_spool(workers: int = None, upload=None) -> UploadResult:
+    """Uploads every PDF in the spool, several at a time, and records the outcome on the invoices.
+
+    Each upload is attempted settings.INVOICE_UPLOAD_ATTEMPTS times, with an exponential backoff between attempts.
+    :param workers: the number of uploads in flight at once (settings.INVOICE_UPLOAD_WORKERS by default).
+    :param upload: the function doing the upload, with the signature of code_tutors.aws.s3.upload (the default).
+    :return: the names of the PDFs uploaded and the errors of those that failed.
+    Once uploaded, the PDFs that are superseded are deleted from S3 (see _remove_superseded).
+    """
+    if not os.path.isdir(_SPOOL_PATH):
+        return UploadResult([], {})
+    names = sorted(name for name in os.listdir(_SPOOL_PATH) if name.endswith('.pdf'))
+    if not names:
+        return UploadResult([], {})
+
+    bucket = yaml_loader.get_bucket_name('invoicer')
+    upload = upload or s3.upload
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or _WORKERS, len(names)))) as pool:
+        errors = dict(zip(names, pool.map(lambda name: _upload_with_retries(name, bucket, upload), names)))
+
+        result = UploadResult([name for name, error in errors.items() if error is None],
+                              {name: error for name, error in errors.items() if error is not None})
+        # The statuses are updated here rather than in the upload threads, which would each need a database connection
+        Invoice.objects.filter(pdf_name__in=result.uploaded).update(upload_status=Invoice.UPLOAD_DONE)
+        Invoice.objects.filter(pdf_name__in=result.failed).update(upload_status=Invoice.UPLOAD_FAILED)
+        latest = set(Invoice.objects.filter(pdf_name__in=result.uploaded).values_list('pdf_name', flat=True))
+        list(pool.map(lambda name: _remove_superseded(name, bucket, name in latest), result.uploaded))
+    return result
+
+
+class SpoolUploader:
+    """Class representing the background thread that drains the spool.
+
+    The thread is started on the first notification. It drains the spool whenever it is notified that a PDF was
+    spooled, and every settings.INVOICE_UPLOAD_RETRY_INTERVAL seconds to retry failed uploads.
+    """
+
+    def __init__(self, interval: float = _INTERVAL):
+        self.interval = interval
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def notify(self) -> None:
+        if not getattr(settings, 'INVOICE_UPLOAD_IN_BACKGROUND', True):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='invoice-uploader', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+            try:
+                result = drain_spool()
+                if result.failed:
+                    logger.warning('%d invoice upload(s) failed: %s', len(result.failed), result.failed)
+            except Exception:
+                logger.exception('Draining the invoice spool failed')
+            finally:
+                close_old_connections()
+
+
+# -HELPERS- #
+def _upload_with_retries(name: str, bucket: str, upload) -> str | None:
+    """Uploads one spooled PDF and removes it from the spool, returning the error message if every attempt failed."""
+    path = get_spool_path(name)
+    error = None
+    for attempt in range(_ATTEMPTS):
+        if attempt:
+            time.sleep(_BACKOFF * 2 ** (attempt - 1))
+        try:
+            with open(path, 'rb') as file:
+                upload(key=get_invoice_key(name), obj=file, bucket=bucket, transfer_config=TRANSFER_CONFIG)
+        except FileNotFoundError:
+            return None  # Uploaded and removed by another drain in the meantime
+        except Exception as exception:
+            error = str(exception) or exception.__class__.__name__
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    return error
+
+
+def _remove_superseded(name: str, bucket: str, latest: bool) -> None:
+    """Deletes from S3 the PDFs superseded by the upload of name: the older PDFs of its invoice if name is the latest
+    one, or name itself if the invoice has been rendered again since (or deleted).
+    """
+    invoice_id = name.rsplit('-', 1)[0]
+    try:
+        if latest:
+            prefix = get_invoice_key(invoice_id)
+            keys = [key for key in s3.list_keys(prefix=prefix, bucket=bucket)
+                    if key != get_invoice_key(name) and is_invoice_pdf(key.rsplit('/', 1)[-1], invoice_id)]
+        else:
+            keys = [get_invoice_key(name)]
+        s3.delete_keys(keys, bucket=bucket)
+    except Exception:
+        logger.warning('Could not delete the superseded PDFs of invoice %s', invoice_id, exc_info=True)
+
+
+uploader = SpoolUploader()
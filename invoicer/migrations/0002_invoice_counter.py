@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-18 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_system', '0001_initial'),
+        ('invoicer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceCounter',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='invoice_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicer', '0002_invoice_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='upload_status',
+            field=models.CharField(choices=[('none', 'Not rendered'), ('pending', 'Waiting for upload'), ('uploaded', 'Uploaded'), ('failed', 'Upload failed')], default='none', max_length=10),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 from invoicer.helpers.generate_invoice_id import generate_invoice_id
 from user_system.models.user_model import User
@@ -9,23 +10,64 @@ class Invoice(models.Model):
 
     If an invoice with a given ID has already been created, it will not be created again.
     The save() method has been updated to automatically generate an invoice ID using the standard defined elsewhere.
+    pdf_name and upload_status track the latest PDF rendered for the invoice: whether it is waiting in the local spool
+    to be uploaded to S3, has reached its final storage, or could not be uploaded.
     """
+    UPLOAD_NONE = 'none'
+    UPLOAD_PENDING = 'pending'
+    UPLOAD_DONE = 'uploaded'
+    UPLOAD_FAILED = 'failed'
+    _UPLOAD_CHOICES = [(UPLOAD_NONE, 'Not rendered'), (UPLOAD_PENDING, 'Waiting for upload'),
+                       (UPLOAD_DONE, 'Uploaded'), (UPLOAD_FAILED, 'Upload failed')]
+
     invoice_id = models.CharField(primary_key=True, unique=True, max_length=100)
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_invoiced')
     total = models.DecimalField(max_digits=10, decimal_places=2)
     payment_status = models.BooleanField(default=False, blank=True, null=False)
+    pdf_name = models.CharField(max_length=255, blank=True, default='')
+    upload_status = models.CharField(max_length=10, choices=_UPLOAD_CHOICES, default=UPLOAD_NONE)
 
     def save(self, *args, **kwargs):
-        if not self.invoice_id:
-            self.invoice_id = generate_invoice_id(self.student, get_latest_id_number(self.student))
-        super(Invoice, self).save(*args, **kwargs)
-
-
-def get_latest_id_number(student: User):
-    """Function to get the last invoice ID number for a given Student."""
-    latest_number = 0
-    try:
-        latest_number = Invoice.objects.filter(student=student).latest('invoice_id').invoice_id[-2:].lstrip('-')
-    except Invoice.DoesNotExist as e:
-        pass
-    return latest_number
+        with transaction.atomic():
+            if not self.invoice_id:
+                self.invoice_id = generate_invoice_id(self.student, reserve_invoice_numbers(self.student) - 1)
+            super(Invoice, self).save(*args, **kwargs)
+
+
+class InvoiceCounter(models.Model):
+    """Class representing the number of the last invoice issued to a Student.
+
+    Invoice numbers are taken from this counter, which is incremented atomically, rather than worked out from the
+    invoice ids already issued.
+    """
+    student = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='invoice_counter')
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.student}: {self.last_number}'
+
+
+def reserve_invoice_numbers(student: User, count: int = 1) -> int:
+    """Function to reserve the next invoice number(s) of a given Student.
+
+    The counter is incremented with a single UPDATE, so concurrent callers never get the same number.
+    :param student: the Student user for whom invoices are being generated.
+    :param count: how many consecutive numbers to reserve.
+    :return: the first number reserved.
+    """
+    counter = InvoiceCounter.objects.filter(student=student)
+    with transaction.atomic():
+        if not counter.update(last_number=F('last_number') + count):
+            # The first invoice number of this student: start the counter after any invoice issued before it existed
+            InvoiceCounter.objects.get_or_create(student=student,
+                                                 defaults={'last_number': _get_highest_issued_number(student)})
+            counter.update(last_number=F('last_number') + count)
+        last_number = counter.values_list('last_number', flat=True).get()
+    return last_number - count + 1
+
+
+def _get_highest_issued_number(student: User) -> int:
+    """Returns the highest number among the invoice ids of a Student, used to start their counter."""
+    numbers = [invoice_id.rsplit('-', 1)[-1] for invoice_id in
+               Invoice.objects.filter(student=student).values_list('invoice_id', flat=True)]
+    return max((int(number) for number in numbers if number.isdigit()), default=0)
@@ -0,0 +1,155 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+
+from invoicer.helpers import invoice_generator as ig
+from invoicer.helpers import s3_uploader
+from invoicer.helpers.invoice_archive import get_archived_requests, stream_invoice_archive
+from invoicer.models import Invoice
+from invoicer.tests_invoicer.test_s3_uploader import LocalS3
+from request_handler.fixtures.create_test_requests import create_test_requests
+from request_handler.models.request_model import Request
+from user_system.fixtures.create_test_users import create_test_users
+from user_system.models.user_model import User
+
+
+@override_settings(USE_AWS_S3=False)
+class TestExportInvoices(TestCase):
+    def setUp(self):
+        create_test_users()
+        create_test_requests()
+        self.admin = User.objects.get(user_type='Admin')
+        self.student = User.objects.get(user_type='Student')
+        self.request_alloc = Request.objects.get(allocated=True)
+        self.client.force_login(self.admin)
+        self.invoices = [self.generate_invoice(self.request_alloc), self.generate_invoice(self.copy_request())]
+        self.url = reverse('export_invoices')
+
+    def tearDown(self):
+        for invoice in self.invoices:
+            ig.remove_stored_invoices(invoice.invoice_id)
+        super().tearDown()
+
+    def test_admin_can_export_invoices(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="invoices.zip"')
+        chunks = list(response.streaming_content)
+        # The archive is sent entry by entry rather than in one piece
+        self.assertGreater(len(chunks), 2)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()),
+                             sorted(f'{invoice.invoice_id}.pdf' for invoice in self.invoices))
+            for invoice in self.invoices:
+                self.assertTrue(archive.read(f'{invoice.invoice_id}.pdf').startswith(b'%PDF'))
+
+    def test_export_by_term(self):
+        Request.objects.filter(invoice=self.invoices[1]).update(term='May')
+        response = self.client.get(self.url, {'term': 'May'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="invoices-may.zip"')
+        self.assertEqual(self.read_archive(response).namelist(), [f'{self.invoices[1].invoice_id}.pdf'])
+
+    def test_export_by_student(self):
+        other = User.objects.create(username='@other', email='other@other.com', user_type='Student')
+        Invoice.objects.filter(pk=self.invoices[1].pk).update(student=other)
+        response = self.client.get(self.url, {'student': self.student.id})
+        self.assertEqual(self.read_archive(response).namelist(), [f'{self.invoices[0].invoice_id}.pdf'])
+
+    def test_missing_pdfs_are_rendered(self):
+        ig.remove_stored_invoices(self.invoices[0].invoice_id)
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.read_archive(response).namelist()), 2)
+        self.assertTrue(ig.invoice_is_stored(Invoice.objects.get(pk=self.invoices[0].pk).pdf_name))
+
+    # Test that missing PDFs are rendered as the archive streams, so the first bytes do not wait for all of them.
+    def test_first_chunk_is_streamed_before_later_invoices_are_rendered(self):
+        for invoice in self.invoices:
+            ig.remove_stored_invoices(invoice.invoice_id)
+        with patch('invoicer.helpers.invoice_generator.render_invoice', wraps=ig.render_invoice) as render_invoice:
+            chunks = stream_invoice_archive(get_archived_requests(), workers=1)
+            first_chunk = next(chunks)
+            self.assertEqual(render_invoice.call_count, 1)
+            archive = zipfile.ZipFile(io.BytesIO(first_chunk + b''.join(chunks)))
+            self.assertEqual(render_invoice.call_count, 2)
+        self.assertTrue(first_chunk)
+        self.assertEqual(len(archive.namelist()), 2)
+
+    # Test that invoices that cannot be rendered are listed, without stopping the others.
+    def test_unrenderable_invoices_are_listed(self):
+        ig.remove_stored_invoices(self.invoices[0].invoice_id)
+        with patch('invoicer.helpers.invoice_generator.render_invoice', side_effect=RuntimeError('Broken PDF')), \
+                self.assertLogs('invoicer.helpers.invoice_archive', level='ERROR'):
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_invoice_archive(get_archived_requests()))))
+        self.assertIn(f'{self.invoices[0].invoice_id}: Broken PDF', archive.read('MISSING.txt').decode())
+        self.assertEqual(archive.namelist(), [f'{self.invoices[1].invoice_id}.pdf', 'MISSING.txt'])
+
+    def test_requests_sharing_an_invoice_are_exported_once(self):
+        self.copy_request(invoice=self.invoices[0])
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.read_archive(response).namelist()), 2)
+
+    def test_unreadable_invoices_are_listed(self):
+        with patch('invoicer.helpers.invoice_archive.read_invoice', side_effect=OSError('Disk error')), \
+                self.assertLogs('invoicer.helpers.invoice_archive', level='ERROR'):
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_invoice_archive(get_archived_requests()))))
+        self.assertEqual(archive.namelist(), ['MISSING.txt'])
+        self.assertIn(f'{self.invoices[0].invoice_id}: Disk error', archive.read('MISSING.txt').decode())
+
+    def test_invalid_selections(self):
+        self.assertEqual(self.client.get(self.url, {'term': 'Summer'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'student': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'student': self.admin.id}).status_code, 404)
+        Request.objects.update(invoice=None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_only_admins_can_export_invoices(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_export_only_accepts_get(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(USE_AWS_S3=True, INVOICE_UPLOAD_IN_BACKGROUND=False)
+    def test_export_from_s3(self):
+        Invoice.objects.update(pdf_name='', upload_status=Invoice.UPLOAD_NONE)  # Only stored locally so far
+        spool = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool, ignore_errors=True)
+        s3 = LocalS3()
+        with patch.object(s3_uploader, '_SPOOL_PATH', spool), \
+                patch('code_tutors.aws.s3.get_client', return_value=s3), \
+                patch('code_tutors.aws.s3._get_credentials', return_value={'AccessKeyId': 'key'}):
+            # One invoice is uploaded to S3, the other one is still waiting in the spool
+            self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoices[0].invoice_id}))
+            s3_uploader.drain_spool()
+            self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoices[1].invoice_id}))
+
+            archive = self.read_archive(self.client.get(self.url))
+        self.assertEqual(len(s3.objects), 1)
+        for invoice in self.invoices:
+            self.assertTrue(archive.read(f'{invoice.invoice_id}.pdf').startswith(b'%PDF'))
+
+    def read_archive(self, response) -> zipfile.ZipFile:
+        self.assertEqual(response.status_code, 200)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def copy_request(self, invoice: Invoice = None) -> Request:
+        lesson_request = Request.objects.get(pk=self.request_alloc.pk)
+        lesson_request.pk = None
+        lesson_request.invoice = invoice
+        lesson_request.save()
+        return lesson_request
+
+    def generate_invoice(self, lesson_request: Request) -> Invoice:
+        self.client.get(reverse('generate_invoice', kwargs={'tutoring_request_id': lesson_request.id}))
+        lesson_request.refresh_from_db()
+        ig.get_or_generate_invoice(lesson_request)
+        return lesson_request.invoice
@@ -1,12 +1,14 @@
-import os
+import glob
+from unittest.mock import patch
 
 from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import reverse
 from django.test import TestCase, override_settings
 
+from invoicer.helpers import invoice_generator as ig
 from invoicer.helpers.generate_invoice_id import generate_invoice_id
-from invoicer.models import get_latest_id_number
+from invoicer.models import Invoice, InvoiceCounter, _get_highest_issued_number, reserve_invoice_numbers
 from request_handler.models.request_model import Request
 from request_handler.models.venue_model import Venue
 from user_system.fixtures import create_test_users as create_fixtures
@@ -23,8 +25,7 @@ class TestGenerateInvoice(TestCase):
         self.tutor = User.objects.get(user_type='Tutor')
         self.admin = User.objects.get(user_type='Admin')
         self.original_setting_value = settings.USE_AWS_S3
-        self.invoice_id = generate_invoice_id(self.student, get_latest_id_number(self.student))
-        self.path = f'{settings.INVOICE_OUTPUT_PATH}/{self.invoice_id}.pdf'
+        self.invoice_id = generate_invoice_id(self.student, _get_highest_issued_number(self.student))
         self.request = Request.objects.create(
             student=self.student,
             allocated=True,
@@ -37,12 +38,11 @@ class TestGenerateInvoice(TestCase):
         )
 
     def tearDown(self):
-        if os.path.exists(self.path):
-            os.remove(self.path)
+        ig.remove_stored_invoices(self.invoice_id)
         super().tearDown()
 
     def test_generate_invoice_id(self):
-        self.assertEqual(generate_invoice_id(self.student, get_latest_id_number(student=self.student)),
+        self.assertEqual(generate_invoice_id(self.student, reserve_invoice_numbers(self.student) - 1),
                          str(self.invoice_id))
 
     @override_settings(USE_AWS_S3=False)
@@ -55,10 +55,27 @@ class TestGenerateInvoice(TestCase):
         self.client.force_login(self.admin)
         response = self.client.get(reverse('generate_invoice', kwargs={"tutoring_request_id": self.request.id}))
         self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'Not rendered yet', status_code=409)
+
+    # Test that the page of an invoice already generated shows where its latest PDF is stored.
+    @override_settings(USE_AWS_S3=False)
+    def test_already_generated_invoice_shows_its_pdf(self):
+        generate_invoice(self.client, self.admin, self.request.id)
+        self.request.refresh_from_db()
+        name = ig.get_or_generate_invoice(self.request)
+        response = self.client.get(reverse('generate_invoice', kwargs={"tutoring_request_id": self.request.id}))
+        self.assertContains(response, ig.get_invoice_path(name), status_code=409)
+
+    # Test that generating an invoice does not render its PDF, which is only rendered when first viewed.
+    @override_settings(USE_AWS_S3=False)
+    def test_generate_invoice_does_not_render_pdf(self):
+        with patch('invoicer.helpers.invoice_generator.render_invoice') as render_invoice:
+            generate_invoice(self.client, self.admin, self.request.id)
+        render_invoice.assert_not_called()
+        self.assertFalse(glob.glob(f'{settings.INVOICE_OUTPUT_PATH}/{self.invoice_id}-*.pdf'))
 
     def _assertions_for_local_invoice(self, response: HttpResponse) -> None:
-        with open(self.path, 'rb') as file:
-            self.assertIsNotNone(file)
+        self.assertTrue(Invoice.objects.filter(invoice_id=self.invoice_id).exists())
         self.assertEqual(response.status_code, 201)
         self.assertTemplateUsed(response, "invoice_generated.html")
 
@@ -66,3 +83,38 @@ class TestGenerateInvoice(TestCase):
 def generate_invoice(client, admin, request_id) -> HttpResponse:
     client.force_login(admin)
     return client.get(reverse("generate_invoice", kwargs={"tutoring_request_id": request_id}))
+
+
+class TestInvoiceCounter(TestCase):
+    def setUp(self):
+        create_fixtures.create_test_users()
+        self.student = User.objects.get(user_type='Student')
+
+    # Test that invoice numbers keep their order past 9, where comparing ids as strings would not.
+    def test_numbers_increase_past_nine(self):
+        invoice_ids = [Invoice.objects.create(student=self.student, total=0).invoice_id for _ in range(11)]
+        self.assertEqual(invoice_ids[-1], generate_invoice_id(self.student, '10'))
+        self.assertEqual(len(set(invoice_ids)), 11)
+        self.assertEqual(_get_highest_issued_number(self.student), 11)
+        self.assertEqual(InvoiceCounter.objects.get(student=self.student).last_number, 11)
+
+    def test_reserve_block_of_numbers(self):
+        self.assertEqual(reserve_invoice_numbers(self.student, count=3), 1)
+        self.assertEqual(reserve_invoice_numbers(self.student), 4)
+        self.assertEqual(InvoiceCounter.objects.get(student=self.student).last_number, 4)
+
+    # Test that a counter created for a student who already has invoices carries on from the highest number.
+    def test_counter_starts_after_existing_invoices(self):
+        for number in (2, 12):
+            Invoice.objects.create(invoice_id=generate_invoice_id(self.student, str(number - 1)), student=self.student,
+                                   total=0)
+        self.assertEqual(_get_highest_issued_number(self.student), 12)
+        self.assertEqual(reserve_invoice_numbers(self.student), 13)
+
+    # Test that reserving a number takes the same queries however many invoices the student has.
+    def test_reserve_queries_do_not_depend_on_invoices(self):
+        reserve_invoice_numbers(self.student)
+        Invoice.objects.bulk_create(Invoice(invoice_id=f'INV-TEST-{number}', student=self.student, total=0)
+                                    for number in range(50))
+        with self.assertNumQueries(4):  # savepoint, update, read back, release
+            reserve_invoice_numbers(self.student)
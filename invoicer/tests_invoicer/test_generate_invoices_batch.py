@@ -0,0 +1,161 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from invoicer.helpers import invoice_generator as ig
+from invoicer.helpers import batch_invoicer
+from invoicer.helpers.batch_invoicer import create_invoices, generate_invoices
+from invoicer.helpers.generate_invoice_id import generate_invoice_id
+from invoicer.models import Invoice
+from request_handler.models.request_model import Request
+from request_handler.models.venue_model import Venue
+from user_system.fixtures import create_test_users as create_fixtures
+from user_system.models.day_model import Day
+from user_system.models.knowledge_area_model import KnowledgeArea
+from user_system.models.user_model import User
+
+
+@override_settings(USE_AWS_S3=False, INVOICE_BATCH_IN_BACKGROUND=False)
+class TestGenerateInvoicesBatch(TestCase):
+    def setUp(self):
+        create_fixtures.create_test_users()
+        self.student = User.objects.get(user_type='Student')
+        self.tutor = User.objects.get(user_type='Tutor')
+        self.admin = User.objects.get(user_type='Admin')
+        self.requests = [self.create_request(frequency) for frequency in ('Weekly', 'Biweekly', 'Fortnightly')]
+
+    def tearDown(self):
+        for invoice_id in Invoice.objects.values_list('invoice_id', flat=True):
+            ig.remove_stored_invoices(invoice_id)
+        super().tearDown()
+
+    def test_batch_invoices_every_allocated_request(self):
+        result = generate_invoices(workers=1)
+        self.assertEqual(result.failed, {})
+        self.assertEqual(len(result.generated), 3)
+        self.assertGreater(result.throughput, 0)
+        for lesson_request in Request.objects.filter(id__in=[request.id for request in self.requests]):
+            self.assertIsNotNone(lesson_request.invoice)
+            self.assertTrue(ig.invoice_is_stored(ig.get_artifact_name(ig.get_invoice_data(lesson_request))))
+
+    # Test that the invoices of a student are numbered one after the other.
+    def test_batch_invoice_numbers(self):
+        result = generate_invoices(workers=1)
+        self.assertEqual(sorted(result.generated), [generate_invoice_id(self.student, str(number)) for number in range(3)])
+
+    def test_batch_skips_invoiced_and_unallocated_requests(self):
+        generate_invoices(workers=1)
+        self.create_request('Weekly', allocated=False)
+        result = generate_invoices(workers=1)
+        self.assertEqual(result.generated, [])
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    # Test that one invoice failing to render does not stop the others, and is left to be retried.
+    def test_batch_survives_individual_failures(self):
+        render = ig.render_invoice
+
+        def failing_render(data):
+            if data['lessons'] == 30:
+                raise RuntimeError('Broken PDF')
+            return render(data)
+
+        with patch('invoicer.helpers.invoice_generator.render_invoice', side_effect=failing_render):
+            result = generate_invoices(workers=1)
+        self.assertEqual(len(result.generated), 2)
+        self.assertEqual(result.failed, {self.requests[1].id: 'Broken PDF'})
+        self.requests[1].refresh_from_db()
+        self.assertIsNone(self.requests[1].invoice)
+        self.assertEqual(Invoice.objects.count(), 2)
+
+        result = generate_invoices(workers=1)
+        self.assertEqual(len(result.generated), 1)
+
+    # Test that a request invoiced after the batch selected it keeps its invoice.
+    def test_batch_skips_requests_invoiced_in_the_meantime(self):
+        requests = list(Request.objects.filter(id__in=[request.id for request in self.requests]).order_by('id'))
+        self.client.force_login(self.admin)
+        self.client.get(reverse('generate_invoice', kwargs={'tutoring_request_id': self.requests[0].id}))
+        invoice_id = Request.objects.get(id=self.requests[0].id).invoice_id
+
+        invoiced = create_invoices(requests, {})
+        self.assertEqual([request.id for request in invoiced], [request.id for request in self.requests[1:]])
+        self.assertEqual(Request.objects.get(id=self.requests[0].id).invoice_id, invoice_id)
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    def test_batch_reports_requests_without_cost(self):
+        self.requests[0].duration = 'invalid'
+        self.requests[0].save()
+        result = generate_invoices(workers=1)
+        self.assertIn(self.requests[0].id, result.failed)
+        self.assertEqual(len(result.generated), 2)
+
+    def test_batch_renders_in_worker_processes(self):
+        result = generate_invoices(workers=2)
+        self.assertEqual(result.failed, {})
+        self.assertEqual(len(result.generated), 3)
+        for lesson_request in Request.objects.filter(id__in=[request.id for request in self.requests]):
+            name = ig.get_artifact_name(ig.get_invoice_data(lesson_request))
+            with open(ig.get_invoice_path(name), 'rb') as file:
+                self.assertTrue(file.read().startswith(b'%PDF'))
+
+    def test_management_command_generates_invoices(self):
+        out = StringIO()
+        call_command('generate_invoices', '--workers', '1', stdout=out)
+        self.assertIn('3 invoice(s) generated', out.getvalue())
+        self.assertFalse(Request.objects.filter(allocated=True, invoice__isnull=True).exists())
+
+    def test_admin_generates_all_invoices(self):
+        self.client.force_login(self.admin)
+        with patch.object(batch_invoicer, '_WORKERS', 1), self.assertLogs('invoicer.helpers.batch_invoicer') as logs:
+            response = self.client.post(reverse('generate_all_invoices'), follow=True)
+        self.assertRedirects(response, reverse('admin_dash'))
+        self.assertContains(response, 'The invoices are being generated')
+        self.assertIn('3 invoice(s) generated', logs.output[0])
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    # Test that the Admin is redirected without waiting for the batch, which runs in a background thread.
+    def test_admin_does_not_wait_for_the_batch(self):
+        self.client.force_login(self.admin)
+        with override_settings(INVOICE_BATCH_IN_BACKGROUND=True), \
+                patch('invoicer.helpers.batch_invoicer.threading.Thread') as thread:
+            response = self.client.post(reverse('generate_all_invoices'))
+            batch_invoicer._running.release()
+        self.assertRedirects(response, reverse('admin_dash'), fetch_redirect_response=False)
+        thread.assert_called_once_with(target=batch_invoicer._run_batch, name='invoice-batch', daemon=True)
+        thread.return_value.start.assert_called_once()
+        self.assertEqual(Invoice.objects.count(), 0)
+
+    # Test that only one batch runs at a time.
+    def test_admin_cannot_start_a_second_batch(self):
+        self.client.force_login(self.admin)
+        with batch_invoicer._running:
+            response = self.client.post(reverse('generate_all_invoices'))
+        self.assertIn('already being generated', [str(message) for message in get_messages(response.wsgi_request)][0])
+        self.assertEqual(Invoice.objects.count(), 0)
+
+    def test_generate_all_invoices_only_accepts_post(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('generate_all_invoices'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_non_admin_cannot_generate_all_invoices(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('generate_all_invoices'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Invoice.objects.count(), 0)
+
+    def create_request(self, frequency: str, allocated: bool = True) -> Request:
+        return Request.objects.create(
+            student=self.student,
+            allocated=allocated,
+            tutor=self.tutor if allocated else None,
+            knowledge_area=KnowledgeArea.objects.filter(user=self.tutor).first().subject,
+            frequency=frequency,
+            duration='1h',
+            venue=Venue.objects.get(venue='Online'),
+            day=Day.objects.get(day='Monday'),
+        )
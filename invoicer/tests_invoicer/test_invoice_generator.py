@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from invoicer.helpers import invoice_generator as ig
+
+
+class TestInvoiceGenerator(SimpleTestCase):
+    def setUp(self):
+        self.data = {
+            'invoice_id': 'INV-JOHDOE-1',
+            'tutor_name': 'Jane Doe',
+            'tutor_email': 'jane.doe@example.org',
+            'student_name': 'John Doe',
+            'hourly_rate': Decimal('20.00'),
+            'lessons': 15,
+            'total': Decimal('300.00'),
+            'paid': False,
+        }
+
+    def test_render_invoice_returns_pdf(self):
+        pdf = ig.render_invoice(self.data)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    # Test that the page is compressed.
+    def test_render_invoice_uses_compression(self):
+        pdf = ig.render_invoice(self.data)
+        self.assertIn(b'/FlateDecode', pdf)
+        self.assertNotIn(b'Code Connect Tutors', pdf)  # Only readable if the content streams were left uncompressed
+
+    # Test that the logo is downsampled to the size it is printed at, and only prepared once.
+    def test_logo_is_downsampled_and_cached(self):
+        logo = ig.get_logo()
+        self.assertIs(ig.get_logo(), logo)
+        width, height = logo.getSize()
+        self.assertLessEqual(width, round(100 * ig._LOGO_DPI / 72))
+        self.assertLessEqual(height, round(40 * ig._LOGO_DPI / 72))
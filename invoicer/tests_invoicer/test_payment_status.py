@@ -1,12 +1,9 @@
-import os
-
-from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import reverse
 from django.test import TestCase, override_settings
 
 from invoicer.helpers.generate_invoice_id import generate_invoice_id
-from invoicer.models import get_latest_id_number
+from invoicer.models import Invoice, _get_highest_issued_number
 from request_handler.fixtures.create_test_requests import create_test_requests
 from request_handler.models.request_model import Request
 from user_system.fixtures.create_test_users import create_test_users
@@ -20,8 +17,7 @@ class TestPaymentStatus(TestCase):
         self.admin = User.objects.get(user_type='Admin')
         self.request_alloc = Request.objects.get(allocated=True)
         self.invoice_id = generate_invoice_id(self.request_alloc.student,
-                                              get_latest_id_number(self.request_alloc.student))
-        self.path = f'{settings.INVOICE_OUTPUT_PATH}/{self.invoice_id}.pdf'
+                                              _get_highest_issued_number(self.request_alloc.student))
 
     @override_settings(USE_AWS_S3=False)
     def test_admin_can_set_as_paid_for_generated_invoice(self):
@@ -32,7 +28,6 @@ class TestPaymentStatus(TestCase):
                                                                           "payment_status": 1}))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(self.request_alloc.invoice.payment_status, True)
-        os.remove(self.path)
 
     @override_settings(USE_AWS_S3=False)
     def test_admin_can_set_as_unpaid_for_generated_invoice(self):
@@ -43,7 +38,6 @@ class TestPaymentStatus(TestCase):
                                                                           "payment_status": 0}))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(self.request_alloc.invoice.payment_status, False)
-        os.remove(self.path)
 
     @override_settings(USE_AWS_S3=False)
     def test_get_request_is_not_allowed(self):
@@ -71,7 +65,6 @@ class TestPaymentStatus(TestCase):
                                                                          "payment_status": 1}))
         self.assertEqual(response.status_code, 403)
         self.assertEqual(response.content, b'You must be an admin to view this page')
-        os.remove(self.path)
 
     @override_settings(USE_AWS_S3=False)
     def generate_invoice(self) -> HttpResponse:
@@ -80,7 +73,6 @@ class TestPaymentStatus(TestCase):
 
     @override_settings(USE_AWS_S3=False)
     def invoice_assertions(self, response: HttpResponse):
-        with open(self.path, 'rb') as file:
-            self.assertIsNotNone(file)
+        self.assertTrue(Invoice.objects.filter(invoice_id=self.invoice_id).exists())
         self.assertEqual(response.status_code, 201)
         self.assertTemplateUsed(response, "invoice_generated.html")
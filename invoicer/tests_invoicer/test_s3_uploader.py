@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+
+from invoicer.helpers import invoice_generator as ig
+from invoicer.helpers import s3_uploader
+from invoicer.models import Invoice
+from request_handler.fixtures.create_test_requests import create_test_requests
+from request_handler.models.request_model import Request
+from user_system.fixtures.create_test_users import create_test_users
+from user_system.models.user_model import User
+
+
+class LocalS3:
+    """A local stand-in for an S3 client, keeping objects in memory."""
+
+    def __init__(self, failures: int = 0):
+        self.objects = {}
+        self.failures = failures
+        self.head_calls = 0
+
+    def upload_fileobj(self, obj, Bucket, Key, ExtraArgs=None, Config=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('Connection reset')
+        self.objects[(Bucket, Key)] = obj.read()
+
+    def download_fileobj(self, Bucket, Key, Fileobj, Config=None):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        Fileobj.write(self.objects[(Bucket, Key)])
+
+    def head_object(self, Bucket, Key):
+        self.head_calls += 1
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix):
+        return {'Contents': [{'Key': key} for bucket, key in sorted(self.objects)
+                             if bucket == Bucket and key.startswith(Prefix)]}
+
+    def delete_objects(self, Bucket, Delete):
+        for entry in Delete['Objects']:
+            self.objects.pop((Bucket, entry['Key']), None)
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}"
+
+
+@override_settings(USE_AWS_S3=True, INVOICE_UPLOAD_IN_BACKGROUND=False)
+class TestS3Uploader(TestCase):
+    def setUp(self):
+        create_test_users()
+        create_test_requests()
+        self.admin = User.objects.get(user_type='Admin')
+        self.request_alloc = Request.objects.get(allocated=True)
+        self.client.force_login(self.admin)
+        self.client.get(reverse('generate_invoice', kwargs={'tutoring_request_id': self.request_alloc.id}))
+        self.request_alloc.refresh_from_db()
+        self.invoice = self.request_alloc.invoice
+
+        self.spool = tempfile.mkdtemp()
+        self.s3 = LocalS3()
+        for patcher in (patch.object(s3_uploader, '_SPOOL_PATH', self.spool),
+                        patch.object(s3_uploader, '_BACKOFF', 0),
+                        patch('code_tutors.aws.s3.get_client', side_effect=lambda *args, **kwargs: self.s3),
+                        patch('code_tutors.aws.s3._get_credentials', return_value={'AccessKeyId': 'key'})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.spool, ignore_errors=True)
+
+    # Test that viewing an invoice spools its PDF and serves it from the spool, without waiting for S3.
+    def test_invoice_is_spooled_and_served_locally(self):
+        response = self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/pdf')
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.upload_status, Invoice.UPLOAD_PENDING)
+        self.assertEqual(os.listdir(self.spool), [self.invoice.pdf_name])
+        self.assertEqual(self.s3.objects, {})
+
+    def test_drain_uploads_spooled_invoices(self):
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        result = s3_uploader.drain_spool()
+        self.invoice.refresh_from_db()
+        self.assertEqual(result.uploaded, [self.invoice.pdf_name])
+        self.assertEqual(self.invoice.upload_status, Invoice.UPLOAD_DONE)
+        self.assertEqual(os.listdir(self.spool), [])
+        self.assertIn(ig.get_invoice_key(self.invoice.pdf_name), [key for _, key in self.s3.objects])
+
+        # Once uploaded, the invoice is a redirection to S3, without asking S3 whether it exists
+        head_calls = self.s3.head_calls
+        response = self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(ig.get_invoice_key(self.invoice.pdf_name), response.url)
+        self.assertEqual(self.s3.head_calls, head_calls)
+
+    # Test that uploading the latest PDF of an invoice deletes its older ones, including one named as they used to be.
+    def test_drain_deletes_superseded_pdfs(self):
+        bucket = s3_uploader.yaml_loader.get_bucket_name('invoicer')
+        invoice_id = self.invoice.invoice_id
+        older = ig.get_invoice_key(f'{invoice_id}-0123456789abcdef.pdf')
+        legacy = ig.get_invoice_key(f'{invoice_id}.pdf')
+        other = ig.get_invoice_key(f'{invoice_id}0-0123456789abcdef.pdf')
+        self.s3.objects.update({(bucket, older): b'%PDF', (bucket, legacy): b'%PDF', (bucket, other): b'%PDF'})
+
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': invoice_id}))
+        s3_uploader.drain_spool()
+        self.invoice.refresh_from_db()
+        self.assertEqual(sorted(key for _, key in self.s3.objects),
+                         sorted([ig.get_invoice_key(self.invoice.pdf_name), other]))
+
+    # Test that a PDF superseded before it was uploaded is deleted from S3 straight away.
+    def test_drain_deletes_pdfs_superseded_while_spooled(self):
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        Invoice.objects.filter(invoice_id=self.invoice.invoice_id).update(pdf_name='newer.pdf')
+        result = s3_uploader.drain_spool()
+        self.assertEqual(len(result.uploaded), 1)
+        self.assertEqual(self.s3.objects, {})
+
+    # Test that S3 is only asked whether a PDF exists if the invoice does not record its latest PDF.
+    def test_invoice_is_stored_trusts_the_invoice(self):
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        s3_uploader.drain_spool()
+        self.invoice.refresh_from_db()
+        self.assertFalse(ig.invoice_is_stored(f'{self.invoice.invoice_id}-0123456789abcdef.pdf', self.invoice))
+        self.assertTrue(ig.invoice_is_stored(self.invoice.pdf_name, self.invoice))
+        self.assertEqual(self.s3.head_calls, 1)  # When the PDF was first rendered
+
+        self.invoice.pdf_name = ''
+        self.assertTrue(ig.invoice_is_stored(ig.get_artifact_name(ig.get_invoice_data(self.request_alloc)),
+                                             self.invoice))
+        self.assertEqual(self.s3.head_calls, 2)
+
+    def test_upload_is_retried(self):
+        self.s3.failures = 2
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        result = s3_uploader.drain_spool()
+        self.assertEqual(len(result.uploaded), 1)
+        self.assertEqual(result.failed, {})
+
+    # Test that an upload failing every attempt is recorded, and left in the spool for the next run.
+    def test_failed_upload_stays_in_spool(self):
+        self.s3.failures = s3_uploader._ATTEMPTS
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        result = s3_uploader.drain_spool()
+        self.invoice.refresh_from_db()
+        self.assertEqual(result.failed, {self.invoice.pdf_name: 'Connection reset'})
+        self.assertEqual(self.invoice.upload_status, Invoice.UPLOAD_FAILED)
+        self.assertEqual(os.listdir(self.spool), [self.invoice.pdf_name])
+
+        result = s3_uploader.drain_spool()
+        self.invoice.refresh_from_db()
+        self.assertEqual(result.uploaded, [self.invoice.pdf_name])
+        self.assertEqual(self.invoice.upload_status, Invoice.UPLOAD_DONE)
+
+    def test_management_command_uploads_invoices(self):
+        self.client.get(reverse('get_invoice', kwargs={'invoice_id': self.invoice.invoice_id}))
+        out = StringIO()
+        call_command('upload_invoices', stdout=out)
+        self.assertIn('1 invoice(s) uploaded.', out.getvalue())
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_empty_spool(self):
+        self.assertEqual(s3_uploader.drain_spool(), s3_uploader.UploadResult([], {}))
+
+    @override_settings(INVOICE_UPLOAD_IN_BACKGROUND=True)
+    def test_notify_wakes_background_uploader(self):
+        drained = threading.Event()
+        uploader = s3_uploader.SpoolUploader(interval=3600)
+        with patch('invoicer.helpers.s3_uploader.drain_spool',
+                   side_effect=lambda: drained.set() or s3_uploader.UploadResult([], {})):
+            uploader.notify()
+            self.assertTrue(drained.wait(timeout=5))
@@ -1,11 +1,14 @@
+import glob
 import os
+from unittest.mock import patch
 
 from django.conf import settings
 from django.shortcuts import reverse
 from django.test import TestCase, override_settings
 
+from invoicer.helpers import invoice_generator as ig
 from invoicer.helpers.generate_invoice_id import generate_invoice_id
-from invoicer.models import Invoice, get_latest_id_number
+from invoicer.models import Invoice, _get_highest_issued_number
 from request_handler.fixtures.create_test_requests import create_test_requests
 from request_handler.models.request_model import Request
 from user_system.fixtures.create_test_users import create_test_users
@@ -18,12 +21,10 @@ class TestViewInvoices(TestCase):
         create_test_requests()
         self.student = User.objects.get(user_type='Student')
         self.request_alloc = Request.objects.get(allocated=True)
-        self.invoice_id = generate_invoice_id(self.student, get_latest_id_number(self.student))
-        self.path = f'{settings.INVOICE_OUTPUT_PATH}/{self.invoice_id}.pdf'
+        self.invoice_id = generate_invoice_id(self.student, _get_highest_issued_number(self.student))
 
     def tearDown(self):
-        if os.path.exists(self.path):
-            os.remove(self.path)
+        ig.remove_stored_invoices(self.invoice_id)
         super().tearDown()
 
     @override_settings(USE_AWS_S3=False)
@@ -70,6 +71,49 @@ class TestViewInvoices(TestCase):
                                          total=0.0)
         self.assertEqual(invoice.invoice_id, self.invoice_id)
 
+    # Test that the PDF is rendered on first access only, and served from storage afterwards.
+    @override_settings(USE_AWS_S3=False)
+    def test_invoice_is_rendered_once_on_first_access(self):
+        self.generate_invoice()
+        self.client.login(username='@johndoe', password='Password123')
+        url = reverse("get_invoice", kwargs={"invoice_id": self.invoice_id})
+        with patch('invoicer.helpers.invoice_generator.render_invoice', wraps=ig.render_invoice) as render_invoice:
+            self.assert_correct_retrieval(self.client.get(url))
+            self.assert_correct_retrieval(self.client.get(url))
+        self.assertEqual(render_invoice.call_count, 1)
+        self.assertEqual(len(self.stored_invoices()), 1)
+
+    # Test that changing what is printed on the invoice renders it again, replacing the old PDF.
+    @override_settings(USE_AWS_S3=False)
+    def test_invoice_is_rendered_again_when_it_changes(self):
+        self.generate_invoice()
+        self.client.login(username='@johndoe', password='Password123')
+        url = reverse("get_invoice", kwargs={"invoice_id": self.invoice_id})
+        self.client.get(url)
+        unpaid = self.stored_invoices()
+        Invoice.objects.filter(invoice_id=self.invoice_id).update(payment_status=True)
+        with patch('invoicer.helpers.invoice_generator.render_invoice', wraps=ig.render_invoice) as render_invoice:
+            self.assert_correct_retrieval(self.client.get(url))
+        self.assertEqual(render_invoice.call_count, 1)
+        paid = self.stored_invoices()
+        self.assertEqual(len(paid), 1)
+        self.assertNotEqual(paid, unpaid)
+
+    # Test that storing a PDF also removes one named as they used to be, <invoice id>.pdf.
+    @override_settings(USE_AWS_S3=False)
+    def test_legacy_invoice_is_replaced(self):
+        self.generate_invoice()
+        legacy = ig.get_invoice_path(f'{self.invoice_id}.pdf')
+        with open(legacy, 'wb') as file:
+            file.write(b'%PDF')
+        self.client.login(username='@johndoe', password='Password123')
+        self.assert_correct_retrieval(self.client.get(reverse("get_invoice", kwargs={"invoice_id": self.invoice_id})))
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(len(self.stored_invoices()), 1)
+
+    def stored_invoices(self) -> list[str]:
+        return glob.glob(f'{settings.INVOICE_OUTPUT_PATH}/{self.invoice_id}-*.pdf')
+
     def assert_correct_retrieval(self, response):
         self.assertEqual(response.status_code, 200)
         self.assertIn('Content-Disposition', response.headers)
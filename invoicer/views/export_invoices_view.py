@@ -0,0 +1,44 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.text import slugify
+
+from invoicer.helpers.invoice_archive import get_archived_requests, stream_invoice_archive
+from request_handler.forms import RequestForm
+from user_system.models.user_model import User
+
+
+@login_required
+def export_invoices(http_request: HttpRequest) -> HttpResponse | StreamingHttpResponse:
+    """View function to download the invoices of a term, of a student, or of both, as a single ZIP archive.
+
+    The term and student (id) are given as query parameters; without either, every invoice is exported. The archive is
+    streamed while it is being built (missing PDFs being rendered along the way), so the download starts straight away
+    whatever the number of invoices.
+    Only Admin users can export invoices. As this is a read-only response, only GET requests are accepted.
+    :param http_request: the HTTP request object.
+    :return: a streamed ZIP archive, or an appropriate error response.
+    """
+    if not http_request.user.is_admin:
+        return render(http_request, 'permission_denied.html', status=403)
+
+    if http_request.method != 'GET':
+        return HttpResponseNotAllowed(["GET"], status=405, content=b'Not Allowed')
+
+    term = http_request.GET.get('term') or None
+    if term is not None and term not in dict(RequestForm.USER_TERM_CHOICES):
+        return HttpResponse('This term does not exist!', status=400)
+    student = None
+    if http_request.GET.get('student'):
+        if not http_request.GET['student'].isdigit():
+            return HttpResponse('This student does not exist!', status=400)
+        student = get_object_or_404(User, pk=int(http_request.GET['student']), user_type=User.ACCOUNT_TYPE_STUDENT)
+
+    requests = get_archived_requests(term=term, student=student)
+    if not requests.exists():
+        return HttpResponse('There are no invoices to export.', status=404)
+
+    name = '-'.join(['invoices'] + [slugify(part) for part in (term, student and student.username) if part])
+    response = StreamingHttpResponse(stream_invoice_archive(requests), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{name}.zip"'
+    return response
@@ -1,18 +1,16 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
 from admin_functions.helpers.calculate_cost import calculate_cost
 from invoicer.helpers import invoice_generator as ig
 from invoicer.helpers.generate_invoice_id import generate_invoice_id
-from invoicer.models import Invoice, get_latest_id_number
+from invoicer.models import Invoice, reserve_invoice_numbers
 from request_handler.models.request_model import Request
 from user_system.models.user_model import User
 
-LOCAL_STORE = not settings.USE_AWS_S3
-OUTPUT_PATH = settings.INVOICE_OUTPUT_PATH
-
 
 @login_required(login_url=settings.LOGIN_URL)
 def generate_invoice_for_request(http_request: HttpRequest, tutoring_request_id: int) -> HttpResponse:
@@ -26,27 +24,25 @@ def generate_invoice_for_request(http_request: HttpRequest, tutoring_request_id:
     if http_request.user.user_type == User.ACCOUNT_TYPE_STUDENT or http_request.user.user_type == User.ACCOUNT_TYPE_TUTOR:
         return render(http_request, 'permission_denied.html', status=403)
 
-    request_obj = Request.objects.get(id=tutoring_request_id)
+    with transaction.atomic():
+        # The request is locked, so that a batch of invoices (see batch_invoicer) cannot invoice it at the same time
+        request_obj = Request.objects.select_for_update().get(id=tutoring_request_id)
 
-    if request_obj.invoice is not None:
-        LOCAL_STORE = not settings.USE_AWS_S3
-        return render(http_request, 'invoice_already_generated.html', {
-            "path": f"{OUTPUT_PATH / f'{request_obj.invoice_id}' if LOCAL_STORE else f'AWS S3 at invoices/pdfs/{request_obj.invoice_id}.pdf'}"},
-                      status=409)
+        if request_obj.invoice is not None:
+            return render(http_request, 'invoice_already_generated.html',
+                          {"path": get_stored_path(request_obj.invoice)}, status=409)
 
-    # Get necessary parameters for invoice generation:
-    student = request_obj.student
-    invoice_id = generate_invoice_id(student, get_latest_id_number(student))
-    total_cost = calculate_cost(tutor=request_obj.tutor, request_id=request_obj.id)
+        # Get necessary parameters for invoice generation:
+        student = request_obj.student
+        invoice_id = generate_invoice_id(student, reserve_invoice_numbers(student) - 1)
+        total_cost = calculate_cost(tutor=request_obj.tutor, request_id=request_obj.id)
 
-    # Generate the invoice and save the created object.
-    invoice = create_invoice_object(student=student, invoice_id=invoice_id, total_cost=total_cost)
-    invoice.save()
+        # Generate the invoice and save the created object.
+        invoice = create_invoice_object(student=student, invoice_id=invoice_id, total_cost=total_cost)
 
-    # Update the request object
-    request_obj.invoice = invoice
-    request_obj.save()
-    ig.generate_invoice(request_obj)
+        # Update the request object. The PDF is only rendered when the invoice is first viewed (see get_invoice).
+        request_obj.invoice = invoice
+        request_obj.save()
 
     return render(http_request, 'invoice_generated.html', status=201)
 
@@ -54,3 +50,11 @@ def create_invoice_object(student: User, invoice_id: str, total_cost: float) ->
     return Invoice.objects.create(invoice_id=invoice_id,
                                   student=student,
                                   total=total_cost)
+
+def get_stored_path(invoice: Invoice) -> str:
+    """Returns where the latest PDF of an invoice is stored, as shown to Admins."""
+    if not invoice.pdf_name:
+        return 'Not rendered yet, it will be when the invoice is first viewed'
+    if settings.USE_AWS_S3:
+        return f'AWS S3 at {ig.get_invoice_key(invoice.pdf_name)}'
+    return ig.get_invoice_path(invoice.pdf_name)
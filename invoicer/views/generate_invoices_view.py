@@ -0,0 +1,31 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
+from django.shortcuts import redirect, render
+
+from invoicer.helpers.batch_invoicer import start_batch
+
+
+@login_required
+def generate_all_invoices(http_request: HttpRequest) -> HttpResponse:
+    """View function to generate the invoices of all allocated requests that do not have one yet, in a single batch.
+
+    Only Admin users can trigger the batch. As this alters the server's state, only POST requests are accepted. The batch
+    runs in the background (see batch_invoicer.start_batch), so the Admin is redirected straight away; the
+    generate_invoices command runs it in the foreground and reports every invoice.
+    :param http_request: the HTTP request object.
+    :return: a redirection to the Admin dashboard.
+    """
+    if not http_request.user.is_admin:
+        return render(http_request, 'permission_denied.html', status=403)
+
+    if http_request.method != 'POST':
+        return HttpResponseNotAllowed(["POST"], status=405, content=b'Not Allowed')
+
+    if start_batch():
+        messages.add_message(http_request, messages.SUCCESS,
+                             "The invoices are being generated. They will appear in the invoices page once ready.")
+    else:
+        messages.add_message(http_request, messages.WARNING,
+                             "The invoices are already being generated. Please wait for that batch to finish.")
+    return redirect('admin_dash')
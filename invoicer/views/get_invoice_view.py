@@ -1,10 +1,12 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 
 from code_tutors.aws import s3
+from invoicer.helpers import invoice_generator as ig
 from invoicer.models import Invoice
+from request_handler.models.request_model import Request
 
 
 @login_required
@@ -15,6 +17,8 @@ def get_invoice(http_request: HttpRequest, invoice_id: str) -> HttpResponse | Fi
     stored locally, a FileResponse is returned. Otherwise, an appropriate HttpResponse is returned, redirecting the user
     to the location of the invoice.
     Admins can see all invoices for all students, Students can only see their own invoices, Tutors cannot see any invoices.
+    The PDF is rendered on first access, and again whenever the details printed on it have changed since it was stored.
+    When using S3, a PDF that has not been uploaded yet is served from the local upload spool.
     :param http_request: the HTTP request object.
     :param invoice_id: the ID of the invoice to be retrieved.
     :return: Either the invoice file (if stored locally) or a redirection to the location of the invoice (if stored remotely).
@@ -28,12 +32,20 @@ def get_invoice(http_request: HttpRequest, invoice_id: str) -> HttpResponse | Fi
     if not (user.is_admin or invoice.student == http_request.user):
         return HttpResponse('You cannot view this invoice!', status=403)
 
+    request_obj = Request.objects.select_related('student', 'tutor', 'invoice').filter(invoice=invoice).first()
+    if request_obj is None:
+        raise Http404('This invoice does not belong to any request.')
+    name = ig.get_or_generate_invoice(request_obj)
+
     if settings.USE_AWS_S3:
-        key = f'invoices/pdfs/{invoice.invoice_id}.pdf'
-        url = s3.generate_access_url(key=key, expiration=60)
+        try:
+            # A PDF still waiting in the upload spool is served from there, so it never waits for the upload
+            return FileResponse(open(ig.get_spool_path(name), 'rb'),
+                                as_attachment=True, filename=f'{invoice.invoice_id}.pdf', status=200)
+        except FileNotFoundError:
+            pass
+        url = s3.generate_access_url(key=ig.get_invoice_key(name), expiration=settings.INVOICE_URL_EXPIRATION)
         return HttpResponseRedirect(url, content=url)
     else:
-        return FileResponse(open(
-            f'{settings.INVOICE_OUTPUT_PATH}/{invoice.invoice_id}.pdf',
-            'rb')
-            , as_attachment=True, filename=f'{invoice.invoice_id}.pdf', status=200)
+        return FileResponse(open(ig.get_invoice_path(name), 'rb'),
+                            as_attachment=True, filename=f'{invoice.invoice_id}.pdf', status=200)
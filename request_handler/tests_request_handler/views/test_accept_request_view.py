@@ -1,13 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from calendar_scheduler.models import Booking
 from request_handler.models.request_model import Request
 from request_handler.models.venue_model import Venue
-from request_handler.views.accept_request import match_lesson_frequency
+from request_handler.views.accept_request import get_lesson_dates
 from user_system.fixtures.create_test_users import create_test_users
 from user_system.models.day_model import Day
 from user_system.models.user_model import User
@@ -135,7 +138,8 @@ class AcceptRequestViewTestCase(TestCase):
         self.lesson_request.save()
         mock_datetime.today.return_value = datetime(2024, 8, 1)
         mock_datetime.combine.side_effect = lambda d, t: datetime.combine(d, t)
-        response = self.client.post(reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
+        with self.assertLogs('request_handler.views.accept_request', level='ERROR'):
+            response = self.client.post(reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
         # Check the number of sessions created
         bookings = Booking.objects.all()
         self.assertEqual(bookings.count(), 0)
@@ -200,7 +204,8 @@ class AcceptRequestViewTestCase(TestCase):
         self.lesson_request.save()
         mock_datetime.today.return_value = datetime(2024, 9, 1)
         mock_datetime.combine.side_effect = lambda d, t: datetime.combine(d, t)
-        response = self.client.post(reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
+        with self.assertLogs('request_handler.views.accept_request', level='ERROR'):
+            response = self.client.post(reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
         # Check the number of sessions created
         bookings = Booking.objects.all()
         self.assertEqual(bookings.count(), 0)
@@ -209,10 +214,20 @@ class AcceptRequestViewTestCase(TestCase):
     # Test that an error during booking is caught and handled.
     def test_error_handling_booking_creation(self):
         # Mock the creation of bookings to raise an exception
-        with patch('calendar_scheduler.models.Booking.objects.create', side_effect=Exception('Error creating booking')):
+        with patch('calendar_scheduler.models.Booking.objects.bulk_create',
+                   side_effect=DatabaseError('Error creating booking')), self.assertLogs(level='ERROR'):
             response = self.client.post(reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
 
         self.assertRedirects(response, reverse('view_requests'))
+        self.assertTrue(Request.objects.filter(id=self.lesson_request.id).exists())
+        self.assertIn('Error creating booking', [str(message) for message in get_messages(response.wsgi_request)][0])
+
+    # Test that unexpected errors (i.e. bugs) are not hidden.
+    def test_unexpected_errors_are_raised(self):
+        with patch('calendar_scheduler.models.Booking.objects.bulk_create', side_effect=TypeError('Bug')):
+            self.assertRaises(TypeError, self.client.post,
+                              reverse('accept_request', kwargs={'request_id': self.lesson_request.id}))
+        self.assertTrue(Request.objects.filter(id=self.lesson_request.id).exists())
 
     # Test that a non-existent request should fail.
     def test_request_not_found(self):
@@ -232,7 +247,8 @@ class AcceptRequestViewTestCase(TestCase):
         self.lesson_request.frequency = "INVALID"
         self.lesson_request.save()
         self.client.force_login(self.tutor)
-        response = self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
+        with self.assertLogs('request_handler.views.accept_request', level='ERROR'):
+            response = self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
         self.assertRedirects(response, reverse('view_requests'), status_code=302, target_status_code=200)
 
     # Test lesson request identifiers when there are previous requests
@@ -264,7 +280,60 @@ class AcceptRequestViewTestCase(TestCase):
     def test_match_term_default_case(self):
         self.lesson_request.frequency = "INVALID"
         self.lesson_request.save()
-        date = datetime(2025,5,4,12,0,0)
         with self.assertRaises(ValueError):
-            match_lesson_frequency(self.lesson_request,date)
+            get_lesson_dates(self.lesson_request, date(2025, 5, 4), 15)
+
+    def test_lesson_dates_for_biweekly_lessons_alternate_days(self):
+        self.lesson_request.frequency = "Biweekly"
+        self.lesson_request.day = self.day_friday
+        self.lesson_request.day2 = self.day_tuesday
+        dates = get_lesson_dates(self.lesson_request, date(2024, 9, 6), 4)
+        self.assertEqual(dates, [date(2024, 9, 6), date(2024, 9, 10), date(2024, 9, 13), date(2024, 9, 17)])
+
+    # Test that a whole group is booked with a constant number of queries, regardless of the frequency
+    def test_group_is_booked_in_bulk(self):
+        self.lesson_request.group_request_id = 5
+        self.lesson_request.save()
+        other = Request.objects.create(allocated=True, tutor=self.tutor, student=self.student, term="January",
+                                       day=self.day_monday, frequency="Biweekly", day2=self.day_friday,
+                                       duration=60, knowledge_area="Robotics", venue=self.venue_online,
+                                       group_request_id=5)
+        # session, user, request, savepoint, identifier, group, insert, 3 x delete (with cascades), release
+        with self.assertNumQueries(11):
+            self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
+        self.assertEqual(Booking.objects.filter(lesson_identifier=1).count(), 45)
+        self.assertFalse(Request.objects.filter(id__in=[self.lesson_request.id, other.id]).exists())
+
+    # Test that accepting a request invalidates the cached calendar months of the tutor
+    @override_settings(CALENDAR_CACHE_MONTHS=True)
+    def test_accepting_invalidates_cached_calendar(self):
+        cache.clear()
+        self.client.get(reverse('tutor_calendar'), {'year': 2026, 'month': 9})
+        with patch('request_handler.views.accept_request.datetime') as mock_datetime:
+            mock_datetime.today.return_value = datetime(2026, 8, 1)
+            mock_datetime.combine.side_effect = lambda d, t: datetime.combine(d, t)
+            self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
+        response = self.client.get(reverse('tutor_calendar'), {'year': 2026, 'month': 9})
+        self.assertContains(response, 'class="event-card', count=4)
+
+    # Test that requests which are not part of a group are accepted on their own
+    def test_ungrouped_requests_are_accepted_alone(self):
+        other = Request.objects.create(allocated=True, tutor=self.tutor, student=self.student, term="September",
+                                       day=self.day_monday, frequency="Weekly", duration=60,
+                                       knowledge_area="Robotics", venue=self.venue_online)
+        self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
+        self.assertEqual(Booking.objects.count(), 15)
+        self.assertTrue(Request.objects.filter(id=other.id).exists())
+
+    # Test that no booking is kept if one of the requests in the group cannot be booked
+    def test_failing_group_member_books_nothing(self):
+        self.lesson_request.group_request_id = 5
+        self.lesson_request.save()
+        Request.objects.create(allocated=True, tutor=self.tutor, student=self.student, term="September",
+                               day=self.day_monday, frequency="Biweekly", duration=60, knowledge_area="Robotics",
+                               venue=self.venue_online, group_request_id=5)
+        with self.assertLogs('request_handler.views.accept_request', level='ERROR'):
+            self.client.post(reverse('accept_request', args=[self.lesson_request.id]))
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(Request.objects.filter(group_request_id=5).count(), 2)
     
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.urls.conf import path
 
-from admin_functions.views.view_cancellation_requests import ViewCancellationRequests
+from admin_functions.views.view_cancellation_requests import BulkCancellationRequestsView, ViewCancellationRequests
 from request_handler.views.accept_request import AcceptRequestView
 from request_handler.views.create_request import CreateRequestView
 from request_handler.views.delete_request import ConfirmDeleteRequestView, DeleteRequestView
@@ -21,6 +21,7 @@ urlpatterns = [
     path('processing_late_request/', processing_late_request, name='processing_late_request'),
     path('accept/<int:request_id>/', AcceptRequestView.as_view(), name="accept_request"),
     path('admins/cancellation/', ViewCancellationRequests.as_view(), name='view_cancellation_requests'),
+    path('admins/cancellation/bulk/', BulkCancellationRequestsView.as_view(), name='bulk_cancellation_requests'),
     path('reject/<int:request_id>/', reject_request, name='reject_request'),
 
 ]
@@ -1,13 +1,19 @@
+import logging
 from datetime import date, datetime, time, timedelta
 
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import DatabaseError, transaction
 from django.db.models import Max
 from django.shortcuts import get_object_or_404, redirect
 from django.views import View
 
+from calendar_scheduler.helpers.calendar_cache import bump_calendar_versions_on_commit
 from calendar_scheduler.models import Booking
 from request_handler.models.request_model import Request
 
+logger = logging.getLogger(__name__)
+
 
 def get_first_weekday(year, month, target_day):
     """Get the first occurrence of a specific weekday in a given month.
@@ -23,32 +29,27 @@ def get_first_weekday(year, month, target_day):
     lesson_time = time(12, 0)
     return datetime.combine(target, lesson_time)
 
-   
-def match_lesson_frequency(lesson_request, booking_date):
-    """Matches the frequency of the request to put into the calendar."""
+
+
+def get_lesson_dates(lesson_request, start_date, sessions):
+    """Computes the dates of all sessions of a request at once, starting with start_date.
+
+    Weekly and Fortnightly lessons are a fixed number of days apart. Biweekly lessons alternate between day and day2,
+    so every other session is shifted by the gap between the two days within the same week.
+    Raises a ValueError if the frequency of the request is invalid.
+    """
     match lesson_request.frequency:
         case "Weekly":
-            booking_date += timedelta(days=7)
+            offsets = [7 * i for i in range(sessions)]
         case "Biweekly":
             weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            day1 = weekdays.index(str(lesson_request.day))
-            day2 = weekdays.index(str(lesson_request.day2))
-            current_day = booking_date.weekday()
-
-            # Determine the closest day to the current date
-            days_to_day1 = (day1 - current_day + 7) % 7
-            days_to_day2 = (day2 - current_day + 7) % 7
-
-             # Alternate between day1 and day2
-            if days_to_day1 == 0:  # Currently on day1
-                booking_date += timedelta(days=(day2 - day1 + 7) % 7)
-            else:  # Currently on day2
-                booking_date += timedelta(days=(day1 - day2 + 7) % 7)
+            gap = (weekdays.index(str(lesson_request.day2)) - weekdays.index(str(lesson_request.day))) % 7
+            offsets = [7 * (i // 2) + gap * (i % 2) for i in range(sessions)]
         case "Fortnightly":
-            booking_date += timedelta(days=14)
+            offsets = [14 * i for i in range(sessions)]
         case _:
             raise ValueError('This frequency is invalid')
-    return booking_date
+    return [start_date + timedelta(days=offset) for offset in offsets]
 
 
 class AcceptRequestView(LoginRequiredMixin, View):
@@ -61,17 +62,23 @@ class AcceptRequestView(LoginRequiredMixin, View):
 
     def post(self, request, request_id):
         lesson_request = get_object_or_404(Request, id=request_id, allocated=True, tutor=request.user)
-        sessions = self.calculate_lesson_frequency(lesson_request)
-        new_identifier = self.get_last_identifier()
-        grouped_lessons = self.get_grouped_lessons(lesson_request.group_request_id)
-
-        for lesson in grouped_lessons:
-            booking_date = self.get_booking_start_date(lesson)
-            result = self.create_bookings(sessions, new_identifier, request, lesson, booking_date)
-            if result != "":
-                return redirect('view_requests')
-            else:
-                lesson.delete()
+
+        try:
+            with transaction.atomic():
+                new_identifier = self.get_last_identifier()
+                grouped_lessons = self.get_grouped_lessons(lesson_request)
+                bookings = []
+                for lesson in grouped_lessons:
+                    sessions = self.calculate_lesson_frequency(lesson)
+                    booking_date = self.get_booking_start_date(lesson)
+                    bookings += self.create_bookings(sessions, new_identifier, request, lesson, booking_date)
+                Booking.objects.bulk_create(bookings)
+                bump_calendar_versions_on_commit(request.user.id, *{lesson.student_id for lesson in grouped_lessons})
+                Request.objects.filter(id__in=[lesson.id for lesson in grouped_lessons]).delete()
+        except (ValueError, DatabaseError) as error:
+            # Nothing is saved if any lesson in the group cannot be booked, so the request can be accepted again.
+            logger.exception('Request %s could not be accepted', lesson_request.id)
+            messages.error(request, f'There was an error accepting this request: {error}')
         return redirect('view_requests')
 
     def get_last_identifier(self):
@@ -90,7 +97,10 @@ class AcceptRequestView(LoginRequiredMixin, View):
         current_year = today.year
         current_month = today.month
         first_term = lesson_request.term
-        return self.match_term(lesson_request, first_term, current_year, current_month)
+        booking_date = self.match_term(lesson_request, first_term, current_year, current_month)
+        if booking_date is None:
+            raise ValueError(f'The {first_term} term cannot be booked at this time of the year')
+        return booking_date
 
     def match_term(self, lesson_request, first_term, current_year, current_month):
         """Matches the term of the request to a term that exists in the year."""
@@ -122,32 +132,36 @@ class AcceptRequestView(LoginRequiredMixin, View):
             case _:
                 return 0
 
-    def get_grouped_lessons(self,id):
-        lessons = Request.objects.filter(group_request_id=id).all()
-        return lessons
+    def get_grouped_lessons(self, lesson_request):
+        """Retrieves all requests in the same group as the given request, which are accepted together."""
+        lessons = Request.objects.select_related('student', 'tutor', 'day', 'day2', 'venue')
+        if lesson_request.group_request_id == -1:
+            return list(lessons.filter(id=lesson_request.id))
+        return list(lessons.filter(group_request_id=lesson_request.group_request_id))
 
     def create_bookings(self, sessions, new_identifier, request, lesson_request, booking_date):
-        """ Creates the individual booking objects which are grouped toge"""
-        # Now add each of the sessions, starting with the booking_date
-        
-        for i in range(0, sessions):
-            try:
-                # Create a new Booking object based on the allocated request
-                Booking.objects.create(
-                    lesson_identifier=new_identifier,
-                    tutor=request.user,
-                    student=lesson_request.student,
-                    knowledge_area=lesson_request.knowledge_area,
-                    venue=lesson_request.venue,
-                    day=lesson_request.day,
-                    term=lesson_request.term,
-                    frequency=lesson_request.frequency,
-                    duration=lesson_request.duration,
-                    is_recurring=lesson_request.is_recurring,
-                    date=booking_date.date(),
-                    title=f"Tutor session between {lesson_request.student.first_name} {lesson_request.student.last_name} and {lesson_request.tutor_name}"
-                )
-                booking_date = match_lesson_frequency(lesson_request, booking_date)
-            except Exception as e:
-                return e
-        return ""
\ No newline at end of file
+        """ Builds the (unsaved) booking objects for every session of a request, which are grouped together by
+        new_identifier.
+        """
+        title = self.get_title(lesson_request)
+        return [
+            Booking(
+                lesson_identifier=new_identifier,
+                tutor=request.user,
+                student=lesson_request.student,
+                knowledge_area=lesson_request.knowledge_area,
+                venue=lesson_request.venue,
+                day=lesson_request.day,
+                term=lesson_request.term,
+                frequency=lesson_request.frequency,
+                duration=lesson_request.duration,
+                is_recurring=lesson_request.is_recurring,
+                date=lesson_date,
+                title=title
+            )
+            for lesson_date in get_lesson_dates(lesson_request, booking_date.date(), sessions)
+        ]
+
+    def get_title(self, lesson_request):
+        return (f"Tutor session between {lesson_request.student.first_name} {lesson_request.student.last_name} and "
+                f"{lesson_request.tutor_name}")